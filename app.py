@@ -1,14 +1,13 @@
 #!/usr/bin/env python3
-from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, flash
-import json, threading, time, logging, requests, os
-import local_config_loader, local_email_handler, local_webhook_handler, local_authentication_handler
+from flask import Flask, Response, current_app, render_template, request, redirect, url_for, session, jsonify, flash
+import json, logging, requests, os, tempfile
+import local_config_loader, local_email_handler, local_webhook_handler, local_authentication_handler, local_blob_store, local_metrics, local_profiler, local_logging, local_http_delivery, local_note_store, local_job_scheduler, local_snapshot, local_work_queue
+import local_ticket_store, local_fragment_cache
+from local_ticket_store import generate_ticket_number
+from local_ticket_model import Ticket, TICKET_STATUSES
+from local_authentication_handler import technician_required
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from functools import wraps
-
-from blueprints.api_ingest import api_ingest_bp
-from blueprints.reports_module import reports_module_bp
-from blueprints.changes_module import changes_module_bp
 
 BUILDID=str("0.9.2-beta-d")
 
@@ -23,39 +22,18 @@ CF_TURNSTILE_SITE_KEY = os.getenv("CF_TURNSTILE_SITE_KEY") # REQUIRED for CAPTCH
 CF_TURNSTILE_SECRET_KEY = os.getenv("CF_TURNSTILE_SECRET_KEY") # REQUIRED for CAPTCHA functionality.
 TAILSCALE_NOTIFY_EMAIL = os.getenv("TAILSCALE_NOTIFY_EMAIL")
 
-# Configuration non-secret data loaded from YAML.
+# Configuration non-secret data loaded from YAML. Parsed once and shared with every local_* module and blueprint.
 core_yaml_config = local_config_loader.load_core_config()
-TICKETS_FILE = core_yaml_config["tickets_file"]
 EMPLOYEE_FILE = core_yaml_config["employee_file"]
-LOG_LEVEL = core_yaml_config["logging"]["level"]
-LOG_FILE = core_yaml_config["logging"]["file"]
 EMAIL_ENABLED = core_yaml_config["email"]["enabled"]
 EMAIL_ACCOUNT = core_yaml_config["email"]["account"]
 IMAP_SERVER = core_yaml_config["email"]["imap_server"]
 SMTP_SERVER = core_yaml_config["email"]["smtp_server"]
 SMTP_PORT = core_yaml_config["email"]["smtp_port"]
-
-# Flask App core setup and configuration.
-app = Flask(__name__)
-app.secret_key = os.getenv("FLASKAPP_SECRET_KEY")
-app.permanent_session_lifetime = timedelta(hours=12)
-
-app.config.update(
-    SESSION_COOKIE_NAME="goobydesk_session_cookie",
-    SESSION_COOKIE_HTTPONLY=True, # XSS Cookie Theft Prevention
-    SESSION_COOKIE_SECURE=not app.debug, 
-    SESSION_COOKIE_SAMESITE="Lax", # Strict, Lax, None
-    SESSION_REFRESH_EACH_REQUEST=True,
-    PERMANENT_SESSION_LIFETIME=timedelta(hours=12),
-    MAX_CONTENT_LENGTH=16 * 1024 * 1024,)
-
-api_ingest_bp.config = {'TAILSCALE_NOTIFY_EMAIL': TAILSCALE_NOTIFY_EMAIL}
-app.register_blueprint(api_ingest_bp)
-app.register_blueprint(reports_module_bp)
-app.register_blueprint(changes_module_bp)
+TURNSTILE_VERIFY_URL = (core_yaml_config.get("turnstile", {}) or {}).get("verify_url", "https://challenges.cloudflare.com/turnstile/v0/siteverify")
+SELF_SERVICE_MAX_TICKETS = int((core_yaml_config.get("self_service", {}) or {}).get("max_tickets", 50)) # Newest tickets shown on My Tickets.
 
 # Security Headers for all responses.
-@app.after_request
 def set_security_headers(response):
     # Prevent clickjacking attacks
     response.headers['X-Frame-Options'] = 'DENY'
@@ -77,7 +55,7 @@ def set_security_headers(response):
         "frame-ancestors 'none'"
     )
     # HTTP Strict Transport Security (forces HTTPS) set to 1 Day.
-    if not app.debug:
+    if not current_app.debug:
         response.headers['Strict-Transport-Security'] = ('max-age=86400; includeSubDomains; preload')
     
     # Permissions Policy (formerly Feature-Policy)
@@ -85,23 +63,6 @@ def set_security_headers(response):
     
     return response
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-""" Above is the default logging configuration.
-Debug - Detailed information
-Info - Successes
-Warning - Unexpected events
-Error - Function failures
-Critical - Serious application failures
-"""
-# INITIAL ERROR CODES
-if not CF_TURNSTILE_SITE_KEY or not CF_TURNSTILE_SECRET_KEY:
-    logging.critical("CF_TURNSTILE_SITE_KEY and CF_TURNSTILE_SECRET_KEY must be configured in the .env file. It is required for CAPTCHA functionality.")
-    exit(1) 
-
 #email_thread_enabler_check = os.getenv("EMAIL_ENABLED")
 #if email_thread_enabler_check is None:
 #    logging.info("EMAIL_ENABLED is not defined. Defaulting to False.")
@@ -110,20 +71,7 @@ if not CF_TURNSTILE_SITE_KEY or not CF_TURNSTILE_SECRET_KEY:
 #    EMAIL_ENABLED = email_thread_enabler_check.lower() == "true"
 #    logging.info(f"EMAIL_ENABLED is set to {EMAIL_ENABLED}.")
 
-# Read/Loads the ticket file into memory. This is the original load_tickets function that works on Windows and Unix.
-def load_tickets():
-    try:
-        with open(TICKETS_FILE, "r") as tkt_file:
-            return json.load(tkt_file)
-    except FileNotFoundError:
-        logging.critical("Ticket JSON Database file could not be located.")
-        exit(1)
-
-# Writes to the ticket file database. Eventually needs file locking for Linux.
-def save_tickets(tickets):
-    with open(TICKETS_FILE, "w") as tkt_file_write_op:
-        json.dump(tickets, tkt_file_write_op, indent=4)
-        logging.debug("The Ticket JSON Database file was modified.")
+# Ticket loading, saving, lookups and number generation live in local_ticket_store.py.
 
 # Read/Loads the employee file into memory.
 def load_employees():
@@ -136,115 +84,116 @@ def load_employees():
         return {} # represents an empty dictionary
     
 # Helper script for secure password hasing auto-migration.
+# Writes to a temp file and renames it into place, so a request reading the file mid-write never sees half of it.
 def save_employees(employees):
-    with open(EMPLOYEE_FILE, "w") as emp_file_write_op:
-        json.dump(employees, emp_file_write_op, indent=4)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(EMPLOYEE_FILE)), prefix=".employee-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as emp_file_write_op:
+            json.dump(employees, emp_file_write_op, indent=4)
+        if os.path.exists(EMPLOYEE_FILE):
+            os.chmod(tmp_path, os.stat(EMPLOYEE_FILE).st_mode & 0o777)
+        os.replace(tmp_path, EMPLOYEE_FILE)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     logging.debug("The Employee JSON Database file was modified.")
 
-# Generate a new ticket number.
-def generate_ticket_number():
-    tickets = load_tickets() # Read/Load the tickets-db into memory.
-    current_year = datetime.now().year  # Get the current year dynamically
-    ticket_count = str(len(tickets) + 1).zfill(4)  # Zero-padded ticket count
-    return f"TKT-{current_year}-{ticket_count}"  # Format: TKT-YYYY-XXXX
-
-def generate_change_request_number():
-    tickets = load_tickets() # Read/Load the tickets-db into memory.
-    current_year = datetime.now().year  # Get the current year dynamically
-    ticket_count = str(len(tickets) + 1).zfill(4)  # Zero-padded ticket count
-    return f"CHG-{current_year}-{ticket_count}"  # Format: CHG-YYYY-XXXX
-
-# Background email inbox monitoring process.
-def background_email_monitor():
-    while True:
-        local_email_handler.fetch_email_replies()
-        time.sleep(600)  # Wait for emails every 10 minutes.
-#threading.Thread(target=background_email_monitor, daemon=True).start()
-
-if EMAIL_ENABLED is True:
-    logging.info("Starting background email monitoring thread...")
-    threading.Thread(target=background_email_monitor, daemon=True).start()
-else:
-    logging.info("EMAIL_ENABLED is set to false. Skipping...")
-
-# Decorator to force authentication checking. Easy to append to routes.
-def technician_required(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        # Session-based auth check
-        if not session.get("technician"):
-            # Unauthorized access attempt
-            return render_template("403.html"), 403
-        # Authorized technician → proceed to the route
-        return func(*args, **kwargs)
-    return wrapper
-
-@app.route("/", methods=["GET", "POST"])
+# Background workers are never started at import. Call this once per serving process (see gunicorn.conf.py).
+_background_workers_started = False
+
+def start_background_workers():
+    global _background_workers_started
+    if _background_workers_started:
+        return
+    _background_workers_started = True
+
+    # Periodic jobs. Every worker registers them; singleton jobs only run in the worker holding their lease.
+    # Schedules can be changed under jobs: in the configuration.
+    if EMAIL_ENABLED is True:
+        logging.info("Scheduling background email monitoring...")
+        local_job_scheduler.job_scheduler.register("imap-sync", local_email_handler.fetch_email_replies,
+            interval_s=600, jitter_s=30, timeout_s=300) # Check for emails every 10 minutes.
+    else:
+        logging.info("EMAIL_ENABLED is set to false. Skipping...")
+    local_job_scheduler.job_scheduler.register("index-compaction", local_ticket_store.compact_ticket_indexes,
+        interval_s=3600, jitter_s=300, timeout_s=900) # Keeps the append-only ticket indexes near one line per ticket.
+    # Disabled by default: then it only runs when POST /admin/snapshots triggers it.
+    local_job_scheduler.job_scheduler.register("snapshot", local_snapshot.create_snapshot,
+        cron="0 * * * *", jitter_s=60, timeout_s=1800, enabled=False)
+    local_job_scheduler.job_scheduler.start()
+
+    local_webhook_handler.notification_scheduler.start()
+
+# Cloudflare Turnstile CAPTCHA validation for the public forms. Returns None for a valid token, else the message to flash.
+def verify_turnstile(turnstile_token):
+    if not turnstile_token:
+        return "CAPTCHA verification failed. Please try again."
+
+    turnstile_data = {
+        "secret": CF_TURNSTILE_SECRET_KEY,
+        "response": turnstile_token,
+        "remoteip": request.remote_addr
+    }
+    try:
+        with local_metrics.timed("goobydesk_turnstile_verify_duration_seconds", "Cloudflare Turnstile verification time."):
+            turnstile_response = requests.post(TURNSTILE_VERIFY_URL, data=turnstile_data, timeout=10)
+            result = turnstile_response.json()
+    except Exception as e:
+        logging.error("Turnstile verification error: %s", e)
+        return "Error verifying CAPTCHA. Please try again later."
+    if not result.get("success"):
+        logging.warning("Turnstile verification failed: %s", result)
+        return "CAPTCHA verification failed. Please try again."
+    return None
+
 def home():
     if request.method == "POST":
         try:
-            # Cloudflare Turnstile CAPTCHA validation
-            turnstile_token = request.form.get("cf-turnstile-response")
-            if not turnstile_token:
-                flash("CAPTCHA verification failed. Please try again.", "danger")
-                return redirect(url_for("home"))
-
-            turnstile_url = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
-            turnstile_data = {
-                "secret": CF_TURNSTILE_SECRET_KEY,
-                "response": turnstile_token,
-                "remoteip": request.remote_addr
-            }
-
-            try:
-                turnstile_response = requests.post(turnstile_url, data=turnstile_data)
-                result = turnstile_response.json()
-                if not result.get("success"):
-                    logging.warning(f"Turnstile verification failed: {result}")
-                    flash("CAPTCHA verification failed. Please try again.", "danger")
-                    return redirect(url_for("home"))
-            except Exception as e:
-                logging.error(f"Turnstile verification error: {str(e)}")
-                flash("Error verifying CAPTCHA. Please try again later.", "danger")
+            turnstile_error = verify_turnstile(request.form.get("cf-turnstile-response"))
+            if turnstile_error:
+                flash(turnstile_error, "danger")
                 return redirect(url_for("home"))
 
             # Process ticket submission
             ticket_number = generate_ticket_number()
-            
-            new_ticket = {
-                "ticket_number": ticket_number,
-                "requestor_name": request.form["requestor_name"],
-                "requestor_email": request.form["requestor_email"],
-                "ticket_subject": request.form["ticket_subject"],
-                "ticket_message": request.form["ticket_message"],
-                "request_type": request.form["request_type"],
-                "ticket_impact": request.form["ticket_impact"],
-                "ticket_urgency": request.form["ticket_urgency"],
-                "ticket_status": "Open",
-                "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "ticket_notes": []
-            }
-
-            tickets = load_tickets()
-            tickets.append(new_ticket)
-            save_tickets(tickets)
-            logging.info(f"{ticket_number} has been created.")
+            ticket_message, ticket_message_blob = local_blob_store.offload_text(request.form["ticket_message"])
+
+            new_ticket = Ticket(
+                ticket_number=ticket_number,
+                requestor_name=request.form["requestor_name"],
+                requestor_email=request.form["requestor_email"],
+                ticket_subject=request.form["ticket_subject"],
+                ticket_message=ticket_message,
+                request_type=request.form["request_type"],
+                ticket_impact=request.form["ticket_impact"],
+                ticket_urgency=request.form["ticket_urgency"],
+                ticket_status="Open",
+                submission_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+            if ticket_message_blob:
+                new_ticket.ticket_message_blob = ticket_message_blob
+
+            local_ticket_store.add_ticket(new_ticket)
+            logging.info("%s has been created.", ticket_number)
 
             # Send confirmation email to the requestor
             if EMAIL_ENABLED:
                 try:
-                    email_body = render_template("new-ticket-email.html", ticket=new_ticket)
+                    # The requestor receives their full message, not the stored preview.
+                    email_body = render_template("new-ticket-email.html", ticket=dict(new_ticket.to_record(), ticket_message=request.form["ticket_message"]))
                     local_email_handler.send_email(
-                        new_ticket["requestor_email"],
-                        f"{ticket_number} - {new_ticket['ticket_subject']}",
+                        new_ticket.requestor_email,
+                        f"{ticket_number} - {new_ticket.ticket_subject}",
                         email_body,
-                        html=True
+                        html=True,
+                        ticket_number=ticket_number
                     )
-                    logging.info(f"Confirmation email for {ticket_number} sent successfully.")
+                    logging.info("Confirmation email for %s sent successfully.", ticket_number)
                 except Exception as e:
-                    logging.error(f"Failed to send email for {ticket_number}: {str(e)}")
+                    logging.error("Failed to send email for %s: %s", ticket_number, e)
             else:
-                logging.debug(f"EMAIL_ENABLED is false. Skipping email for {ticket_number}.")
+                logging.debug("EMAIL_ENABLED is false. Skipping email for %s.", ticket_number)
 
             # Send webhook notifications
             try:
@@ -253,27 +202,46 @@ def home():
                     new_ticket["ticket_subject"],
                     "Open"
                 )
-                logging.info(f"Webhook notifications for {ticket_number} sent successfully.")
+                logging.info("Webhook notifications for %s queued.", ticket_number)
             except Exception as e:
-                logging.error(f"Failed to send webhook notifications for {ticket_number}: {str(e)}")
+                logging.error("Failed to send webhook notifications for %s: %s", ticket_number, e)
 
             # Prompt the user's web interface of a successful ticket submission
             flash(f"Ticket {ticket_number} has been submitted successfully!", "success")
             return redirect(url_for("home"))
 
         except KeyError as e:
-            logging.error(f"Missing required form field: {str(e)}")
+            logging.error("Missing required form field: %s", e)
             flash("Please fill out all required fields.", "danger")
             return redirect(url_for("home"))
         except Exception as e:
-            logging.critical(f"Failed to process ticket submission: {str(e)}")
+            logging.critical("Failed to process ticket submission: %s", e)
             flash("An error occurred while submitting your ticket. Please try again later.", "danger")
             return redirect(url_for("home"))
 
     # Refresh and reload the Home/Index
     return render_template("index.html", sitekey=CF_TURNSTILE_SITE_KEY)
 
-@app.route("/login", methods=["GET", "POST"])
+# Public self-service status page. A requester enters their email and sees each of their tickets' number, subject,
+# status and last update, answered from the requester index. Ticket content is never shown here.
+def my_tickets():
+    if request.method == "POST":
+        turnstile_error = verify_turnstile(request.form.get("cf-turnstile-response"))
+        if turnstile_error:
+            flash(turnstile_error, "danger")
+            return redirect(url_for("my_tickets"))
+
+        requestor_email = request.form.get("requestor_email", "").strip()
+        if not requestor_email:
+            flash("Please enter the email address you submitted your tickets with.", "danger")
+            return redirect(url_for("my_tickets"))
+        tickets = local_ticket_store.tickets_for_requester(requestor_email, limit=SELF_SERVICE_MAX_TICKETS)
+        local_metrics.inc_counter("goobydesk_self_service_lookups_total", "My Tickets lookups, by whether any tickets were found.",
+            outcome="found" if tickets else "none")
+        return render_template("my_tickets.html", sitekey=CF_TURNSTILE_SITE_KEY, tickets=tickets, requestor_email=requestor_email)
+
+    return render_template("my_tickets.html", sitekey=CF_TURNSTILE_SITE_KEY, tickets=None)
+
 def login():
     if request.method == "POST":
         username = request.form.get("tech_username_box", "").strip()
@@ -294,7 +262,7 @@ def login():
                     save_employees(employees)
 
                     session["technician"] = username
-                    logging.info(f"{username} logged in using legacy password and was auto-migrated.")
+                    logging.info("%s logged in using legacy password and was auto-migrated.", username)
                     return redirect(url_for("dashboard"))
                 # Username matched, legacy password wrong -> stop checking
                 break
@@ -302,80 +270,139 @@ def login():
             stored_hash = employee.get("password_hash")
             if stored_hash and local_authentication_handler.verify_password(password, stored_hash):
                 session["technician"] = username
-                logging.info(f"{username} logged in successfully.")
+                logging.info("%s logged in successfully.", username)
                 return redirect(url_for("dashboard"))
             # Username matched but password incorrect
             break
 
         # If we reach here -> authentication failed
-        logging.warning(f"Failed login attempt for username: {username}")
+        logging.warning("Failed login attempt for username: %s", username)
         return render_template("login.html", error="Invalid credentials.")
 
     return render_template("login.html", sitekey=CF_TURNSTILE_SITE_KEY)
 
 # Route for rendering the core technician dashboard. Displays all Open and In-Progress tickets.
-@app.route("/dashboard")
 @technician_required
 def dashboard():
-    tickets = load_tickets()
-    # Filtering out tickets with the Closed Status on the main Dashboard.
-    open_tickets = [ticket for ticket in tickets if ticket["ticket_status"].lower() != "closed"]
-    return render_template("dashboard.html", tickets=open_tickets, loggedInTech=session["technician"], BUILDID=BUILDID)
+    # Filtering out tickets with the Closed Status on the main Dashboard. The list is the same for every technician,
+    # so it is rendered once per store version and only the surrounding page is rendered per request.
+    ticket_list_html = local_fragment_cache.render_fragment("dashboard_ticket_list", local_ticket_store.store_signature(),
+        "dashboard_ticket_list.html", lambda: {"tickets": list(local_ticket_store.iter_open_tickets())})
+    return render_template("dashboard.html", ticket_list_html=ticket_list_html, loggedInTech=session["technician"], BUILDID=BUILDID)
+
+# The logged in technician's open tickets and the unassigned pool, answered from the work queue index.
+@technician_required
+def my_queue():
+    loggedInTech = session["technician"]
+    queue_sizes = local_ticket_store.work_queue_sizes()
+    return render_template("my_queue.html",
+        my_tickets=local_ticket_store.work_queue_for(loggedInTech),
+        unassigned_tickets=local_ticket_store.work_queue_for("", limit=local_work_queue.UNASSIGNED_SHOWN), # Oldest first; the pool can be large.
+        unassigned_total=queue_sizes.get("", 0),
+        queue_sizes=queue_sizes,
+        loggedInTech=loggedInTech, BUILDID=BUILDID)
 
 # Route for viewing a ticket in the Ticket Commander view.
-@app.route("/ticket/<ticket_number>")
 @technician_required
 def ticket_detail(ticket_number):
-    tickets = load_tickets()
-    ticket = next((t for t in tickets if t["ticket_number"] == ticket_number), None)
+    ticket = local_ticket_store.get_ticket(ticket_number)
     
     if ticket:
-        return render_template("ticket-commander.html", ticket=ticket, loggedInTech=session["technician"])
+        ticket_details_html = local_fragment_cache.render_fragment("ticket_details", (ticket_number, local_fragment_cache.ticket_version(ticket)),
+            "ticket_details.html", lambda: {"ticket": ticket})
+        # Notes are read from the ticket's note stream one page at a time, newest first.
+        notes_page = local_note_store.page_notes(ticket, request.args.get("page", 1, type=int))
+        return render_template("ticket-commander.html", ticket=ticket, ticket_details_html=ticket_details_html, notes_page=notes_page,
+            technicians=local_work_queue.assignable_technicians(), loggedInTech=session["technician"])
 
     return render_template("404.html"), 404
 
+# Route for lazily loading offloaded ticket content (raw payloads, long replies) in Ticket Commander.
+@technician_required
+def ticket_content(ticket_number, blob_ref):
+    if not local_blob_store.is_valid_blob_ref(blob_ref):
+        return render_template("400.html"), 400
+
+    ticket = local_ticket_store.get_ticket(ticket_number)
+    if not ticket:
+        return render_template("404.html"), 404
+
+    # Only serve blobs that actually belong to this ticket.
+    if blob_ref != ticket.get("ticket_message_blob") and blob_ref not in local_note_store.note_blob_refs(ticket):
+        return render_template("404.html"), 404
+
+    full_content = local_blob_store.get_blob(blob_ref)
+    if full_content is None:
+        return render_template("404.html"), 404
+    return Response(full_content, mimetype="text/plain")
+
 # Route for updating a ticket. Called from Dashboard and Ticket Commander.
-@app.route("/ticket/<ticket_number>/update_status/<ticket_status>", methods=["POST"])
 @technician_required
 def update_ticket_status(ticket_number, ticket_status):
-    logging.info(f"{ticket_number} status has been changed to {ticket_status}.")
+    logging.info("%s status has been changed to %s.", ticket_number, ticket_status)
     
     if not session.get("technician"):
         return render_template("403.html"), 403
     
-    valid_statuses = ["Open", "In-Progress", "Closed"]
-    if ticket_status not in valid_statuses:
+    if ticket_status not in TICKET_STATUSES:
         return render_template("400.html"), 400
 
     loggedInTech = session["technician"]
-    tickets = load_tickets()
-
-    for ticket in tickets:
-        if ticket["ticket_number"] == ticket_number:
-            # Extract subject for webhook notifications
-            ticket_subject = ticket.get("ticket_subject", "No Subject Provided")
-            # Update ticket in memory
-            ticket["ticket_status"] = ticket_status
-            
-            if ticket_status == "Closed":
-                ticket["closed_by"] = loggedInTech
-                ticket["closure_date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            save_tickets(tickets)
-            logging.info(f"Ticket {ticket_number} status updated to {ticket_status} by {loggedInTech}.")
-            # Send webhook notifications for status update.
-            try:
-                local_webhook_handler.notify_ticket_event(ticket_number=ticket_number,ticket_status=ticket_status,ticket_subject=ticket_subject) # Consider a refactor later.
-                logging.info(f"Ticket {ticket_number} status update notifications sent successfully.")
-            except Exception as e:
-                logging.error(f"Failed to send ticket status update notifications for {ticket_number}: {str(e)}")
 
-            return jsonify({"message": f"Ticket {ticket_number} updated to {ticket_status}."})
+    def apply_status(ticket):
+        ticket.ticket_status = ticket_status
+        if ticket_status == "Closed":
+            ticket.closed_by = loggedInTech
+            ticket.closure_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Only the ticket's own shard is read and rewritten.
+    ticket = local_ticket_store.update_ticket(ticket_number, apply_status)
+    if ticket is None:
+        return render_template("404.html"), 404
+
+    # Extract subject for webhook notifications
+    ticket_subject = ticket.get("ticket_subject", "No Subject Provided")
+    logging.info("Ticket %s status updated to %s by %s.", ticket_number, ticket_status, loggedInTech)
+    # Send webhook notifications for status update.
+    try:
+        local_webhook_handler.notify_ticket_event(ticket_number=ticket_number,ticket_status=ticket_status,ticket_subject=ticket_subject) # Consider a refactor later.
+        logging.info("Ticket %s status update notifications queued.", ticket_number)
+    except Exception as e:
+        logging.error("Failed to send ticket status update notifications for %s: %s", ticket_number, e)
 
-    return render_template("404.html"), 404
+    return jsonify({"message": f"Ticket {ticket_number} updated to {ticket_status}."})
+
+# Route for assigning or reassigning a ticket. An empty technician returns it to the unassigned pool.
+@technician_required
+def assign_ticket(ticket_number):
+    technician = request.form.get("technician", "").strip()
+    if technician and technician not in local_work_queue.assignable_technicians():
+        return jsonify({"message": f"{technician} is not an assignable technician."}), 400
+
+    loggedInTech = session["technician"]
+    previous = {}
+
+    def apply_assignment(ticket):
+        previous["technician"] = ticket.get("assigned_technician")
+        if technician:
+            ticket.assigned_technician = technician
+            ticket.assigned_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            ticket.pop("assigned_technician", None)
+            ticket.pop("assigned_date", None)
+
+    ticket = local_ticket_store.update_ticket(ticket_number, apply_assignment)
+    if ticket is None:
+        return jsonify({"message": "Ticket not found."}), 404
+
+    logging.info("Ticket %s assigned to %s by %s (was %s).", ticket_number, technician or "nobody", loggedInTech, previous["technician"] or "unassigned")
+    if not technician:
+        return jsonify({"message": f"Ticket {ticket_number} is now unassigned."}), 200
+    if previous["technician"] and previous["technician"] != technician:
+        return jsonify({"message": f"Ticket {ticket_number} reassigned from {previous['technician']} to {technician}."}), 200
+    return jsonify({"message": f"Ticket {ticket_number} assigned to {technician}."}), 200
 
 # Route for appending a new note to a ticket.
-@app.route("/ticket/<ticket_number>/append_note", methods=["POST"])
 @technician_required
 def add_ticket_note(ticket_number):
     new_tkt_note = request.form.get("note_content")  # Ensure the key matches the JS request
@@ -383,16 +410,13 @@ def add_ticket_note(ticket_number):
     if not new_tkt_note:
         return jsonify({"message": "Note Contents cannot be empty!"}), 400
 
-    tickets = load_tickets()  # Load tickets into memory.
+    if local_ticket_store.get_ticket(ticket_number) is None:
+        return jsonify({"message": "Ticket not found."}), 404
+    # Appended to the ticket's note stream; the ticket database itself is not rewritten.
+    local_note_store.append_note(ticket_number, new_tkt_note, author=session["technician"], source="technician")
 
-    for ticket in tickets:
-        if ticket["ticket_number"] == ticket_number:
-            ticket["ticket_notes"].append(new_tkt_note)  # Append note
-            save_tickets(tickets)  # Save updates
-            logging.info(f"Note successfully appended to {ticket_number}.")
-            return jsonify({"message": "Note added successfully."}), 200  # Return JSON response
-
-    return jsonify({"message": "Ticket not found."}), 404
+    logging.info("Note successfully appended to %s.", ticket_number)
+    return jsonify({"message": "Note added successfully."}), 200  # Return JSON response
 
 # ABOVE THIS LINE SHOULD ONLY BE TECHNICIAN/TICKETING PAGES ONLY!
 
@@ -403,32 +427,101 @@ def add_ticket_note(ticket_number):
 
 # Thanks to Claude Sonnet 4.5, API Ingest has moved to ./blueprints/api_ingest.py
 
-@app.route("/logout")
 def logout():
     session.pop("technician", None)
     return redirect(url_for("login"))
 
 # BELOW THIS LINE IS RESERVED FOR FLASK ERROR ROUTES. PUT ALL CORE APP FUNCTIONS ABOVE THIS LINE!
 # Handle 400 errors.
-@app.errorhandler(400)
 def bad_request(e):
     return render_template("400.html"), 400
 
 # Handle 403 errors.
-@app.errorhandler(403)
 def forbidden(e):
     return render_template("403.html"), 403
 
 # Handle 404 errors.
-@app.errorhandler(404)
 def page_not_found(e):
     return render_template("404.html"), 404
 
 # Handles 500 errors.
-@app.errorhandler(500)
 def internal_server_error(e):
-    logging.critical(f"Internal Server Error: {str(e)}")
+    logging.critical("Internal Server Error: %s", e)
     return render_template("500.html"), 500
 
+# Core technician/ticketing routes. Endpoint names match the function names used by url_for() in the templates.
+def register_core_routes(app):
+    app.add_url_rule("/", "home", home, methods=["GET", "POST"])
+    app.add_url_rule("/my-tickets", "my_tickets", my_tickets, methods=["GET", "POST"])
+    app.add_url_rule("/login", "login", login, methods=["GET", "POST"])
+    app.add_url_rule("/dashboard", "dashboard", dashboard)
+    app.add_url_rule("/dashboard/queue", "my_queue", my_queue)
+    app.add_url_rule("/ticket/<ticket_number>", "ticket_detail", ticket_detail)
+    app.add_url_rule("/ticket/<ticket_number>/content/<blob_ref>", "ticket_content", ticket_content)
+    app.add_url_rule("/ticket/<ticket_number>/update_status/<ticket_status>", "update_ticket_status", update_ticket_status, methods=["POST"])
+    app.add_url_rule("/ticket/<ticket_number>/append_note", "add_ticket_note", add_ticket_note, methods=["POST"])
+    app.add_url_rule("/ticket/<ticket_number>/assign", "assign_ticket", assign_ticket, methods=["POST"])
+    app.add_url_rule("/logout", "logout", logout)
+    app.register_error_handler(400, bad_request)
+    app.register_error_handler(403, forbidden)
+    app.register_error_handler(404, page_not_found)
+    app.register_error_handler(500, internal_server_error)
+
+# Application factory. Wires logging, blueprints and request hooks. Background threads are only started when asked,
+# so a pre-fork server can build the app once in the parent and start workers per process (see gunicorn.conf.py).
+def create_app(start_workers=False):
+    # One logging pipeline for the whole app. Records are queued and written by a background listener thread.
+    local_logging.setup_logging()
+
+    # INITIAL ERROR CODES
+    if not CF_TURNSTILE_SITE_KEY or not CF_TURNSTILE_SECRET_KEY:
+        logging.critical("CF_TURNSTILE_SITE_KEY and CF_TURNSTILE_SECRET_KEY must be configured in the .env file. It is required for CAPTCHA functionality.")
+        raise RuntimeError("CF_TURNSTILE_SITE_KEY and CF_TURNSTILE_SECRET_KEY must be configured in the .env file.")
+
+    # Blueprints are imported here so importing app.py stays cheap for helper scripts and benchmarks.
+    from blueprints.api_ingest import api_ingest_bp
+    from blueprints.reports_module import reports_module_bp
+    from blueprints.changes_module import changes_module_bp
+    from blueprints.metrics_module import metrics_module_bp
+    from blueprints.jobs_module import jobs_module_bp
+
+    # Flask App core setup and configuration.
+    app = Flask(__name__)
+    app.secret_key = os.getenv("FLASKAPP_SECRET_KEY")
+    app.permanent_session_lifetime = timedelta(hours=12)
+
+    app.config.update(
+        SESSION_COOKIE_NAME="goobydesk_session_cookie",
+        SESSION_COOKIE_HTTPONLY=True, # XSS Cookie Theft Prevention
+        SESSION_COOKIE_SECURE=not app.debug, 
+        SESSION_COOKIE_SAMESITE="Lax", # Strict, Lax, None
+        SESSION_REFRESH_EACH_REQUEST=True,
+        PERMANENT_SESSION_LIFETIME=timedelta(hours=12),
+        MAX_CONTENT_LENGTH=16 * 1024 * 1024,
+        BUILDID=BUILDID,
+        TAILSCALE_NOTIFY_EMAIL=TAILSCALE_NOTIFY_EMAIL,)
+
+    register_core_routes(app)
+    app.register_blueprint(api_ingest_bp)
+    app.register_blueprint(reports_module_bp)
+    app.register_blueprint(changes_module_bp)
+    app.register_blueprint(metrics_module_bp)
+    app.register_blueprint(jobs_module_bp)
+    app.after_request(set_security_headers)
+    local_logging.init_request_logging(app)
+    local_profiler.init_profiling(app)
+    local_http_delivery.init_http_delivery(app)
+
+    if start_workers:
+        start_background_workers()
+    return app
+
+# `gunicorn app:app` and `import app; app.app` keep working. The app is built on first access instead of at import.
+def __getattr__(name):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
-    app.run() #debug=True
+    create_app(start_workers=True).run() #debug=True
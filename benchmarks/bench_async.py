@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Sync vs async serving mode under slow upstreams. Runs GoobyDesk under real gunicorn in each server.mode against
+# the local Turnstile and SMTP stand-ins with injected latency, and fires concurrent public submissions, logins and
+# /api ingest posts. Needs gunicorn, and gevent for the async mode.
+# Usage: python3 benchmarks/bench_async.py [--concurrency 50] [--requests 200] [--turnstile-latency 0.5] [--smtp-latency 0.2]
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yaml
+
+import bench_common
+from loadtest import LatencyRecorder
+from loadtest_standins import FaultInjection, StandIns
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def set_server_mode(sandbox, mode):
+    config_file = os.path.join(sandbox, "my_data", "core_configuration.yml")
+    with open(config_file) as f:
+        config = yaml.safe_load(f)
+    config["server"] = dict(config.get("server") or {}, mode=mode)
+    with open(config_file, "w") as f:
+        yaml.safe_dump(config, f)
+
+def start_gunicorn(sandbox, workers, timeout=30):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [bench_common.PROJECT_ROOT, os.environ.get("PYTHONPATH")])))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(bench_common.PROJECT_ROOT, "gunicorn.conf.py"),
+         "-w", str(workers), "-b", f"127.0.0.1:{port}", "--timeout", "120", "app:app"],
+        cwd=sandbox, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited during startup:\n{process.stderr.read()}")
+        try:
+            requests.get(f"{base_url}/login", timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("gunicorn did not start in time.")
+
+def submit_ticket(base_url, index):
+    return requests.post(f"{base_url}/", data={
+        "cf-turnstile-response": "bench",
+        "requestor_name": "Bench Requestor",
+        "requestor_email": f"bench{index}@example.com",
+        "ticket_subject": f"Async benchmark ticket {index}",
+        "ticket_message": "Printer on fire.",
+        "request_type": "Incident",
+        "ticket_impact": "Low",
+        "ticket_urgency": "Low",
+    }, allow_redirects=False, timeout=120)
+
+def login(base_url, index):
+    return requests.post(f"{base_url}/login", data={"tech_username_box": "demouser", "tech_password_box": "NoPassword123"}, allow_redirects=False, timeout=120)
+
+def ingest(base_url, index):
+    kuma_payload = {"heartbeat": {"status": 0, "msg": "Connection refused"}, "monitor": {"name": f"bench-{index % 10}", "url": "https://bench.example.org"}}
+    return requests.post(f"{base_url}/api/uptime-kuma", json=kuma_payload, timeout=120)
+
+ROUTES = {"POST / (submit)": submit_ticket, "POST /login": login, "POST /api/uptime-kuma": ingest}
+
+def run_mode(mode, sandbox, args):
+    set_server_mode(sandbox, mode)
+    process, base_url = start_gunicorn(sandbox, args.workers)
+    recorder = LatencyRecorder()
+    route_names = [name for name in ROUTES if name in args.routes]
+
+    def one_request(index):
+        route = route_names[index % len(route_names)]
+        start = time.perf_counter()
+        try:
+            response = ROUTES[route](base_url, index)
+            ok = response.status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        recorder.record(route, time.perf_counter() - start, ok)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one_request, range(args.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    summary = recorder.summary()
+    print(f"\n{mode} mode: {args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s) with {args.workers} workers")
+    print(f"{'Route':<26} {'Count':>6} {'Errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for row in summary:
+        print(f"{row['route']:<26} {row['count']:>6} {row['errors']:>6} {row['p50_s'] * 1000:9.1f} {row['p95_s'] * 1000:9.1f} {row['max_s'] * 1000:9.1f}")
+    return {"name": f"{mode} mode", "mode": mode, "total_s": elapsed, "requests_per_s": args.requests / elapsed, "routes": summary}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare GoobyDesk sync and async serving modes under upstream latency.")
+    parser.add_argument("--modes", default="sync,async", help="Comma separated server modes to run.")
+    parser.add_argument("--workers", type=int, default=3, help="gunicorn worker processes (the systemd unit uses 3).")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent client connections.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode, spread over the routes.")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma separated routes to exercise.")
+    parser.add_argument("--tickets", type=int, default=1000, help="Synthetic tickets preloaded into the database.")
+    parser.add_argument("--turnstile-latency", type=float, default=0.5, help="Injected Turnstile latency in seconds.")
+    parser.add_argument("--smtp-latency", type=float, default=0.2, help="Injected SMTP latency in seconds.")
+    parser.add_argument("--webhook-latency", type=float, default=0.2, help="Injected Discord/Slack latency in seconds.")
+    parser.add_argument("--output", default="bench_async.json", help="Machine-readable results file.")
+    args = parser.parse_args()
+    output_file = os.path.abspath(args.output)
+
+    standins = StandIns(
+        turnstile_faults=FaultInjection(latency_s=args.turnstile_latency),
+        discord_faults=FaultInjection(latency_s=args.webhook_latency),
+        slack_faults=FaultInjection(latency_s=args.webhook_latency),
+        smtp_faults=FaultInjection(latency_s=args.smtp_latency),
+    )
+    overrides = standins.config_overrides()
+    overrides["api_rate_limit"] = {"enabled": False}
+    sandbox = bench_common.prepare_sandbox(overrides, bench_common.generate_tickets(args.tickets))
+    with open(os.path.join(sandbox, ".env"), "a") as f:
+        f.write("EMAIL_PASSWORD=bench\n")
+
+    results = []
+    for mode in (mode.strip() for mode in args.modes.split(",") if mode.strip()):
+        if mode == "async" and subprocess.run([sys.executable, "-c", "import gevent"], capture_output=True).returncode != 0:
+            print("\nSkipping async mode: gevent is not installed (pip install gevent).")
+            continue
+        results.append(run_mode(mode, sandbox, args))
+
+    standin_stats = standins.stats()
+    standins.shutdown()
+    bench_common.write_results(output_file, "async_modes", dict(vars(args), standins=standin_stats), results)
+
+if __name__ == "__main__":
+    main()
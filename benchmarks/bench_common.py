@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Shared helpers for the GoobyDesk benchmarks: synthetic tickets, a throwaway my_data sandbox and result files.
+import os
+import sys
+import json
+import random
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_STATUS_MIX = {"Open": 0.15, "In-Progress": 0.10, "Closed": 0.75}
+REQUEST_TYPES = ["Incident", "Request", "Change", "Question"]
+IMPACTS = ["Low", "Medium", "High"]
+URGENCIES = ["Low", "Medium", "High", "Planning"]
+TECHNICIANS = ["demouser", "otheruser", "nightshift"]
+
+# Build one ticket in the same schema app.py writes.
+def make_ticket(rng, ticket_index, submitted_at, status, note_count, note_chars):
+    ticket = {
+        "ticket_number": f"TKT-{submitted_at.year}-{str(ticket_index).zfill(4)}",
+        "requestor_name": f"Requestor {ticket_index % 500}",
+        "requestor_email": f"user{ticket_index % 500}@example.com",
+        "ticket_subject": f"Synthetic ticket {ticket_index}",
+        "ticket_message": "Lorem ipsum dolor sit amet. " * rng.randint(1, 8),
+        "request_type": rng.choice(REQUEST_TYPES),
+        "ticket_impact": rng.choice(IMPACTS),
+        "ticket_urgency": rng.choice(URGENCIES),
+        "ticket_status": status,
+        "submission_date": submitted_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "ticket_notes": [
+            {"ticket_message": "x" * note_chars} if n % 2 else "n" * note_chars
+            for n in range(note_count)
+        ],
+    }
+    if status == "Closed":
+        closed_at = submitted_at + timedelta(minutes=rng.randint(5, 60 * 24 * 14))
+        ticket["closed_by"] = rng.choice(TECHNICIANS)
+        ticket["closure_date"] = closed_at.strftime("%Y-%m-%d %H:%M:%S")
+    return ticket
+
+# Tickets are spread evenly over `years` of history ending now, oldest first like the real database.
+def generate_tickets(count, notes_per_ticket=2, note_chars=120, status_mix=None, years=3, seed=42):
+    rng = random.Random(seed)
+    status_mix = status_mix or DEFAULT_STATUS_MIX
+    statuses = list(status_mix)
+    weights = [status_mix[s] for s in statuses]
+    end = datetime.now()
+    start = end - timedelta(days=365 * years)
+    step = (end - start) / max(count, 1)
+    tickets = []
+    per_year_counter = {}
+    for i in range(count):
+        submitted_at = start + step * i
+        per_year_counter[submitted_at.year] = per_year_counter.get(submitted_at.year, 0) + 1
+        status = rng.choices(statuses, weights)[0]
+        note_count = rng.randint(0, notes_per_ticket * 2)
+        tickets.append(make_ticket(rng, per_year_counter[submitted_at.year], submitted_at, status, note_count, note_chars))
+    return tickets
+
+# Parse "Open=0.2,Closed=0.8" from the command line.
+def parse_status_mix(value):
+    if not value:
+        return None
+    return {name: float(weight) for name, weight in (pair.split("=") for pair in value.split(","))}
+
+# Create a throwaway working directory with my_data/ and .env, then chdir into it.
+# The local_* modules read ./my_data/core_configuration.yml, so this must run before importing them.
+def prepare_sandbox(config_overrides=None, tickets=None):
+    sandbox = tempfile.mkdtemp(prefix="goobydesk-bench-")
+    os.makedirs(os.path.join(sandbox, "my_data"))
+
+    with open(os.path.join(PROJECT_ROOT, "template_configuration.yml")) as f:
+        config = yaml.safe_load(f)
+    config["logging"]["file"] = os.path.join(sandbox, "goobydesk.log")
+    config["logging"]["level"] = "WARNING"
+    for section, values in (config_overrides or {}).items():
+        if isinstance(values, dict):
+            config.setdefault(section, {}).update(values)
+        else:
+            config[section] = values
+    with open(os.path.join(sandbox, "my_data", "core_configuration.yml"), "w") as f:
+        yaml.safe_dump(config, f)
+
+    with open(os.path.join(PROJECT_ROOT, "example_employee.json")) as f:
+        employees = f.read()
+    with open(os.path.join(sandbox, "my_data", "employee.json"), "w") as f:
+        f.write(employees)
+    with open(os.path.join(sandbox, "my_data", "tickets.json"), "w") as f:
+        json.dump(tickets or [], f)
+    with open(os.path.join(sandbox, ".env"), "w") as f:
+        f.write("CF_TURNSTILE_SITE_KEY=bench\nCF_TURNSTILE_SECRET_KEY=bench\nFLASKAPP_SECRET_KEY=bench\n")
+
+    os.chdir(sandbox)
+    return sandbox
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+# Results are JSON so runs can be diffed across versions.
+def write_results(output_file, suite, parameters, results):
+    document = {
+        "suite": suite,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(output_file, "w") as f:
+        json.dump(document, f, indent=4)
+    print(f"\nResults written to {output_file}")
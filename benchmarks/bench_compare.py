@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Compare two benchmark result files written by bench_hot_paths.py.
+# Usage: python3 benchmarks/bench_compare.py baseline.json candidate.json
+import sys
+import json
+
+def key_metric(result):
+    # Throughput entries report total time; everything else reports a median.
+    return result.get("median_s", result.get("mean_s"))
+
+def main():
+    if len(sys.argv) != 3:
+        print(f"Usage: {sys.argv[0]} <baseline.json> <candidate.json>")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        baseline = json.load(f)
+    with open(sys.argv[2]) as f:
+        candidate = json.load(f)
+
+    print(f"Baseline:  {baseline['git_revision']} ({baseline['timestamp']})")
+    print(f"Candidate: {candidate['git_revision']} ({candidate['timestamp']})\n")
+    baseline_results = {r["name"]: r for r in baseline["results"]}
+    for result in candidate["results"]:
+        before = baseline_results.get(result["name"]) or {}
+        after_s = key_metric(result)
+        if after_s is None:
+            # Page weight entries carry byte counts (identity_bytes, gzip_bytes, ...) instead of timings.
+            for key in (key for key in result if key.endswith("_bytes")):
+                label = f"{result['name']} ({key[:-6]})"
+                if key not in before:
+                    print(f"{label:<44} {result[key]:>12,} B  (new)")
+                    continue
+                change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                print(f"{label:<44} {before[key]:>12,} B -> {result[key]:>12,} B  ({change:+6.1f}%)")
+            continue
+        before_s = key_metric(before)
+        if before_s is None:
+            print(f"{result['name']:<28} {after_s * 1000:9.2f} ms  (new)")
+            continue
+        change = (after_s - before_s) / before_s * 100 if before_s else 0.0
+        print(f"{result['name']:<28} {before_s * 1000:9.2f} ms -> {after_s * 1000:9.2f} ms  ({change:+6.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Storage, rendering and ingest hot paths measured against a synthetic ticket database.
+# Usage: python3 benchmarks/bench_hot_paths.py [--tickets 10000] [--notes 2] [--note-chars 120]
+#        [--status-mix Open=0.15,In-Progress=0.1,Closed=0.75] [--output bench_hot_paths.json]
+import os
+import time
+import argparse
+import statistics
+
+import bench_common
+
+def measure(name, func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "median_s": statistics.median(samples),
+        "max_s": max(samples),
+    }
+    print(f"{name:<28} median {result['median_s'] * 1000:9.2f} ms  min {result['min_s'] * 1000:9.2f} ms  ({iterations} runs)")
+    return result
+
+def expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"Unexpected HTTP {response.status_code} during benchmark.")
+    return response
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GoobyDesk hot paths.")
+    parser.add_argument("--tickets", type=int, default=10000, help="Synthetic tickets in the database.")
+    parser.add_argument("--notes", type=int, default=2, help="Average notes per ticket.")
+    parser.add_argument("--note-chars", type=int, default=120, help="Characters per note.")
+    parser.add_argument("--status-mix", default=None, help="Weights per status, e.g. Open=0.2,Closed=0.8")
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per measurement.")
+    parser.add_argument("--ingest-requests", type=int, default=200, help="POSTs for the ingest throughput test.")
+    parser.add_argument("--output", default="bench_hot_paths.json", help="Machine-readable results file.")
+    args = parser.parse_args()
+    output_file = os.path.abspath(args.output)
+
+    tickets = bench_common.generate_tickets(args.tickets, args.notes, args.note_chars, bench_common.parse_status_mix(args.status_mix))
+    # Rate limiting would measure the limiter rather than the ingest path.
+    bench_common.prepare_sandbox({"api_rate_limit": {"enabled": False}}, tickets)
+
+    import app, local_ticket_store, local_ticket_analytics
+    client = app.create_app().test_client()
+    with client.session_transaction() as tech_session:
+        tech_session["technician"] = "demouser"
+    sample_ticket = tickets[len(tickets) // 2]["ticket_number"]
+    sample_email = tickets[len(tickets) // 2]["requestor_email"]
+
+    results = [
+        measure("load_tickets", local_ticket_store.load_tickets, args.iterations),
+        measure("save_tickets", lambda: local_ticket_store.save_tickets(tickets), args.iterations),
+        measure("generate_ticket_number", local_ticket_store.generate_ticket_number, args.iterations),
+        measure("GET /dashboard", lambda: expect_ok(client.get("/dashboard")), args.iterations),
+        measure("GET /ticket/<number>", lambda: expect_ok(client.get(f"/ticket/{sample_ticket}")), args.iterations),
+        measure("requester lookup (scan)", lambda: [ticket for ticket in local_ticket_store.iter_tickets() if ticket.get("requestor_email") == sample_email], args.iterations),
+        measure("requester lookup (index)", lambda: local_ticket_store.tickets_for_requester(sample_email), args.iterations),
+        measure("GET /dashboard/queue", lambda: expect_ok(client.get("/dashboard/queue")), args.iterations),
+        measure("GET /reports/", lambda: expect_ok(client.get("/reports/")), args.iterations),
+        measure("analytics column build", lambda: local_ticket_analytics.TicketColumns().update_from(tickets), args.iterations),
+        measure("GET /reports/analytics.json", lambda: expect_ok(client.get("/reports/analytics.json")), args.iterations),
+        measure("GET /reports/export/csv", lambda: expect_ok(client.get("/reports/export/csv")), args.iterations),
+        measure("GET /changes/export/csv", lambda: expect_ok(client.get("/changes/export/csv")), args.iterations),
+    ]
+
+    # Bytes on the wire per page, uncompressed and with each encoding the server offers.
+    for path in ("/dashboard", "/reports/", "/reports/analytics.json", "/reports/export/csv"):
+        page_weight = {"name": f"page weight {path}"}
+        for encoding in ("identity", "gzip", "br"):
+            response = expect_ok(client.get(path, headers={"Accept-Encoding": encoding}))
+            if encoding != "identity" and response.headers.get("Content-Encoding") != encoding:
+                continue
+            page_weight[f"{encoding}_bytes"] = len(response.get_data())
+        results.append(page_weight)
+        print(f"{page_weight['name']:<40} " + "  ".join(f"{key[:-6]} {value:,} B" for key, value in page_weight.items() if key.endswith("_bytes")))
+
+    kuma_payload ={"heartbeat": {"status": 0, "msg": "Connection refused"}, "monitor": {"name": "bench", "url": "https://bench.example.org"}}
+    start = time.perf_counter()
+    for _ in range(args.ingest_requests):
+        expect_ok(client.post("/api/uptime-kuma", json=kuma_payload))
+    elapsed = time.perf_counter() - start
+    results.append({
+        "name": "POST /api/uptime-kuma",
+        "iterations": args.ingest_requests,
+        "total_s": elapsed,
+        "requests_per_s": args.ingest_requests / elapsed,
+        "mean_s": elapsed / args.ingest_requests,
+    })
+    print(f"{'POST /api/uptime-kuma':<28} {args.ingest_requests / elapsed:9.1f} req/s  ({args.ingest_requests} requests)")
+
+    parameters = dict(vars(args), tickets_file_bytes=sum(os.path.getsize(path) for path in local_ticket_store.store_files()), buildid=app.BUILDID)
+    bench_common.write_results(output_file, "hot_paths", parameters, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Load/save time and file size of each ticket storage format.
+# Usage: python3 benchmarks/bench_serializer.py [--sizes 10000,100000,1000000] [--output serializer.json]
+import os
+import time
+import argparse
+
+import bench_common
+
+def time_call(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GoobyDesk ticket storage formats.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated ticket counts.")
+    parser.add_argument("--notes", type=int, default=2, help="Average notes per ticket.")
+    parser.add_argument("--note-chars", type=int, default=120, help="Characters per note.")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing.")
+    parser.add_argument("--output", default="bench_serializer.json", help="Machine-readable results file.")
+    args = parser.parse_args()
+    output_file = os.path.abspath(args.output)
+
+    sandbox = bench_common.prepare_sandbox()
+    import local_ticket_serializer
+
+    formats = ["json-pretty", "json"]
+    if local_ticket_serializer.orjson is not None:
+        formats.append("orjson")
+    if local_ticket_serializer.msgpack is not None:
+        formats.append("msgpack")
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        tickets = bench_common.generate_tickets(size, args.notes, args.note_chars)
+        for storage_format in formats:
+            tickets_file = os.path.join(sandbox, "my_data", f"tickets.{storage_format}")
+            save_s = time_call(lambda: local_ticket_serializer.write_tickets_file(tickets_file, tickets, storage_format), args.repeat)
+            load_s = time_call(lambda: local_ticket_serializer.read_tickets_file(tickets_file), args.repeat)
+            file_bytes = os.path.getsize(tickets_file)
+            os.remove(tickets_file)
+            results.append({"tickets": size, "format": storage_format, "save_s": save_s, "load_s": load_s, "file_bytes": file_bytes})
+            print(f"{size:>9} {storage_format:<12} save {save_s * 1000:9.1f} ms  load {load_s * 1000:9.1f} ms  size {file_bytes / 1048576:8.1f} MiB")
+        del tickets
+
+    bench_common.write_results(output_file, "serializer", vars(args), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Cold-start cost of a GoobyDesk worker: import, create_app(), first request, and fork-to-first-response
+# for a pre-forked (gunicorn preload_app) worker. Every run is a fresh interpreter.
+# Usage: python3 benchmarks/bench_startup.py [--runs 10] [--tickets 10000] [--output bench_startup.json]
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+import bench_common
+
+# Runs inside the child interpreter from the sandbox directory and prints one JSON line of timings in seconds.
+PROBE = r"""
+import os, json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+flask_app.test_client().get("/")
+first_request = time.perf_counter()
+timings = {"import_s": imported - start, "create_app_s": created - imported, "first_request_s": first_request - created}
+
+if hasattr(os, "fork"):
+    read_fd, write_fd = os.pipe()
+    fork_start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        app.start_background_workers()
+        flask_app.test_client().get("/")
+        os.write(write_fd, b"x")
+        os._exit(0)
+    os.read(read_fd, 1)
+    timings["fork_to_first_response_s"] = time.perf_counter() - fork_start
+    os.waitpid(pid, 0)
+print(json.dumps(timings))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GoobyDesk worker startup.")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start.")
+    parser.add_argument("--tickets", type=int, default=10000, help="Synthetic tickets in the database.")
+    parser.add_argument("--output", default="bench_startup.json", help="Machine-readable results file.")
+    args = parser.parse_args()
+    output_file = os.path.abspath(args.output)
+
+    tickets = bench_common.generate_tickets(args.tickets)
+    sandbox = bench_common.prepare_sandbox({"email": {"enabled": False}}, tickets)
+    child_env = dict(os.environ, PYTHONPATH=bench_common.PROJECT_ROOT)
+
+    samples = {}
+    for _ in range(args.runs):
+        probe = subprocess.run([sys.executable, "-c", PROBE], cwd=sandbox, env=child_env, capture_output=True, text=True, check=True)
+        for name, seconds in json.loads(probe.stdout.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(seconds)
+
+    results = []
+    for name, values in samples.items():
+        results.append({
+            "name": name,
+            "runs": len(values),
+            "min_s": min(values),
+            "median_s": statistics.median(values),
+            "max_s": max(values),
+        })
+        print(f"{name:<26} median {statistics.median(values) * 1000:9.2f} ms  min {min(values) * 1000:9.2f} ms  ({len(values)} runs)")
+
+    bench_common.write_results(output_file, "startup", vars(args), results)
+
+if __name__ == "__main__":
+    main()
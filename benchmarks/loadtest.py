@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# End-to-end load test. Starts local stand-ins for Turnstile, Discord, Slack, SMTP and IMAP, serves GoobyDesk
+# over real HTTP on localhost, drives mixed traffic at fixed (open-loop) rates and reports per-route latency.
+# Usage: python3 benchmarks/loadtest.py --duration 60 --submit-rate 2 --browse-rate 10 --webhook-latency 0.2
+import os
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+import requests
+
+import bench_common
+from loadtest_standins import FaultInjection, StandIns
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, elapsed_s, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed_s)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    @staticmethod
+    def percentile(sorted_samples, pct):
+        index = max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples) + 0.5) - 1))
+        return sorted_samples[index]
+
+    def summary(self):
+        summary = []
+        with self._lock:
+            for route, samples in sorted(self.samples.items()):
+                ordered = sorted(samples)
+                summary.append({
+                    "route": route,
+                    "count": len(ordered),
+                    "errors": self.errors.get(route, 0),
+                    "p50_s": self.percentile(ordered, 50),
+                    "p95_s": self.percentile(ordered, 95),
+                    "p99_s": self.percentile(ordered, 99),
+                    "max_s": ordered[-1],
+                })
+        return summary
+
+class TrafficDriver:
+    """Fires each traffic class on its own schedule into a shared worker pool and times every request."""
+
+    def __init__(self, base_url, recorder, ticket_numbers, workers, tech_username, tech_password):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.ticket_numbers = ticket_numbers
+        self.tech_username = tech_username
+        self.tech_password = tech_password
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.stop_event = threading.Event()
+        self._local = threading.local()
+        self._schedulers = []
+
+    def _public_session(self):
+        if not hasattr(self._local, "public"):
+            self._local.public = requests.Session()
+        return self._local.public
+
+    def _tech_session(self):
+        if not hasattr(self._local, "tech"):
+            tech_session = requests.Session()
+            tech_session.post(f"{self.base_url}/login", data={"tech_username_box": self.tech_username, "tech_password_box": self.tech_password}, allow_redirects=False)
+            self._local.tech = tech_session
+        return self._local.tech
+
+    def _timed(self, route, func):
+        start = time.perf_counter()
+        try:
+            response = func()
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        self.recorder.record(route, time.perf_counter() - start, ok)
+
+    # For in-process work (IMAP sync) that has no HTTP response.
+    def timed_call(self, label, func):
+        start = time.perf_counter()
+        try:
+            func()
+            ok = True
+        except Exception:
+            ok = False
+        self.recorder.record(label, time.perf_counter() - start, ok)
+
+    # Open-loop schedule: requests are fired on time even if earlier ones are still running.
+    def every(self, rate_per_s, task):
+        if rate_per_s <= 0:
+            return
+        def schedule():
+            interval = 1.0 / rate_per_s
+            next_fire = time.perf_counter()
+            while not self.stop_event.is_set():
+                self.pool.submit(task)
+                next_fire += interval
+                delay = next_fire - time.perf_counter()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+        scheduler = threading.Thread(target=schedule, daemon=True)
+        self._schedulers.append(scheduler)
+        scheduler.start()
+
+    def submit_ticket(self):
+        form = {
+            "cf-turnstile-response": "loadtest-token",
+            "requestor_name": "Load Test",
+            "requestor_email": f"user{random.randint(1, 500)}@example.com",
+            "ticket_subject": "Load test submission",
+            "ticket_message": "The printer is on fire again.",
+            "request_type": "Incident",
+            "ticket_impact": "Low",
+            "ticket_urgency": "Low",
+        }
+        self._timed("POST /", lambda: self._public_session().post(f"{self.base_url}/", data=form, allow_redirects=False))
+
+    # Technician sessions log in on first use, outside the timed region.
+    def browse_dashboard(self):
+        tech_session = self._tech_session()
+        self._timed("GET /dashboard", lambda: tech_session.get(f"{self.base_url}/dashboard"))
+
+    def browse_ticket(self):
+        tech_session = self._tech_session()
+        ticket_number = random.choice(self.ticket_numbers)
+        self._timed("GET /ticket/<number>", lambda: tech_session.get(f"{self.base_url}/ticket/{ticket_number}"))
+
+    def change_status(self):
+        ticket_number = random.choice(self.ticket_numbers)
+        new_status = random.choice(["In-Progress", "Closed"])
+        tech_session = self._tech_session()
+        self._timed("POST /ticket/<number>/update_status", lambda: tech_session.post(f"{self.base_url}/ticket/{ticket_number}/update_status/{new_status}"))
+
+    def ingest_burst(self, burst_size):
+        payload = {"heartbeat": {"status": 0, "msg": "Connection refused"}, "monitor": {"name": "loadtest", "url": "https://loadtest.example.org"}}
+        for _ in range(burst_size):
+            self.pool.submit(self._timed, "POST /api/uptime-kuma", lambda: self._public_session().post(f"{self.base_url}/api/uptime-kuma", json=payload))
+
+    def stop(self):
+        self.stop_event.set()
+        for scheduler in self._schedulers:
+            scheduler.join()
+        self.pool.shutdown(wait=True)
+
+def deliver_reply(mailbox, ticket_numbers):
+    ticket_number = random.choice(ticket_numbers)
+    reply = MIMEText("Any update on this? It is still broken.")
+    reply["Subject"] = f"RE: {ticket_number} - Synthetic ticket"
+    reply["From"] = "requestor@example.com"
+    reply["To"] = "helpdesk@loadtest.example.org"
+    mailbox.deliver(reply.as_bytes())
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end GoobyDesk load test with local stand-ins.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic.")
+    parser.add_argument("--tickets", type=int, default=2000, help="Synthetic tickets preloaded into the database.")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent client threads.")
+    parser.add_argument("--submit-rate", type=float, default=1.0, help="Public ticket submissions per second.")
+    parser.add_argument("--browse-rate", type=float, default=5.0, help="Technician dashboard + ticket views per second.")
+    parser.add_argument("--status-rate", type=float, default=1.0, help="Technician status changes per second.")
+    parser.add_argument("--ingest-burst-size", type=int, default=20, help="Uptime Kuma POSTs per burst.")
+    parser.add_argument("--ingest-burst-interval", type=float, default=10.0, help="Seconds between ingest bursts (0 disables).")
+    parser.add_argument("--reply-rate", type=float, default=0.5, help="Incoming email replies per second.")
+    parser.add_argument("--imap-interval", type=float, default=5.0, help="Seconds between IMAP sync cycles.")
+    parser.add_argument("--turnstile-latency", type=float, default=0.05, help="Injected Turnstile latency in seconds.")
+    parser.add_argument("--webhook-latency", type=float, default=0.1, help="Injected Discord/Slack latency in seconds.")
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0, help="Fraction of webhook calls that fail.")
+    parser.add_argument("--webhook-error-status", type=int, default=500, help="HTTP status for injected webhook failures (e.g. 429).")
+    parser.add_argument("--smtp-latency", type=float, default=0.1, help="Injected SMTP latency in seconds.")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep /api rate limiting enabled.")
+    parser.add_argument("--output", default="loadtest.json", help="Machine-readable results file.")
+    args = parser.parse_args()
+    output_file = os.path.abspath(args.output)
+
+    webhook_faults = dict(latency_s=args.webhook_latency, error_rate=args.webhook_error_rate, error_status=args.webhook_error_status)
+    standins = StandIns(
+        turnstile_faults=FaultInjection(latency_s=args.turnstile_latency),
+        discord_faults=FaultInjection(**webhook_faults),
+        slack_faults=FaultInjection(**webhook_faults),
+        smtp_faults=FaultInjection(latency_s=args.smtp_latency),
+    )
+    overrides = standins.config_overrides()
+    if not args.rate_limit:
+        overrides["api_rate_limit"] = {"enabled": False}
+
+    tickets = bench_common.generate_tickets(args.tickets)
+    ticket_numbers = [t["ticket_number"] for t in tickets]
+    bench_common.prepare_sandbox(overrides, tickets)
+    os.environ.setdefault("EMAIL_PASSWORD", "loadtest")
+
+    from werkzeug.serving import make_server
+    import app
+    import local_email_handler
+    flask_app = app.create_app()
+    flask_app.config["SESSION_COOKIE_SECURE"] = False # Plain HTTP on localhost.
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"GoobyDesk under test at {base_url} with {args.tickets} tickets for {args.duration:.0f}s")
+
+    recorder = LatencyRecorder()
+    driver = TrafficDriver(base_url, recorder, ticket_numbers, args.workers, "demouser", "NoPassword123")
+    driver.every(args.submit_rate, driver.submit_ticket)
+    driver.every(args.browse_rate / 2, driver.browse_dashboard)
+    driver.every(args.browse_rate / 2, driver.browse_ticket)
+    driver.every(args.status_rate, driver.change_status)
+    driver.every(args.reply_rate, lambda: deliver_reply(standins.mailbox, ticket_numbers))
+    if args.ingest_burst_interval > 0:
+        driver.every(1.0 / args.ingest_burst_interval, lambda: driver.ingest_burst(args.ingest_burst_size))
+    if args.imap_interval > 0:
+        driver.every(1.0 / args.imap_interval, lambda: driver.timed_call("IMAP sync cycle", local_email_handler.fetch_email_replies))
+
+    time.sleep(args.duration)
+    driver.stop()
+    server.shutdown()
+
+    summary = recorder.summary()
+    print(f"\n{'Route':<38} {'Count':>6} {'Errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in summary:
+        print(f"{row['route']:<38} {row['count']:>6} {row['errors']:>6} {row['p50_s'] * 1000:9.1f} {row['p95_s'] * 1000:9.1f} {row['p99_s'] * 1000:9.1f}")
+
+    standin_stats = standins.stats()
+    standins.shutdown()
+    bench_common.write_results(output_file, "loadtest", dict(vars(args), standins=standin_stats), summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# Local stand-ins for every external service GoobyDesk talks to, for load testing without touching the internet.
+# Cloudflare Turnstile, Discord and Slack are small HTTP servers; SMTP and IMAP are minimal plaintext servers
+# that implement just enough of each protocol for smtplib and imaplib.
+import json
+import time
+import random
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FaultInjection:
+    """Latency and error settings shared by a stand-in. Mutable while the load test runs."""
+
+    def __init__(self, latency_s=0.0, jitter_s=0.0, error_rate=0.0, error_status=500):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    # Sleeps for the configured latency. Returns True when this call should fail.
+    def apply(self):
+        delay = self.latency_s + (random.uniform(0, self.jitter_s) if self.jitter_s else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+        return failed
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "injected_errors": self.errors}
+
+# -----------------------------------------------------
+# HTTP STAND-INS (Turnstile, Discord, Slack)
+class _StandInHTTPHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        faults = self.server.faults
+        if faults.apply():
+            self.send_response(faults.error_status)
+            if faults.error_status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+
+        body = self.server.success_body
+        self.send_response(self.server.success_status)
+        if body is not None:
+            encoded = json.dumps(body).encode()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        else:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def _start_http_standin(faults, success_status, success_body):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHTTPHandler)
+    server.daemon_threads = True
+    server.faults = faults
+    server.success_status = success_status
+    server.success_body = success_body
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# -----------------------------------------------------
+# SMTP STAND-IN (plaintext, accepts any AUTH)
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def send_line(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.send_line("220 goobydesk-loadtest ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="ignore").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.send_line("250-goobydesk-loadtest")
+                self.send_line("250-AUTH PLAIN LOGIN")
+                self.send_line("250 OK")
+            elif verb == "AUTH":
+                self.send_line("235 Authentication successful")
+            elif verb == "DATA":
+                self.send_line("354 End data with <CR><LF>.<CR><LF>")
+                message_lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b".\r\n":
+                        break
+                    message_lines.append(data_line)
+                if self.server.faults.apply():
+                    self.send_line("451 Injected failure")
+                else:
+                    self.server.messages.append(b"".join(message_lines))
+                    self.send_line("250 Message accepted")
+            elif verb == "QUIT":
+                self.send_line("221 Bye")
+                return
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.send_line("250 OK")
+            else:
+                self.send_line("502 Command not implemented")
+
+# -----------------------------------------------------
+# IMAP STAND-IN (plaintext; LOGIN, SELECT, SEARCH UNSEEN, FETCH RFC822, LOGOUT)
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    def send_line(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        mailbox = self.server.mailbox
+        self.send_line("* OK [CAPABILITY IMAP4rev1] goobydesk-loadtest ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode(errors="ignore").strip().split(" ")
+            if len(parts) < 2:
+                continue
+            tag, verb, args = parts[0], parts[1].upper(), parts[2:]
+            if verb == "CAPABILITY":
+                self.send_line("* CAPABILITY IMAP4rev1 AUTH=PLAIN")
+                self.send_line(f"{tag} OK CAPABILITY completed")
+            elif verb == "LOGIN":
+                self.send_line(f"{tag} OK LOGIN completed")
+            elif verb == "SELECT":
+                self.send_line(f"* {mailbox.count()} EXISTS")
+                self.send_line(f"{tag} OK [READ-WRITE] SELECT completed")
+            elif verb == "SEARCH":
+                self.server.faults.apply()
+                unseen = " ".join(str(i) for i in mailbox.unseen_ids())
+                self.send_line(f"* SEARCH {unseen}".rstrip())
+                self.send_line(f"{tag} OK SEARCH completed")
+            elif verb == "FETCH":
+                message = mailbox.fetch(int(args[0]))
+                if message is None:
+                    self.send_line(f"{tag} NO No such message")
+                    continue
+                self.wfile.write(f"* {args[0]} FETCH (RFC822 {{{len(message)}}}\r\n".encode() + message + b")\r\n")
+                self.send_line(f"{tag} OK FETCH completed")
+            elif verb == "LOGOUT":
+                self.send_line("* BYE Logging out")
+                self.send_line(f"{tag} OK LOGOUT completed")
+                return
+            else:
+                self.send_line(f"{tag} OK {verb} completed")
+
+class Mailbox:
+    """Thread-safe inbox. Messages are marked seen when fetched, like a real IMAP server."""
+
+    def __init__(self):
+        self._messages = []
+        self._lock = threading.Lock()
+
+    def deliver(self, raw_message: bytes):
+        with self._lock:
+            self._messages.append([raw_message, False])
+
+    def count(self):
+        with self._lock:
+            return len(self._messages)
+
+    def unseen_ids(self):
+        with self._lock:
+            return [i + 1 for i, (_, seen) in enumerate(self._messages) if not seen]
+
+    def fetch(self, message_id):
+        with self._lock:
+            if not 0 < message_id <= len(self._messages):
+                return None
+            self._messages[message_id - 1][1] = True
+            return self._messages[message_id - 1][0]
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def _start_tcp_standin(handler, **attributes):
+    server = _ThreadingTCPServer(("127.0.0.1", 0), handler)
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# -----------------------------------------------------
+# ALL STAND-INS
+class StandIns:
+    """Starts every stand-in on an ephemeral localhost port and builds the matching config overrides."""
+
+    def __init__(self, turnstile_faults=None, discord_faults=None, slack_faults=None, smtp_faults=None, imap_faults=None):
+        self.turnstile_faults = turnstile_faults or FaultInjection()
+        self.discord_faults = discord_faults or FaultInjection()
+        self.slack_faults = slack_faults or FaultInjection()
+        self.smtp_faults = smtp_faults or FaultInjection()
+        self.imap_faults = imap_faults or FaultInjection()
+        self.mailbox = Mailbox()
+        self.sent_messages = []
+
+        self.turnstile = _start_http_standin(self.turnstile_faults, 200, {"success": True})
+        self.discord = _start_http_standin(self.discord_faults, 204, None)
+        self.slack = _start_http_standin(self.slack_faults, 200, {"ok": True})
+        self.smtp = _start_tcp_standin(_SMTPHandler, faults=self.smtp_faults, messages=self.sent_messages)
+        self.imap = _start_tcp_standin(_IMAPHandler, faults=self.imap_faults, mailbox=self.mailbox)
+
+    @staticmethod
+    def _url(server):
+        return f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def config_overrides(self):
+        return {
+            "turnstile": {"verify_url": self._url(self.turnstile)},
+            "discord": {"enabled": True, "webhook_url": self._url(self.discord)},
+            "slack": {"enabled": True, "webhook_url": self._url(self.slack)},
+            "email": {
+                "enabled": True,
+                "account": "helpdesk@loadtest.example.org",
+                "imap_server": "127.0.0.1",
+                "imap_port": self.imap.server_address[1],
+                "imap_ssl": False,
+                "smtp_server": "127.0.0.1",
+                "smtp_port": self.smtp.server_address[1],
+                "smtp_starttls": False,
+            },
+        }
+
+    def stats(self):
+        return {
+            "turnstile": self.turnstile_faults.stats(),
+            "discord": self.discord_faults.stats(),
+            "slack": self.slack_faults.stats(),
+            "smtp": dict(self.smtp_faults.stats(), delivered=len(self.sent_messages)),
+            "imap": dict(self.imap_faults.stats(), mailbox=self.mailbox.count()),
+        }
+
+    def shutdown(self):
+        for server in (self.turnstile, self.discord, self.slack, self.smtp, self.imap):
+            server.shutdown()
+            server.server_close()
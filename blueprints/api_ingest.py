@@ -1,28 +1,39 @@
 #!/usr/bin/env python3
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, session
 import json, logging
 from datetime import datetime
-import local_webhook_handler
+import local_webhook_handler, local_blob_store, local_metrics, local_logging
 from local_config_loader import load_core_config
+from local_rate_limiter import RateLimiter, client_ip
+from local_ticket_store import add_ticket, generate_ticket_number
+from local_ticket_model import Ticket
 
 core_yaml_config = load_core_config()
-LOG_LEVEL = core_yaml_config["logging"]["level"]
-LOG_FILE = core_yaml_config["logging"]["file"]
-
-logging.basicConfig(filename=LOG_FILE,level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),format="%(asctime)s - %(levelname)s - %(message)s")
-""" Above is the default logging configuration.
-Debug - Detailed information
-Info - Successes
-Warning - Unexpected events
-Error - Function failures
-Critical - Serious application failures
-"""
-api_ingest_bp = Blueprint('api_ingest', __name__, url_prefix='/api')
+RATE_LIMIT_CONFIG = core_yaml_config.get("api_rate_limit", {}) or {}
 
-# Importing from APP to avoid circular imports. There might be a better way for this.
-def get_tickets_functions():
-    from app import load_tickets, save_tickets, generate_ticket_number
-    return load_tickets, save_tickets, generate_ticket_number
+api_ingest_bp = Blueprint('api_ingest', __name__, url_prefix='/api')
+ingest_rate_limiter = RateLimiter.from_config(RATE_LIMIT_CONFIG)
+
+def get_client_ip():
+    return client_ip(request, RATE_LIMIT_CONFIG.get("trust_proxy_headers", False))
+
+# Token-bucket rate limiting for every POST ingest. Each route name (tailscale, uptime-kuma) is its own source.
+@api_ingest_bp.before_request
+def enforce_ingest_rate_limit():
+    if request.method != "POST":
+        return None
+
+    source = request.path.rsplit("/", 1)[-1] or "unknown"
+    client_ip = get_client_ip()
+    retry_after = ingest_rate_limiter.check(source, client_ip)
+    if retry_after:
+        logging.warning("API INGEST - Rate limit exceeded for source=%s ip=%s. Retry-After %ss.", source, client_ip, retry_after)
+        local_metrics.inc_counter("goobydesk_api_rate_limited_total", "Ingest requests rejected with HTTP 429.", source=source)
+        response = jsonify({"error": "Rate limit exceeded", "retry_after": retry_after})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+    return None
 
 # Status Endpoint at /api/status
 @api_ingest_bp.route("/status", methods=["GET"])
@@ -34,10 +45,16 @@ def api_status():
         "license_key": None
     }), 200
 
+# Rate limiter counters at /api/rate-limits. Technician session required.
+@api_ingest_bp.route("/rate-limits", methods=["GET"])
+def api_rate_limit_stats():
+    if not session.get("technician"):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(ingest_rate_limiter.stats()), 200
+
 @api_ingest_bp.route("/tailscale", methods=["POST"])
 def tailscale_webhook():
-    load_tickets, save_tickets, generate_ticket_number = get_tickets_functions()
-    TAILSCALE_NOTIFY_EMAIL = api_ingest_bp.config.get('TAILSCALE_NOTIFY_EMAIL', 'noreply@tailscale.example.org')
+    TAILSCALE_NOTIFY_EMAIL = current_app.config.get('TAILSCALE_NOTIFY_EMAIL') or 'noreply@tailscale.example.org'
     
     try:
         payload = request.json
@@ -46,34 +63,34 @@ def tailscale_webhook():
             return jsonify({"error": "Empty payload"}), 400
 
         formatted_ts_webhook_body = json.dumps(payload, indent=4)
+        # Raw payloads are kept in the blob store; the ticket holds a preview and a reference.
+        ticket_message, ticket_message_blob = local_blob_store.offload_text(formatted_ts_webhook_body)
 
         requestor_name = "Tailscale"
         requestor_email = TAILSCALE_NOTIFY_EMAIL
         ticket_subject = "Tailscale Notification"
-        ticket_message = formatted_ts_webhook_body
         ticket_impact = "Medium"
         ticket_urgency = "Medium"
         request_type = "Change"
         ticket_number = generate_ticket_number()
 
-        new_ticket = {
-            "ticket_number": ticket_number,
-            "requestor_name": requestor_name,
-            "requestor_email": requestor_email,
-            "ticket_subject": ticket_subject,
-            "ticket_message": ticket_message,
-            "request_type": request_type,
-            "ticket_impact": ticket_impact,
-            "ticket_urgency": ticket_urgency,
-            "ticket_status": "Open",
-            "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "ticket_notes": []
-        }
-
-        tickets = load_tickets()
-        tickets.append(new_ticket)
-        save_tickets(tickets)
-        logging.info(f"Tailscale Notification — {ticket_number} created successfully.")
+        new_ticket = Ticket(
+            ticket_number=ticket_number,
+            requestor_name=requestor_name,
+            requestor_email=requestor_email,
+            ticket_subject=ticket_subject,
+            ticket_message=ticket_message,
+            request_type=request_type,
+            ticket_impact=ticket_impact,
+            ticket_urgency=ticket_urgency,
+            ticket_status="Open",
+            submission_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        if ticket_message_blob:
+            new_ticket.ticket_message_blob = ticket_message_blob
+
+        add_ticket(new_ticket)
+        logging.info("Tailscale Notification — %s created successfully.", ticket_number)
 
         try:
             local_webhook_handler.notify_ticket_event(
@@ -81,26 +98,25 @@ def tailscale_webhook():
                 ticket_status="Open",
                 ticket_subject=ticket_subject
                 )
-            logging.info(f"API INGEST - Ticket {ticket_number} status notifications sent successfully.")
+            logging.info("API INGEST - Ticket %s status notifications queued.", ticket_number)
         except Exception as e:
-            logging.error(f"API INGEST - Failed to send ticket status update notifications for {ticket_number}: {str(e)}")
+            logging.error("API INGEST - Failed to send ticket status update notifications for %s: %s", ticket_number, e)
 
         return jsonify({"status": "success", "ticket": ticket_number}), 200
 
     except Exception as e:
-        logging.critical(f"API INGEST - Tailscale webhook error: {str(e)}")
+        logging.critical("API INGEST - Tailscale webhook error: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @api_ingest_bp.route("/uptime-kuma", methods=["POST"])
 def uptime_kuma_webhook():
-    load_tickets, save_tickets, generate_ticket_number = get_tickets_functions()
-    
     try:
         if not request.is_json:
             logging.warning("API INGEST -Uptime-Kuma webhook sent invalid content type.")
             return jsonify({"error": "Invalid content type"}), 400
         payload = request.json
-        logging.info(f"API INGEST -Uptime Kuma payload received: {payload}")
+        # Full payloads are DEBUG only and truncated to logging.max_payload_chars when written.
+        logging.debug("API INGEST -Uptime Kuma payload received: %s", local_logging.PayloadPreview(payload, "uptime-kuma"))
 
         heartbeat = payload.get("heartbeat", {})
         monitor = payload.get("monitor", {})
@@ -118,7 +134,7 @@ def uptime_kuma_webhook():
         }.get(status, "UNKNOWN")
 
         if status not in [0, 2]:
-            logging.info(f"API INGEST - Skipping ticket creation for {monitor_name} (status={status_text}).")
+            logging.info("API INGEST - Skipping ticket creation for %s (status=%s).", monitor_name, status_text)
             return jsonify({"status": "ignored", "reason": f"status {status_text} not tracked"}), 200
 
         if status == 0:
@@ -132,28 +148,27 @@ def uptime_kuma_webhook():
             ticket_urgency = "Medium"
             request_type = "Incident"
 
-        ticket_message = json.dumps(payload, indent=4)
+        ticket_message, ticket_message_blob = local_blob_store.offload_text(json.dumps(payload, indent=4))
         ticket_number = generate_ticket_number()
 
-        new_ticket = {
-            "ticket_number": ticket_number,
-            "requestor_name": "Uptime Kuma",
-            "requestor_email": "noreply@uptimekuma.example.org",
-            "ticket_subject": ticket_subject,
-            "ticket_message": ticket_message,
-            "request_type": request_type,
-            "ticket_impact": ticket_impact,
-            "ticket_urgency": ticket_urgency,
-            "ticket_status": "Open",
-            "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "ticket_notes": []
-        }
-
-        tickets = load_tickets()
-        tickets.append(new_ticket)
-        save_tickets(tickets)
-
-        logging.info(f"API INGEST -Uptime-Kuma Notification {ticket_number} created successfully (Status: {status_text}).")
+        new_ticket = Ticket(
+            ticket_number=ticket_number,
+            requestor_name="Uptime Kuma",
+            requestor_email="noreply@uptimekuma.example.org",
+            ticket_subject=ticket_subject,
+            ticket_message=ticket_message,
+            request_type=request_type,
+            ticket_impact=ticket_impact,
+            ticket_urgency=ticket_urgency,
+            ticket_status="Open",
+            submission_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        if ticket_message_blob:
+            new_ticket.ticket_message_blob = ticket_message_blob
+
+        add_ticket(new_ticket)
+
+        logging.info("API INGEST -Uptime-Kuma Notification %s created successfully (Status: %s).", ticket_number, status_text)
 
         try:
             local_webhook_handler.notify_ticket_event(
@@ -161,14 +176,14 @@ def uptime_kuma_webhook():
                 ticket_status="Open",
                 ticket_subject=ticket_subject
             )
-            logging.info(f"API INGEST -Ticket {ticket_number} status update notifications sent successfully.")
+            logging.info("API INGEST -Ticket %s status update notifications queued.", ticket_number)
         except Exception as e:
-            logging.error(f"API INGEST - Failed to send ticket status update notifications for {ticket_number}: {str(e)}")
+            logging.error("API INGEST - Failed to send ticket status update notifications for %s: %s", ticket_number, e)
 
         return jsonify({"status": "success", "ticket": ticket_number}), 200
 
     except Exception as e:
-        logging.critical(f"API INGEST - Uptime Kuma webhook error: {str(e)}")
+        logging.critical("API INGEST - Uptime Kuma webhook error: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 """
 @api_ingest_bp.route("/goobyddns", methods=["POST"])
@@ -184,8 +199,7 @@ new_ticket = {
             "ticket_impact": Low,
             "ticket_urgency": Low,
             "ticket_status": "Open",
-            "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "ticket_notes": []
+            "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 """
     
\ No newline at end of file
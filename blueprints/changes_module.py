@@ -1,94 +1,135 @@
 #!/usr/bin/env python3
-from flask import Blueprint, render_template, session, Response
-import io, csv, json, logging
-from functools import wraps
-from local_config_loader import load_core_config
-
-
-# CONFIG & LOGGING
-core_yaml_config = load_core_config()
-LOG_LEVEL = core_yaml_config["logging"]["level"]
-LOG_FILE = core_yaml_config["logging"]["file"]
-TICKETS_FILE = core_yaml_config["tickets_file"]
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s - %(levelname)s - %(message)s",)
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, Response
+import io, csv, logging, calendar
+from datetime import datetime, timedelta
+import local_change_store
+from local_authentication_handler import technician_required
 
 # BLUEPRINT
 changes_module_bp = Blueprint("changes", __name__, url_prefix="/changes")
 
-# Helpers
-def technician_required(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        # Session-based auth check
-        if not session.get("technician"):
-            # Unauthorized access attempt
-            return render_template("403.html"), 403
-        # Authorized technician → proceed to the route
-        return func(*args, **kwargs)
-    return wrapper
-
-def load_tickets():
-    try:
-        with open(TICKETS_FILE, "r") as tkt_file:
-            return json.load(tkt_file)
-    except FileNotFoundError:
-        logging.critical("Ticket JSON Database file could not be located.")
-        exit(1)
-        return [] # represents an empty list.
-
 # ROUTES
+# Open changes (or one status via ?status=) and the form for raising a new change.
 @changes_module_bp.route("/", methods=["GET"])
 @technician_required
 def changes_home():
-    tickets = load_tickets()
-    # Filtering out tickets with the Closed Status on the main Dashboard.
-    open_changes = [ticket for ticket in tickets if ticket["ticket_type"] == "Change" and ticket["ticket_status"].lower() != "closed"]
-    return render_template("under_construction.html")
+    change_index = local_change_store.get_change_index()
+    status_filter = request.args.get("status")
+    if status_filter in local_change_store.CHANGE_STATUSES:
+        changes = change_index.with_status([status_filter])
+    else:
+        status_filter = None
+        changes = change_index.with_status(local_change_store.OPEN_CHANGE_STATUSES)
 
-# Export open change tickets as CSV.
+    return render_template("changes.html",
+        changes=changes,
+        status_filter=status_filter,
+        change_statuses=local_change_store.CHANGE_STATUSES,
+        change_risks=local_change_store.CHANGE_RISKS,
+        loggedInTech=session["technician"],
+        BUILDID=current_app.config["BUILDID"])
+
+@changes_module_bp.route("/new", methods=["POST"])
+@technician_required
+def create_change():
+    subject = request.form.get("change_subject", "").strip()
+    scheduled_start = request.form.get("scheduled_start", "")
+    scheduled_end = request.form.get("scheduled_end", "") or scheduled_start
+    start, end = local_change_store.parse_window(scheduled_start), local_change_store.parse_window(scheduled_end)
+    if not subject or start is None or end is None or end < start:
+        return render_template("400.html"), 400
+
+    change = local_change_store.create_change(
+        subject=subject,
+        description=request.form.get("change_description", ""),
+        risk=request.form.get("change_risk", "Medium"),
+        requested_by=session["technician"],
+        scheduled_start=scheduled_start,
+        scheduled_end=scheduled_end,
+        related_ticket=request.form.get("related_ticket", "").strip())
+    logging.info("CHANGES MODULE - %s raised by %s for %s.", change["change_number"], session["technician"], scheduled_start)
+    return redirect(url_for("changes.changes_home"))
+
+@changes_module_bp.route("/<change_number>/update_status/<change_status>", methods=["POST"])
+@technician_required
+def update_change_status(change_number, change_status):
+    if change_status not in local_change_store.CHANGE_STATUSES:
+        return render_template("400.html"), 400
+
+    change = local_change_store.update_change_status(change_number, change_status, session["technician"])
+    if change is None:
+        return render_template("404.html"), 404
+    logging.info("CHANGES MODULE - %s status updated to %s by %s.", change_number, change_status, session["technician"])
+    return redirect(request.referrer or url_for("changes.changes_home"))
+
+# Month calendar of scheduled windows, served from the window index. ?month=YYYY-MM, defaults to this month.
+@changes_module_bp.route("/calendar", methods=["GET"])
+@technician_required
+def changes_calendar():
+    try:
+        month_start = datetime.strptime(request.args.get("month", ""), "%Y-%m")
+    except ValueError:
+        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    days_in_month = calendar.monthrange(month_start.year, month_start.month)[1]
+    month_end = month_start + timedelta(days=days_in_month)
+
+    change_index = local_change_store.get_change_index()
+    changes_by_day = {day: [] for day in range(1, days_in_month + 1)}
+    for change in change_index.scheduled_between(month_start, month_end):
+        if change.get("change_status") == "Cancelled":
+            continue
+        start = max(local_change_store.parse_window(change["scheduled_start"]), month_start)
+        end = min(change_index.window_ends[change["change_number"]], month_end - timedelta(seconds=1))
+        for day in range(start.day, end.day + 1):
+            changes_by_day[day].append(change)
+
+    return render_template("changes_calendar.html",
+        month_label=month_start.strftime("%B %Y"),
+        weeks=calendar.Calendar().monthdayscalendar(month_start.year, month_start.month),
+        changes_by_day=changes_by_day,
+        previous_month=(month_start - timedelta(days=1)).strftime("%Y-%m"),
+        next_month=month_end.strftime("%Y-%m"),
+        loggedInTech=session["technician"],
+        BUILDID=current_app.config["BUILDID"])
+
+# Export open changes as CSV, straight from the status index.
 @changes_module_bp.route("/export/csv", methods=["GET"])
 @technician_required
 def export_changes_csv():
-    tickets = load_tickets()
-
-    open_changes = [
-        t for t in tickets
-        if t.get("ticket_type") == "Change"
-        and t.get("ticket_status", "").lower() != "closed"
-    ]
+    open_changes = local_change_store.get_change_index().with_status(local_change_store.OPEN_CHANGE_STATUSES)
 
     output = io.StringIO()
     writer = csv.writer(output)
 
     # CSV Header
     writer.writerow([
-        "Ticket Number",
+        "Change Number",
         "Subject",
         "Status",
-        "Submitted By",
-        "Submission Date",
+        "Risk",
+        "Requested By",
         "Assigned To",
+        "Scheduled Start",
+        "Scheduled End",
+        "Related Ticket",
     ])
 
-    for t in open_changes:
+    for c in open_changes:
         writer.writerow([
-            t.get("ticket_number"),
-            t.get("ticket_subject"),
-            t.get("ticket_status"),
-            t.get("submitted_by"),
-            t.get("submission_date"),
-            t.get("assigned_technician"),
+            c.get("change_number"),
+            c.get("change_subject"),
+            c.get("change_status"),
+            c.get("change_risk"),
+            c.get("requested_by"),
+            c.get("assigned_technician"),
+            c.get("scheduled_start"),
+            c.get("scheduled_end"),
+            c.get("related_ticket"),
         ])
 
     output.seek(0)
 
-    logging.info(
-        f"CHANGES MODULE - Exported {len(open_changes)} change tickets to CSV"
-    )
+    logging.info("CHANGES MODULE - Exported %s change requests to CSV", len(open_changes))
 
     return Response(
         output,
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+from flask import Blueprint, request, session, jsonify
+import os, hmac
+import local_job_scheduler, local_snapshot
+from local_authentication_handler import technician_required
+
+# BLUEPRINT
+jobs_module_bp = Blueprint("jobs", __name__, url_prefix="/admin")
+
+# A technician session, or SNAPSHOT_TOKEN from .env as a Bearer token so cron can ask for snapshots.
+def snapshot_is_authorized():
+    if session.get("technician"):
+        return True
+    snapshot_token = os.getenv("SNAPSHOT_TOKEN")
+    return bool(snapshot_token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {snapshot_token}")
+
+# ROUTES
+# Background job status as JSON: schedule, next run, last run (start, duration, outcome, error) and counters.
+# Singleton jobs led by another worker also carry the leader's status from its lock file under "leader_status".
+@jobs_module_bp.route("/jobs", methods=["GET"])
+@technician_required
+def job_status():
+    return jsonify(local_job_scheduler.job_scheduler.status()), 200
+
+# Snapshots at /admin/snapshots. GET lists them; POST queues one on the "snapshot" job and returns 202 at once
+# (?kind=full|incremental, default incremental when possible). Its progress shows under /admin/jobs.
+@jobs_module_bp.route("/snapshots", methods=["GET", "POST"])
+def snapshots():
+    if not snapshot_is_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == "GET":
+        return jsonify(local_snapshot.list_snapshots()), 200
+
+    kind = request.args.get("kind", "auto")
+    if kind not in ("auto", "full", "incremental"):
+        return jsonify({"error": "kind must be full or incremental"}), 400
+    if not local_job_scheduler.job_scheduler.trigger("snapshot", kind=kind):
+        return jsonify({"error": "Background jobs are not running in this process"}), 503
+    return jsonify({"status": "queued", "job": "snapshot", "kind": kind}), 202
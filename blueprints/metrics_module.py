@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from flask import Blueprint, request, g, Response, abort
+import os, hmac, time, logging
+import local_metrics
+from local_config_loader import load_core_config
+from local_rate_limiter import client_ip
+
+core_yaml_config = load_core_config()
+metrics_cfg = core_yaml_config.get("metrics", {}) or {}
+METRICS_ENABLED = bool(metrics_cfg.get("enabled", False))
+METRICS_ALLOWED_IPS = set(metrics_cfg.get("allowed_ips") or []) # Empty: METRICS_TOKEN is required.
+# Same setting as the ingest rate limiter: behind Caddy the client IP comes from X-Forwarded-For.
+TRUST_PROXY_HEADERS = bool((core_yaml_config.get("api_rate_limit", {}) or {}).get("trust_proxy_headers", False))
+
+metrics_module_bp = Blueprint('metrics', __name__)
+
+# Per-endpoint request count and latency for every route, including the other blueprints.
+@metrics_module_bp.before_app_request
+def start_request_timer():
+    g.metrics_request_start = time.perf_counter()
+
+@metrics_module_bp.after_app_request
+def record_request_metrics(response):
+    request_start = g.pop("metrics_request_start", None)
+    if request_start is not None:
+        endpoint = request.endpoint or "unmatched"
+        local_metrics.observe("goobydesk_http_request_duration_seconds", time.perf_counter() - request_start,
+            "Request latency by Flask endpoint.", endpoint=endpoint)
+        local_metrics.inc_counter("goobydesk_http_requests_total", "Requests by Flask endpoint, method and status.",
+            endpoint=endpoint, method=request.method, status=str(response.status_code))
+    return response
+
+def scrape_client_ip():
+    return client_ip(request, TRUST_PROXY_HEADERS)
+
+# A scrape is allowed with the bearer token from .env or from an explicitly allowlisted IP.
+def scrape_is_authorized():
+    metrics_token = os.getenv("METRICS_TOKEN") # Read per scrape; .env is loaded after blueprints are imported.
+    if metrics_token:
+        supplied = request.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied, f"Bearer {metrics_token}"):
+            return True
+    return scrape_client_ip() in METRICS_ALLOWED_IPS
+
+# Prometheus scrape endpoint at /metrics.
+@metrics_module_bp.route("/metrics", methods=["GET"])
+def metrics():
+    if not METRICS_ENABLED:
+        abort(404)
+    if not scrape_is_authorized():
+        logging.warning("METRICS - Unauthorized scrape attempt from %s.", scrape_client_ip())
+        abort(403)
+    return Response(local_metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -1,100 +1,47 @@
 #!/usr/bin/env python3
-from flask import Blueprint, render_template, session, Response
-import io, csv, logging
-from datetime import datetime, timedelta
-from local_config_loader import load_core_config
-
-core_yaml_config = load_core_config()
-LOG_LEVEL = core_yaml_config["logging"]["level"]
-LOG_FILE = core_yaml_config["logging"]["file"]
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-""" Above is the default logging configuration.
-Debug - Detailed information
-Info - Successes
-Warning - Unexpected events
-Error - Function failures
-Critical - Serious application failures
-"""
+from flask import Blueprint, current_app, render_template, session, jsonify, Response
+import io, csv
+import local_ticket_analytics
+import local_ticket_store
 
 reports_module_bp = Blueprint('reports', __name__, url_prefix='/reports')
 
-# Importing from APP to avoid circular imports. There might be a better way for this.
-def get_app_functions():
-    from app import load_tickets, technician_required
-    return load_tickets, technician_required
-
 @reports_module_bp.route("/", endpoint='reports_home')
 def reports_home():
-    from app import load_tickets, BUILDID
-    
     if not session.get("technician"):
         return render_template("403.html"), 403
     
-    tickets = load_tickets()
-    now = datetime.now()
-    total_tickets = len(tickets)
-    
-    status_counts = {
-        "Open": 0,
-        "In-Progress": 0,
-        "Closed": 0,
-    }
-    
-    time_buckets = {
-        "last_60_days": 0,
-        "last_30_days": 0,
-        "last_14_days": 0,
-        "last_7_days": 0,
-    }
-    
-    for ticket in tickets:
-        status = ticket.get("ticket_status")
-        if status in status_counts:
-            status_counts[status] += 1
-        
-        try:
-            submitted_at = datetime.strptime(
-                ticket["submission_date"], "%Y-%m-%d %H:%M:%S"
-            )
-            age = now - submitted_at
-            
-            if age <= timedelta(days=60):
-                time_buckets["last_60_days"] += 1
-            if age <= timedelta(days=30):
-                time_buckets["last_30_days"] += 1
-            if age <= timedelta(days=14):
-                time_buckets["last_14_days"] += 1
-            if age <= timedelta(days=7):
-                time_buckets["last_7_days"] += 1
-        
-        except (KeyError, ValueError):
-            logging.warning("REPORTING - Invalid submission_date on ticket")
+    # Counts, age buckets and resolution times come from the cached analytics columns, not a full ticket scan.
+    analytics = local_ticket_analytics.get_analytics_summary()
+    status_counts = analytics["status_counts"]
+    submitted_last_days = analytics["submitted_last_days"]
     
     return render_template("reports_home.html",
-        total_tickets=total_tickets,
-        open_tickets=status_counts["Open"],
-        in_progress_tickets=status_counts["In-Progress"],
-        closed_tickets=status_counts["Closed"],
-        last_60_days=time_buckets["last_60_days"],
-        last_30_days=time_buckets["last_30_days"],
-        last_14_days=time_buckets["last_14_days"],
-        last_7_days=time_buckets["last_7_days"],
+        total_tickets=analytics["total_tickets"],
+        open_tickets=status_counts.get("Open", 0),
+        in_progress_tickets=status_counts.get("In-Progress", 0),
+        closed_tickets=status_counts.get("Closed", 0),
+        last_60_days=submitted_last_days["60"],
+        last_30_days=submitted_last_days["30"],
+        last_14_days=submitted_last_days["14"],
+        last_7_days=submitted_last_days["7"],
+        analytics=analytics,
         loggedInTech=session["technician"], 
-        BUILDID=BUILDID)
+        BUILDID=current_app.config["BUILDID"])
+
+# Same analytics as JSON for dashboards and scripts.
+@reports_module_bp.route("/analytics.json", endpoint='reports_analytics')
+def reports_analytics():
+    if not session.get("technician"):
+        return jsonify({"error": "Forbidden"}), 403
+    
+    return jsonify(local_ticket_analytics.get_analytics_summary()), 200
 
 @reports_module_bp.route("/export/csv", endpoint='export_tickets_csv')
 def export_tickets_csv():
-    from app import load_tickets
-    
     if not session.get("technician"):
         return render_template("403.html"), 403
     
-    tickets = load_tickets()
     output = io.StringIO()
     writer = csv.writer(output)
     
@@ -104,17 +51,20 @@ def export_tickets_csv():
         "Status",
         "Submission Date",
         "Closed By",
-        "Closure Date"
+        "Closure Date",
+        "Assigned Technician" # Added last so existing columns keep their positions.
     ])
     
-    for ticket in tickets:
+    # Shards are read one at a time, oldest first.
+    for ticket in local_ticket_store.iter_tickets():
         writer.writerow([
             ticket.get("ticket_number", ""),
             ticket.get("ticket_subject", ""),
             ticket.get("ticket_status", ""),
             ticket.get("submission_date", ""),
             ticket.get("closed_by", ""),
-            ticket.get("closure_date", "")
+            ticket.get("closure_date", ""),
+            ticket.get("assigned_technician", "")
         ])
     
     output.seek(0)
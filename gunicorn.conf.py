@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# Gunicorn settings for GoobyDesk. Gunicorn reads ./gunicorn.conf.py automatically from the WorkingDirectory,
+# so the systemd unit (`gunicorn -w 3 -b 127.0.0.1:8000 app:app`) picks this up without extra flags.
+
+import local_async
+
+# server.mode in core_configuration.yml: sync (one request per worker) or async (gevent workers, many concurrent
+# requests per worker while they wait on Turnstile, SMTP and webhooks). Must run before the app is imported below.
+_worker_settings = local_async.gunicorn_worker_settings()
+if _worker_settings:
+    worker_class = _worker_settings["worker_class"]
+    worker_connections = _worker_settings["worker_connections"]
+
+# Import the app and build it once in the master; workers are forked with config, templates and blueprints ready.
+preload_app = True
+
+# Background threads do not survive fork(), so each worker starts its own after it is forked.
+def post_fork(server, worker):
+    import app
+    app.start_background_workers()
@@ -40,13 +40,13 @@ if [ ! -d "$APP_DIR" ]; then
 fi
 
 # Step 1: Stop service
-echo -e "${YELLOW}Step 1/6: Stopping service...${NC}"
+echo -e "${YELLOW}Step 1/7: Stopping service...${NC}"
 systemctl stop "$SERVICE_NAME"
 echo -e "${GREEN}  ✓ Service stopped${NC}"
 echo ""
 
 # Step 2: Create backup
-echo -e "${YELLOW}Step 2/6: Creating backup...${NC}"
+echo -e "${YELLOW}Step 2/7: Creating backup...${NC}"
 BACKUP_TEMP_DIR=$(mktemp -d)
 mkdir -p "${BACKUP_TEMP_DIR}/my_data"
 
@@ -70,28 +70,36 @@ echo -e "${GREEN}  ✓ Backup created: ${BACKUP_PATH}${NC}"
 echo ""
 
 # Step 3: Pull latest code
-echo -e "${YELLOW}Step 3/6: Pulling latest code from git...${NC}"
+echo -e "${YELLOW}Step 3/7: Pulling latest code from git...${NC}"
 cd "$APP_DIR"
 sudo git pull origin main
 echo -e "${GREEN}  ✓ Code updated${NC}"
 echo ""
 
 # Step 4: Update dependencies
-echo -e "${YELLOW}Step 4/6: Updating dependencies...${NC}"
+echo -e "${YELLOW}Step 4/7: Updating dependencies...${NC}"
 source venv/bin/activate
 pip install -r requirements.txt
 deactivate
 echo -e "${GREEN}  ✓ Dependencies updated${NC}"
 echo ""
 
-# Step 5: Start service
-echo -e "${YELLOW}Step 5/6: Starting service...${NC}"
+# Step 5: Upgrade the ticket database (verify, repair if needed, convert to the configured storage, rebuild indexes)
+echo -e "${YELLOW}Step 5/7: Upgrading ticket database...${NC}"
+source venv/bin/activate
+python3 helper_scripts/goobydesk_db.py upgrade
+deactivate
+echo -e "${GREEN}  ✓ Ticket database upgraded${NC}"
+echo ""
+
+# Step 6: Start service
+echo -e "${YELLOW}Step 6/7: Starting service...${NC}"
 systemctl start "$SERVICE_NAME"
 echo -e "${GREEN}  ✓ Service started${NC}"
 echo ""
 
-# Step 6: Wait and check status
-echo -e "${YELLOW}Step 6: Waiting 10 seconds for service to fully initialize...${NC}"
+# Step 7: Wait and check status
+echo -e "${YELLOW}Step 7/7: Waiting 10 seconds for service to fully initialize...${NC}"
 sleep 10
 echo ""
 
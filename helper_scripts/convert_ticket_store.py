@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Kept for existing docs and habits. Conversion is now done by goobydesk_db.py, which streams in bounded memory.
+# Usage: python3 helper_scripts/convert_ticket_store.py msgpack
+#        python3 helper_scripts/convert_ticket_store.py --layout yearly|single
+# Same as:  python3 helper_scripts/goobydesk_db.py convert --format msgpack
+#           python3 helper_scripts/goobydesk_db.py convert --layout yearly|single
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import goobydesk_db
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--layout" and sys.argv[2] in ("single", "yearly"):
+        sys.argv = [sys.argv[0], "convert", "--layout", sys.argv[2]]
+    elif len(sys.argv) == 2 and sys.argv[1] in goobydesk_db.local_ticket_serializer.SUPPORTED_FORMATS:
+        sys.argv = [sys.argv[0], "convert", "--format", sys.argv[1]]
+    else:
+        print(f"Usage: {sys.argv[0]} <{'|'.join(goobydesk_db.local_ticket_serializer.SUPPORTED_FORMATS)}>")
+        print(f"       {sys.argv[0]} --layout <single|yearly>")
+        print("See also: python3 helper_scripts/goobydesk_db.py --help")
+        sys.exit(1)
+    goobydesk_db.main()
+
+if __name__ == "__main__":
+    main()
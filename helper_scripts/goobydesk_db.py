@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# goobydesk-db: offline maintenance for the ticket database. Every command streams tickets one at a time through
+# TicketFileReader/TicketFileWriter, so multi-gigabyte databases are handled in bounded memory.
+# This is the supported upgrade path between GoobyDesk versions; basic_version_upgrade.sh runs "upgrade".
+#
+# Usage: python3 helper_scripts/goobydesk_db.py verify [--file PATH]
+#        python3 helper_scripts/goobydesk_db.py repair [--file PATH] [--dry-run]
+#        python3 helper_scripts/goobydesk_db.py convert [--format FORMAT] [--layout single|yearly]
+#        python3 helper_scripts/goobydesk_db.py rebuild-indexes
+#        python3 helper_scripts/goobydesk_db.py upgrade
+#        python3 helper_scripts/goobydesk_db.py snapshot [--full]
+#        python3 helper_scripts/goobydesk_db.py snapshots
+#        python3 helper_scripts/goobydesk_db.py restore [SNAPSHOT_ID] [--format FORMAT]
+# Stop GoobyDesk before running repair, convert, upgrade or restore. snapshot is safe while it runs.
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import contextlib
+from datetime import datetime
+
+# Allow running from any directory; the local_* modules live in the project root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import local_ticket_serializer
+import local_ticket_store
+import local_note_store
+import local_message_index
+import local_requester_index
+import local_work_queue
+import local_snapshot
+from local_ticket_serializer import TicketFileReader, TicketFileWriter
+
+TICKET_STATUSES = ("Open", "In-Progress", "Closed")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+FULL_NUMBER_PATTERN = re.compile(r"^([A-Z]+)-(\d{4})-(\d+)$")
+MAX_BITMAP_SEQUENCE = 10_000_000 # Larger sequence numbers fall back to a set.
+
+class SeenNumbers:
+    """Ticket numbers seen so far. PREFIX-YYYY-NNNN numbers cost one bit each, so millions of tickets fit in a few MB."""
+
+    def __init__(self):
+        self._bitmaps = {}
+        self._other = set()
+        self.max_sequence = {} # (prefix, year) -> highest sequence seen
+
+    # Returns False if the number was already seen.
+    def add(self, ticket_number):
+        number_match = FULL_NUMBER_PATTERN.match(ticket_number)
+        if not number_match or int(number_match.group(3)) >= MAX_BITMAP_SEQUENCE:
+            if ticket_number in self._other:
+                return False
+            self._other.add(ticket_number)
+            return True
+        key, sequence = (number_match.group(1), number_match.group(2)), int(number_match.group(3))
+        self.max_sequence[key] = max(self.max_sequence.get(key, 0), sequence)
+        bitmap = self._bitmaps.setdefault(key, bytearray())
+        if sequence // 8 >= len(bitmap):
+            bitmap.extend(bytes(sequence // 8 + 1 - len(bitmap)))
+        if bitmap[sequence // 8] & (1 << (sequence % 8)):
+            return False
+        bitmap[sequence // 8] |= 1 << (sequence % 8)
+        return True
+
+    # Next free number in the ticket's own prefix and year, used when repair has to renumber a duplicate.
+    def allocate_like(self, ticket_number):
+        number_match = FULL_NUMBER_PATTERN.match(ticket_number)
+        if number_match:
+            key = (number_match.group(1), number_match.group(2))
+        else:
+            key = ("TKT", str(datetime.now().year))
+        sequence = self.max_sequence.get(key, 0) + 1
+        new_number = f"{key[0]}-{key[1]}-{str(sequence).zfill(4)}"
+        self.add(new_number)
+        return new_number
+
+def _valid_date(value):
+    try:
+        datetime.strptime(value, DATE_FORMAT)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+# Returns a list of schema problems for one ticket. Empty means valid.
+def check_ticket(ticket):
+    if not isinstance(ticket, dict):
+        return [f"record is a {type(ticket).__name__}, not a ticket object"]
+    problems = []
+    if not isinstance(ticket.get("ticket_number"), str) or not ticket.get("ticket_number"):
+        problems.append("missing ticket_number")
+    if not isinstance(ticket.get("ticket_subject"), str):
+        problems.append("missing ticket_subject")
+    if ticket.get("ticket_status") not in TICKET_STATUSES:
+        problems.append(f"invalid ticket_status {ticket.get('ticket_status')!r}")
+    if not _valid_date(ticket.get("submission_date")):
+        problems.append(f"invalid submission_date {ticket.get('submission_date')!r}")
+    if "ticket_notes" in ticket and not isinstance(ticket["ticket_notes"], list):
+        problems.append("ticket_notes is not a list")
+    if ticket.get("closure_date") and not _valid_date(ticket.get("closure_date")):
+        problems.append(f"invalid closure_date {ticket.get('closure_date')!r}")
+    return problems
+
+def _ticket_digest(ticket):
+    return hashlib.sha256(json.dumps(ticket, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# Temporarily point local_ticket_store at another layout.
+@contextlib.contextmanager
+def _layout(layout):
+    configured = local_ticket_store.STORAGE_LAYOUT
+    local_ticket_store.STORAGE_LAYOUT = layout
+    try:
+        yield
+    finally:
+        local_ticket_store.STORAGE_LAYOUT = configured
+
+# The layout that actually holds tickets on disk, which may differ from storage.layout before an upgrade.
+def detect_layout():
+    with _layout("yearly"):
+        has_shards = bool(local_ticket_store.list_shards())
+    if local_ticket_store.STORAGE_LAYOUT == "yearly" and has_shards:
+        return "yearly"
+    if os.path.exists(local_ticket_store.TICKETS_FILE):
+        return "single"
+    return "yearly" if has_shards else None
+
+def _database_files(layout):
+    with _layout(layout):
+        return local_ticket_store.store_files()
+
+def _target_files(args):
+    if getattr(args, "file", None):
+        return [args.file]
+    layout = detect_layout()
+    if layout is None:
+        print(f"ERROR: No ticket database found at {local_ticket_store.TICKETS_FILE} or in {local_ticket_store.SHARD_DIRECTORY}")
+        sys.exit(1)
+    return _database_files(layout)
+
+# Streams one file, printing schema problems. Returns (records, problem count, duplicate numbers, reader).
+def _scan_file(path, seen, verbose=True, max_reported=20):
+    reader = TicketFileReader(path)
+    problem_count = 0
+    duplicates = set()
+    for ticket in reader:
+        problems = check_ticket(ticket)
+        ticket_number = ticket.get("ticket_number") if isinstance(ticket, dict) else None
+        if isinstance(ticket_number, str) and ticket_number and not seen.add(ticket_number):
+            duplicates.add(ticket_number)
+            problems.append("duplicate ticket_number")
+        if problems:
+            problem_count += 1
+            if verbose and problem_count <= max_reported:
+                print(f"  - record {reader.records} ({ticket_number or 'no number'}): {', '.join(problems)}")
+    if verbose and problem_count > max_reported:
+        print(f"  - ... and {problem_count - max_reported} more")
+    return reader.records, problem_count, duplicates, reader
+
+# Counts notes and unreadable lines across every note stream.
+def _scan_note_streams():
+    streams = notes = unreadable = 0
+    for _, path in local_note_store.stream_files():
+        streams += 1
+        for note, _ in local_note_store.read_stream(path):
+            notes += 1
+            if note.get("source") == "unreadable":
+                unreadable += 1
+                print(f"  - {path}: unreadable note line")
+    return streams, notes, unreadable
+
+def verify(args):
+    seen = SeenNumbers()
+    total_records = total_problems = 0
+    damaged = False
+    for path in _target_files(args):
+        print(f"Checking {path}")
+        records, problems, _, reader = _scan_file(path, seen)
+        total_records += records
+        total_problems += problems
+        if reader.error:
+            damaged = True
+            print(f"  - {'TRUNCATED' if reader.truncated else 'CORRUPT'}: {reader.error}")
+        print(f"  - {records:,} tickets, {reader.storage_format}")
+    if not getattr(args, "file", None):
+        print(f"Checking {local_note_store.NOTES_DIRECTORY}")
+        streams, notes, unreadable = _scan_note_streams()
+        total_problems += unreadable
+        print(f"  - {notes:,} notes in {streams:,} ticket note streams")
+
+    if total_problems or damaged:
+        print(f"\nERROR: {total_problems:,} of {total_records:,} tickets have problems{' and the database is damaged' if damaged else ''}.")
+        print("Run: python3 helper_scripts/goobydesk_db.py repair")
+        return 1
+    print(f"\n✓ {total_records:,} tickets verified")
+    return 0
+
+# Moves a file or directory aside as <path>.bak-<timestamp>. An existing backup is never replaced: upgrade runs repair
+# and convert within the same second, and each keeps its own copy. Returns the backup path.
+def _move_aside(path):
+    backup = f"{path}.bak-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    candidate, attempt = backup, 1
+    while os.path.lexists(candidate):
+        attempt += 1
+        candidate = f"{backup}-{attempt}"
+    os.replace(path, candidate)
+    return candidate
+
+# Repairs one file in place, keeping the original as .bak-<timestamp>. seen holds every number in the database, so
+# renumbered tickets never collide; kept_digests (duplicated numbers only) records which copies have been written.
+def _repair_file(path, seen, duplicates, kept_digests, dry_run):
+    reader = TicketFileReader(path)
+    writer = None if dry_run else TicketFileWriter(path, _repair_format(path))
+    rejects_path = f"{path}.rejects.jsonl"
+    rejects = None
+    counts = {"kept": 0, "fixed": 0, "dropped": 0, "renumbered": 0, "rejected": 0}
+    try:
+        for ticket in reader:
+            ticket_number = ticket.get("ticket_number") if isinstance(ticket, dict) else None
+            if not isinstance(ticket_number, str) or not ticket_number:
+                counts["rejected"] += 1
+                if not dry_run:
+                    rejects = rejects or open(rejects_path, "a", encoding="utf-8")
+                    rejects.write(json.dumps(ticket, ensure_ascii=False) + "\n")
+                continue
+
+            if ticket_number in duplicates:
+                digest = _ticket_digest(ticket)
+                if digest in kept_digests.get(ticket_number, ()):
+                    counts["dropped"] += 1
+                    continue
+                if ticket_number in kept_digests:
+                    new_number = seen.allocate_like(ticket_number)
+                    print(f"  - {ticket_number} conflicts with an earlier ticket; renumbered to {new_number}")
+                    ticket["ticket_number"] = new_number
+                    counts["renumbered"] += 1
+                else:
+                    kept_digests[ticket_number] = set()
+                kept_digests[ticket_number].add(digest)
+
+            if "ticket_notes" in ticket and not isinstance(ticket["ticket_notes"], list):
+                ticket["ticket_notes"] = []
+                counts["fixed"] += 1
+            if ticket.get("ticket_status") not in TICKET_STATUSES:
+                ticket["ticket_status"] = "Open"
+                counts["fixed"] += 1
+            counts["kept"] += 1
+            if writer:
+                writer.write(ticket)
+    except Exception:
+        if writer:
+            writer.abort()
+        raise
+    finally:
+        if rejects:
+            rejects.close()
+
+    if reader.error:
+        print(f"  - Dropped the damaged tail: {reader.error}")
+    if writer:
+        print(f"  - Original kept as {_move_aside(path)}")
+        writer.finish()
+    print(f"  - kept {counts['kept']:,}, removed {counts['dropped']:,} identical duplicates, renumbered {counts['renumbered']:,}, "
+          f"filled {counts['fixed']:,} missing fields, rejected {counts['rejected']:,}")
+    if counts["rejected"] and not dry_run:
+        print(f"  - Rejected records saved to {rejects_path}")
+    return counts
+
+def _repair_format(path):
+    with open(path, "rb") as tkt_file:
+        storage_format = local_ticket_serializer.detect_format(tkt_file.read(4096))
+    # The JSON flavours all read the same; keep whatever the config writes so the next save does not churn the file.
+    if storage_format == "json" and local_ticket_serializer.STORAGE_FORMAT != "msgpack":
+        return local_ticket_serializer.STORAGE_FORMAT
+    return storage_format
+
+def repair(args):
+    paths = _target_files(args)
+    # Pass 1: find duplicate numbers and the highest sequence per year, so renumbering never collides.
+    seen = SeenNumbers()
+    duplicates = set()
+    for path in paths:
+        duplicates |= _scan_file(path, seen, verbose=False)[2]
+
+    # Pass 2: rewrite each file, keeping the first copy of each duplicated number.
+    kept_digests = {}
+    for path in paths:
+        print(f"Repairing {path}{' (dry run)' if args.dry_run else ''}")
+        _repair_file(path, seen, duplicates, kept_digests, args.dry_run)
+
+    if not args.dry_run:
+        _rebuild_all()
+        print("\n✓ Repair complete. Originals kept with a .bak-<timestamp> suffix")
+    return 0
+
+# Streams every ticket from the on-disk layout into the target format and layout. The old files are moved aside.
+# Inline ticket_notes from older versions are moved to the front of each ticket's note stream on the way through.
+def convert(args):
+    source_layout = detect_layout()
+    if source_layout is None:
+        print(f"ERROR: No ticket database found at {local_ticket_store.TICKETS_FILE} or in {local_ticket_store.SHARD_DIRECTORY}")
+        return 1
+    target_layout = args.layout or local_ticket_store.STORAGE_LAYOUT
+    target_format = args.format or local_ticket_serializer.STORAGE_FORMAT
+    source_files = _database_files(source_layout)
+    moved_notes = 0 # Inline ticket_notes moved to note streams on the way through.
+
+    if source_layout == target_layout:
+        # Same layout: rewrite each file in place.
+        for path in source_files:
+            reader = TicketFileReader(path)
+            writer = TicketFileWriter(path, target_format)
+            for ticket in reader:
+                moved_notes += local_note_store.migrate_inline_notes(ticket)
+                writer.write(ticket)
+            if reader.error:
+                writer.abort()
+                print(f"ERROR: {path}: {reader.error} Run repair first.")
+                return 1
+            _move_aside(path)
+            size = writer.finish()
+            print(f"  - {path}: {reader.records:,} tickets from {reader.storage_format} to {target_format}, {size:,} bytes")
+    else:
+        staging = f"{local_ticket_store.SHARD_DIRECTORY}.new"
+        if os.path.isdir(staging):
+            shutil.rmtree(staging) # Left behind by an interrupted convert.
+        writers = {}
+        try:
+            for path in source_files:
+                reader = TicketFileReader(path)
+                for ticket in reader:
+                    moved_notes += local_note_store.migrate_inline_notes(ticket)
+                    with _layout(target_layout):
+                        shard = local_ticket_store.shard_for(ticket)
+                    if shard not in writers:
+                        target = local_ticket_store.TICKETS_FILE if shard is None else os.path.join(staging, f"tickets-{shard}.json")
+                        writers[shard] = TicketFileWriter(target, target_format)
+                    writers[shard].write(ticket)
+                if reader.error:
+                    raise ValueError(f"{path}: {reader.error} Run repair first.")
+        except Exception as e:
+            for writer in writers.values():
+                writer.abort()
+            if os.path.isdir(staging):
+                shutil.rmtree(staging)
+            print(f"ERROR: {e}")
+            return 1
+
+        if target_layout == "yearly":
+            for writer in writers.values():
+                writer.finish()
+            if os.path.isdir(local_ticket_store.SHARD_DIRECTORY):
+                _move_aside(local_ticket_store.SHARD_DIRECTORY)
+            os.replace(staging, local_ticket_store.SHARD_DIRECTORY)
+            _move_aside(local_ticket_store.TICKETS_FILE)
+        else:
+            writer = writers.get(None) or TicketFileWriter(local_ticket_store.TICKETS_FILE, target_format)
+            if os.path.exists(local_ticket_store.TICKETS_FILE):
+                _move_aside(local_ticket_store.TICKETS_FILE)
+            writer.finish()
+            _move_aside(local_ticket_store.SHARD_DIRECTORY)
+        print(f"  - Moved {sum(writer.records for writer in writers.values()):,} tickets from the {source_layout} to the {target_layout} layout")
+
+    if moved_notes:
+        print(f"  - Moved {moved_notes:,} inline notes to {local_note_store.NOTES_DIRECTORY}")
+    _rebuild_all()
+    print(f"\n✓ Ticket database is now {target_format}, {target_layout} layout")
+    if (target_format, target_layout) != (local_ticket_serializer.STORAGE_FORMAT, local_ticket_store.storage_cfg.get("layout", "single")):
+        print(f"Set storage.format to \"{target_format}\" and storage.layout to \"{target_layout}\" in core_configuration.yml before starting GoobyDesk.")
+    return 0
+
+def _rebuild_manifest():
+    if detect_layout() != "yearly":
+        return None
+    with _layout("yearly"):
+        manifest = local_ticket_store.rebuild_manifest()
+    return f"{local_ticket_store.MANIFEST_FILE} ({len(manifest['shards'])} shards)"
+
+# Ingested replies are re-derived from the Message-IDs kept on email notes. Sent confirmations exist only in the
+# index itself, so those lines are carried over.
+def _rebuild_message_index():
+    index_path = local_message_index.MESSAGE_INDEX_FILE
+    if not os.path.exists(index_path) and not local_note_store.stream_files():
+        return None
+    lines = []
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    if json.loads(line).get("k") == "sent":
+                        lines.append(line if line.endswith("\n") else line + "\n")
+                except ValueError:
+                    continue
+    sent = len(lines)
+    for ticket_number, path in local_note_store.stream_files():
+        for note, _ in local_note_store.read_stream(path):
+            if note.get("message_id"):
+                lines.append(json.dumps({"m": note["message_id"], "t": ticket_number, "k": "ingested"}) + "\n")
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as tmp_file:
+        tmp_file.writelines(lines)
+    os.replace(tmp_path, index_path)
+    return f"{index_path} ({sent:,} sent, {len(lines) - sent:,} ingested Message-IDs)"
+
+# Derived on-disk indexes, rebuilt in order. Each returns a description of what it wrote, or None if not used.
+def _rebuild_requester_index():
+    if detect_layout() is None:
+        return None
+    with _layout(detect_layout()):
+        count = local_ticket_store.rebuild_requester_index()
+    return f"{local_requester_index.REQUESTER_INDEX_FILE} ({count:,} tickets)"
+
+def _rebuild_work_queue_index():
+    if detect_layout() is None:
+        return None
+    with _layout(detect_layout()):
+        count = local_ticket_store.rebuild_work_queue_index()
+    return f"{local_work_queue.WORK_QUEUE_FILE} ({count:,} open tickets)"
+
+INDEX_BUILDERS = [
+    ("shard manifest", _rebuild_manifest),
+    ("email message index", _rebuild_message_index),
+    ("requester index", _rebuild_requester_index),
+    ("work queue index", _rebuild_work_queue_index),
+]
+
+def _rebuild_all():
+    for name, builder in INDEX_BUILDERS:
+        result = builder()
+        if result:
+            print(f"  - Rebuilt {name}: {result}")
+
+def rebuild_indexes(args):
+    _rebuild_all()
+    print("\n✓ Indexes rebuilt")
+    return 0
+
+# verify -> repair if needed -> convert to the configured format and layout -> rebuild indexes.
+def upgrade(args):
+    if detect_layout() is None:
+        print("✓ No ticket database yet. Nothing to upgrade.")
+        return 0
+    args.file = None
+    if verify(args) != 0:
+        args.dry_run = False
+        repair(args)
+    args.format, args.layout = None, None
+    return convert(args)
+
+def snapshot(args):
+    entry = local_snapshot.create_snapshot("full" if args.full else "auto")
+    print(f"✓ {entry['kind'].capitalize()} snapshot {entry['id']}")
+    print(f"  - {entry['records']:,} records, {entry['deleted']:,} deletions, {entry['blobs']:,} new blobs, {entry['skipped_stores']} unchanged store files skipped")
+    print(f"  - {os.path.join(local_snapshot.SNAPSHOT_DIRECTORY, entry['file'])}: {entry['bytes']:,} bytes")
+    return 0
+
+def list_snapshots(args):
+    catalog = local_snapshot.list_snapshots()
+    if not catalog:
+        print(f"No snapshots in {local_snapshot.SNAPSHOT_DIRECTORY}")
+        return 0
+    for entry in catalog:
+        print(f"{entry['id']}  {entry['created']}  {entry['kind']:<11}  {entry['records']:>9,} records  {entry['bytes']:>12,} bytes")
+    return 0
+
+def restore(args):
+    try:
+        entry = local_snapshot.restore_snapshot(args.snapshot_id, args.format)
+    except KeyError as e:
+        print(f"ERROR: {e.args[0]}")
+        return 1
+    print(f"✓ Restored snapshot {entry['id']} ({entry['created']}, {entry['layout']} layout)")
+    print("  - Previous files were moved aside with a .bak-<timestamp> suffix")
+    if entry["layout"] != local_ticket_store.STORAGE_LAYOUT:
+        print(f"Set storage.layout to \"{entry['layout']}\" in core_configuration.yml before starting GoobyDesk.")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(prog="goobydesk-db", description="Verify, repair, convert and upgrade the GoobyDesk ticket database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = commands.add_parser("verify", help="Check every ticket's schema and number uniqueness.")
+    verify_parser.add_argument("--file", help="Check this file instead of the configured database.")
+    verify_parser.set_defaults(handler=verify)
+
+    repair_parser = commands.add_parser("repair", help="Drop truncated tails and duplicates, fill missing fields.")
+    repair_parser.add_argument("--file", help="Repair this file instead of the configured database.")
+    repair_parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+    repair_parser.set_defaults(handler=repair)
+
+    convert_parser = commands.add_parser("convert", help="Rewrite the database in another format and/or layout.")
+    convert_parser.add_argument("--format", choices=local_ticket_serializer.SUPPORTED_FORMATS, help="Defaults to storage.format.")
+    convert_parser.add_argument("--layout", choices=("single", "yearly"), help="Defaults to storage.layout.")
+    convert_parser.set_defaults(handler=convert)
+
+    rebuild_parser = commands.add_parser("rebuild-indexes", help="Re-derive manifests and other indexes from the tickets.")
+    rebuild_parser.set_defaults(handler=rebuild_indexes)
+
+    upgrade_parser = commands.add_parser("upgrade", help="Verify, repair if needed, convert to the configured storage and rebuild indexes.")
+    upgrade_parser.set_defaults(handler=upgrade)
+
+    snapshot_parser = commands.add_parser("snapshot", help="Take an online snapshot. Incremental unless --full or a full one is due.")
+    snapshot_parser.add_argument("--full", action="store_true", help="Take a full snapshot.")
+    snapshot_parser.set_defaults(handler=snapshot)
+
+    list_parser = commands.add_parser("snapshots", help="List snapshots.")
+    list_parser.set_defaults(handler=list_snapshots)
+
+    restore_parser = commands.add_parser("restore", help="Restore tickets and changes from a snapshot (default: the latest).")
+    restore_parser.add_argument("snapshot_id", nargs="?", help="Snapshot ID from the snapshots command.")
+    restore_parser.add_argument("--format", choices=local_ticket_serializer.SUPPORTED_FORMATS, help="Defaults to storage.format.")
+    restore_parser.set_defaults(handler=restore)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # Reset a technicians password using the legacy authentication method.
-import json
+import os
 import sys
+import json
+import tempfile
 import getpass
 import local_config_loader
 
@@ -18,9 +20,18 @@ def load_employees():
         print(f"ERROR: Employee JSON Database is not valid JSON")
         sys.exit(1)
 
+# Written next to the original and renamed into place, so a running GoobyDesk never reads half a file.
 def save_employees(employees, employee_file):
-    with open(employee_file, "w") as f:
-        json.dump(employees, f, indent=4)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(employee_file)), prefix=".employee-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(employees, f, indent=4)
+        os.chmod(tmp_path, os.stat(employee_file).st_mode & 0o777)
+        os.replace(tmp_path, employee_file)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 def reset_password(username, new_password):
     employees, employee_file = load_employees()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Local module for the async serving mode (server.mode: async in core_configuration.yml).
+# Gunicorn runs gevent workers and the standard library is monkey-patched, so every socket the app opens becomes
+# cooperative: Turnstile and webhook calls through requests, SMTP through smtplib, IMAP through imaplib. A worker then
+# serves many requests that are waiting on slow upstreams instead of one per thread. Requires gevent (pip install gevent).
+__all__ = ["SERVER_MODE", "gunicorn_worker_settings", "is_async", "run_blocking"]
+import sys
+from local_config_loader import load_core_config
+
+server_cfg = (load_core_config() or {}).get("server", {}) or {}
+SERVER_MODE = str(server_cfg.get("mode", "sync")).lower()
+ASYNC_WORKER_CONNECTIONS = int(server_cfg.get("async_connections", 1000))
+
+# Called from gunicorn.conf.py before the app is imported, so locks and threads created at import time are already
+# gevent-aware when preload_app forks the workers. Returns the gunicorn settings for the configured mode.
+def gunicorn_worker_settings():
+    if SERVER_MODE != "async":
+        return {}
+    try:
+        from gevent import monkey
+    except ImportError:
+        print("GoobyDesk: server.mode is async but gevent is not installed (pip install gevent). Using sync workers.", file=sys.stderr)
+        return {}
+    monkey.patch_all()
+    return {"worker_class": "gevent", "worker_connections": ASYNC_WORKER_CONNECTIONS}
+
+def is_async():
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    return gevent_monkey is not None and gevent_monkey.is_module_patched("socket")
+
+# Runs CPU-bound work that releases the GIL (bcrypt) on gevent's native thread pool, so one login does not stall every
+# other request in the worker. A plain call in sync mode.
+def run_blocking(func, *args):
+    if is_async():
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
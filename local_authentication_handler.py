@@ -1,15 +1,31 @@
 #!/usr/bin/env python3
 # Local module to support secure authentication handling.
-[__all__] = ["hash_password, verify_password"]
+__all__ = ["hash_password", "verify_password", "technician_required"]
 import bcrypt
+from functools import wraps
+from flask import session, render_template
+from local_async import run_blocking
 
 def hash_password(plain_password: str) -> str:
     salt = bcrypt.gensalt(rounds=12)
-    hashed_user_password = bcrypt.hashpw(plain_password.encode(), salt)
+    hashed_user_password = run_blocking(bcrypt.hashpw, plain_password.encode(), salt)
     return hashed_user_password.decode()
 
 def verify_password(plain_password: str, stored_hash: str) -> bool:
-    return bcrypt.checkpw(
+    return run_blocking(
+        bcrypt.checkpw,
         plain_password.encode(),
         stored_hash.encode()
     )
+
+# Decorator to force authentication checking. Easy to append to routes in app.py and the blueprints.
+def technician_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Session-based auth check
+        if not session.get("technician"):
+            # Unauthorized access attempt
+            return render_template("403.html"), 403
+        # Authorized technician → proceed to the route
+        return func(*args, **kwargs)
+    return wrapper
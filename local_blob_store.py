@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Local module for a content-addressed, compressed blob store used for large ticket bodies and raw payloads.
+__all__ = ["put_blob", "get_blob", "is_valid_blob_ref", "offload_text", "load_full_text", "iter_blob_refs", "read_blob_file", "restore_blob_file"]
+import os
+import re
+import zlib
+import hashlib
+import logging
+import tempfile
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+blob_store_cfg = core_yaml_config.get("blob_store", {}) or {}
+BLOB_STORE_ENABLED = bool(blob_store_cfg.get("enabled", True))
+BLOB_STORE_DIR = blob_store_cfg.get("directory", "./my_data/blobs")
+BLOB_THRESHOLD_BYTES = int(blob_store_cfg.get("threshold_bytes", 2048)) # Bodies larger than this are offloaded.
+BLOB_PREVIEW_CHARS = int(blob_store_cfg.get("preview_chars", 280)) # Characters kept inline on the ticket.
+
+BLOB_REF_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Blobs are sharded by the first two hex characters of their SHA-256 to keep directories small.
+def _blob_path(blob_ref):
+    return os.path.join(BLOB_STORE_DIR, blob_ref[:2], f"{blob_ref}.z")
+
+def is_valid_blob_ref(blob_ref) -> bool:
+    return isinstance(blob_ref, str) and bool(BLOB_REF_PATTERN.match(blob_ref))
+
+# Write to a temporary file first so a crash never leaves a truncated blob behind.
+def _write_blob_file(blob_path, compressed):
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as blob_file:
+            blob_file.write(compressed)
+        os.replace(tmp_path, blob_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Store text and return its SHA-256 reference. Identical content is only ever written once.
+def put_blob(text: str) -> str:
+    raw_bytes = text.encode("utf-8")
+    blob_ref = hashlib.sha256(raw_bytes).hexdigest()
+    blob_path = _blob_path(blob_ref)
+    if os.path.exists(blob_path):
+        logging.debug("BLOB STORE - %s already stored; deduplicated.", blob_ref)
+        return blob_ref
+
+    _write_blob_file(blob_path, zlib.compress(raw_bytes, 6))
+    logging.debug("BLOB STORE - Stored %s (%s bytes).", blob_ref, len(raw_bytes))
+    return blob_ref
+
+# Returns the stored text, or None if the reference is invalid or missing.
+def get_blob(blob_ref: str):
+    if not is_valid_blob_ref(blob_ref):
+        return None
+    try:
+        with open(_blob_path(blob_ref), "rb") as blob_file:
+            return zlib.decompress(blob_file.read()).decode("utf-8")
+    except FileNotFoundError:
+        logging.error("BLOB STORE - Blob %s could not be located.", blob_ref)
+        return None
+
+# Returns (inline_text, blob_ref). Small text stays inline and blob_ref is None.
+def offload_text(text):
+    if not BLOB_STORE_ENABLED or not isinstance(text, str):
+        return text, None
+    if len(text.encode("utf-8")) <= BLOB_THRESHOLD_BYTES:
+        return text, None
+    blob_ref = put_blob(text)
+    preview = text[:BLOB_PREVIEW_CHARS].rstrip() + "…"
+    return preview, blob_ref
+
+# Resolve a ticket or note field that may have been offloaded. Falls back to the inline preview.
+def load_full_text(record: dict, field: str, ref_field: str):
+    blob_ref = record.get(ref_field)
+    if blob_ref:
+        full_text = get_blob(blob_ref)
+        if full_text is not None:
+            return full_text
+    return record.get(field, "")
+
+# Every stored blob reference, for snapshots. Blobs are never modified, so a reference always names the same bytes.
+def iter_blob_refs():
+    try:
+        prefixes = sorted(os.listdir(BLOB_STORE_DIR))
+    except FileNotFoundError:
+        return
+    for prefix in prefixes:
+        prefix_dir = os.path.join(BLOB_STORE_DIR, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for file_name in sorted(os.listdir(prefix_dir)):
+            if file_name.endswith(".z") and is_valid_blob_ref(file_name[:-2]):
+                yield file_name[:-2]
+
+# The compressed bytes of a stored blob, or None if it is missing.
+def read_blob_file(blob_ref):
+    try:
+        with open(_blob_path(blob_ref), "rb") as blob_file:
+            return blob_file.read()
+    except FileNotFoundError:
+        return None
+
+# Writes a blob back from its compressed bytes unless it is already stored. The content must hash to blob_ref.
+# Returns True if the blob was written.
+def restore_blob_file(blob_ref, compressed):
+    blob_path = _blob_path(blob_ref)
+    if os.path.exists(blob_path):
+        return False
+    if hashlib.sha256(zlib.decompress(compressed)).hexdigest() != blob_ref:
+        raise ValueError(f"Blob {blob_ref} does not match its content.")
+    _write_blob_file(blob_path, compressed)
+    return True
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# Local module for change requests (CHG- records). Changes live in their own file, separate from the ticket database,
+# with an in-memory index by status and by scheduled window so the changes module never scans incidents.
+__all__ = ["CHANGE_STATUSES", "OPEN_CHANGE_STATUSES", "ChangeIndex", "get_change_index", "load_changes", "save_changes",
+           "generate_change_request_number", "create_change", "update_change_status"]
+import os
+import re
+import bisect
+import logging
+import threading
+from datetime import datetime
+import local_ticket_serializer
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+CHANGES_FILE = core_yaml_config.get("changes_file", "./my_data/changes.json")
+WINDOW_FORMAT = "%Y-%m-%dT%H:%M" # HTML datetime-local input format, used for scheduled_start/scheduled_end.
+
+CHANGE_STATUSES = ["Planned", "Approved", "In-Progress", "Completed", "Cancelled"]
+OPEN_CHANGE_STATUSES = ["Planned", "Approved", "In-Progress"]
+CHANGE_RISKS = ["Low", "Medium", "High"]
+CHANGE_NUMBER_PATTERN = re.compile(r"^[A-Z]+-(\d{4})-(\d+)$")
+
+_index = None
+_index_signature = None
+_store_lock = threading.RLock()
+
+# Missing file means no changes have been raised yet.
+def load_changes():
+    try:
+        return local_ticket_serializer.read_tickets_file(CHANGES_FILE)
+    except FileNotFoundError:
+        return []
+
+def save_changes(changes):
+    local_ticket_serializer.write_tickets_file(CHANGES_FILE, changes)
+    logging.debug("The Change JSON Database file was modified.")
+
+# Oldest first: CHG-2026-9999 before CHG-2026-10000. Numbers in another format sort after, as strings.
+def _number_order(change_number):
+    number_match = CHANGE_NUMBER_PATTERN.match(change_number or "")
+    if number_match:
+        return (0, int(number_match.group(1)), int(number_match.group(2)), "")
+    return (1, 0, 0, str(change_number))
+
+def parse_window(value):
+    try:
+        return datetime.strptime(value, WINDOW_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+class ChangeIndex:
+    """Change records indexed by number, by status and by scheduled window start."""
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.by_number = {}
+        self.by_status = {status: [] for status in CHANGE_STATUSES}
+        self.window_starts = [] # Sorted (start, number) for every change with a valid window.
+        self.window_ends = {}
+        self.longest_window = None
+        for change in changes:
+            number = change["change_number"]
+            self.by_number[number] = change
+            self.by_status.setdefault(change.get("change_status", "Planned"), []).append(number)
+            start = parse_window(change.get("scheduled_start"))
+            end = parse_window(change.get("scheduled_end")) or start
+            if start is not None:
+                self.window_starts.append((start, number))
+                self.window_ends[number] = max(start, end)
+                duration = self.window_ends[number] - start
+                if self.longest_window is None or duration > self.longest_window:
+                    self.longest_window = duration
+        self.window_starts.sort()
+
+    def get(self, change_number):
+        return self.by_number.get(change_number)
+
+    def with_status(self, statuses):
+        numbers = [number for status in statuses for number in self.by_status.get(status, [])]
+        return [self.by_number[number] for number in sorted(numbers, key=_number_order)]
+
+    # Changes whose scheduled window overlaps [range_start, range_end). Binary search on start, bounded by the longest window.
+    def scheduled_between(self, range_start, range_end):
+        if self.longest_window is None:
+            return []
+        first = bisect.bisect_left(self.window_starts, (range_start - self.longest_window, ""))
+        last = bisect.bisect_left(self.window_starts, (range_end, ""))
+        return [self.by_number[number] for start, number in self.window_starts[first:last] if self.window_ends[number] >= range_start]
+
+def _store_signature():
+    try:
+        stat = os.stat(CHANGES_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Cached for this process and rebuilt only when the changes file changed on disk (another worker may have written it).
+def get_change_index():
+    global _index, _index_signature
+    with _store_lock:
+        signature = _store_signature()
+        if _index is None or signature != _index_signature:
+            _index = ChangeIndex(load_changes())
+            _index_signature = signature
+        return _index
+
+def _save_and_reindex(changes):
+    global _index, _index_signature
+    save_changes(changes)
+    _index = ChangeIndex(changes)
+    _index_signature = _store_signature()
+
+# Format: CHG-YYYY-XXXX, numbered within the change store so incident volume does not affect it.
+def generate_change_request_number():
+    current_year = datetime.now().year
+    prefix = f"CHG-{current_year}-"
+    year_numbers = [int(number[len(prefix):]) for number in get_change_index().by_number if number.startswith(prefix) and number[len(prefix):].isdigit()]
+    return f"{prefix}{str(max(year_numbers, default=0) + 1).zfill(4)}"
+
+def create_change(subject, description, risk, requested_by, scheduled_start, scheduled_end, related_ticket=""):
+    with _store_lock:
+        change = {
+            "change_number": generate_change_request_number(),
+            "change_subject": subject,
+            "change_description": description,
+            "change_risk": risk if risk in CHANGE_RISKS else "Medium",
+            "change_status": "Planned",
+            "requested_by": requested_by,
+            "assigned_technician": requested_by,
+            "related_ticket": related_ticket,
+            "scheduled_start": scheduled_start,
+            "scheduled_end": scheduled_end,
+            "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "closure_date": None,
+        }
+        changes = list(get_change_index().changes)
+        changes.append(change)
+        _save_and_reindex(changes)
+        return change
+
+# Returns the updated change, or None if it does not exist.
+def update_change_status(change_number, change_status, technician):
+    with _store_lock:
+        changes = [dict(change) for change in get_change_index().changes]
+        for change in changes:
+            if change["change_number"] == change_number:
+                change["change_status"] = change_status
+                if change_status in ("Completed", "Cancelled"):
+                    change["closed_by"] = technician
+                    change["closure_date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                _save_and_reindex(changes)
+                return change
+        return None
@@ -6,9 +6,17 @@ import os
 
 CONFIG_PATH = "./my_data/core_configuration.yml"
 
-def load_core_config():
+# Parsed once per process and shared by every module. Pass refresh=True to re-read the file.
+_cached_config = None
+
+def load_core_config(refresh=False):
+    global _cached_config
+    if _cached_config is not None and not refresh:
+        return _cached_config
+
     if not os.path.exists(CONFIG_PATH):
         raise FileNotFoundError(f"core_configuration.yml missing at {CONFIG_PATH}")
 
     with open(CONFIG_PATH, "r") as config_file:
-        return yaml.safe_load(config_file)
\ No newline at end of file
+        _cached_config = yaml.safe_load(config_file)
+    return _cached_config
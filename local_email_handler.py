@@ -6,14 +6,17 @@ import smtplib
 import imaplib
 import email
 import re
+import hashlib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
+from email.utils import parseaddr, make_msgid
 from dotenv import load_dotenv
-import json
 from datetime import datetime
 from local_config_loader import load_core_config
+import local_ticket_store, local_note_store, local_metrics
+from local_message_index import message_index, normalize_message_id, referenced_message_ids
 
 load_dotenv(".env")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
@@ -25,15 +28,9 @@ EMAIL_ACCOUNT = core_yaml_config["email"]["account"]
 IMAP_SERVER = core_yaml_config["email"]["imap_server"]
 SMTP_SERVER = core_yaml_config["email"]["smtp_server"]
 SMTP_PORT = core_yaml_config["email"]["smtp_port"]
-TICKETS_FILE = core_yaml_config["tickets_file"]
-LOG_LEVEL = core_yaml_config["logging"]["level"]
-LOG_FILE = core_yaml_config["logging"]["file"]
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+IMAP_PORT = core_yaml_config["email"].get("imap_port", 993)
+IMAP_SSL = core_yaml_config["email"].get("imap_ssl", True) # false only for local test servers.
+SMTP_STARTTLS = core_yaml_config["email"].get("smtp_starttls", True) # false only for local test servers.
 
 """
 Logging expectations:
@@ -43,22 +40,9 @@ Warning - Unexpected but non-breaking events
 Error - Failures of functions that the app can recover from
 Critical - Serious application failures
 """
-# Helper functions below for loading and saving tickets.
-def load_tickets():
-    try:
-        with open(TICKETS_FILE, "r") as tkt_file:
-            return json.load(tkt_file)
-    except FileNotFoundError:
-        return []
-
-def save_tickets(tickets):
-    with open(TICKETS_FILE, "w") as f:
-        json.dump(tickets, f, indent=4)
-    logging.debug("EMAIL HANDLER - Ticket database was updated.")
-
-# Helpers functions above only! Core functions below.
-# Send an email if EMAIL_ENABLED is True.
-def send_email(requestor_email, ticket_subject, ticket_message, html=True):
+# Tickets are read and written through local_ticket_store. Core functions below.
+# Send an email if EMAIL_ENABLED is True. With ticket_number, the Message-ID is indexed so replies thread to the ticket.
+def send_email(requestor_email, ticket_subject, ticket_message, html=True, ticket_number=None):
     if not EMAIL_ENABLED:
         logging.info("EMAIL HANDLER - Email skipped; EMAIL_ENABLED=False.")
         return False
@@ -71,20 +55,27 @@ def send_email(requestor_email, ticket_subject, ticket_message, html=True):
     msg["Subject"] = ticket_subject
     msg["From"] = EMAIL_ACCOUNT
     msg["To"] = requestor_email
+    msg["Message-ID"] = make_msgid(domain=EMAIL_ACCOUNT.rsplit("@", 1)[-1] if "@" in EMAIL_ACCOUNT else None)
     msg.attach(MIMEText(ticket_message, "html" if html else "plain"))
 
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_ACCOUNT, requestor_email, msg.as_string())
-
-        logging.info(f"EMAIL HANDLER - Email sent to {requestor_email}")
-        return True
+    with local_metrics.timed("goobydesk_smtp_send_duration_seconds", "SMTP send time by outcome.") as metric_labels:
+        try:
+            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+                if SMTP_STARTTLS:
+                    server.starttls()
+                server.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
+                server.sendmail(EMAIL_ACCOUNT, requestor_email, msg.as_string())
+
+            logging.info("EMAIL HANDLER - Email sent to %s", requestor_email)
+            if ticket_number:
+                message_index.record(msg["Message-ID"], ticket_number, "sent")
+            metric_labels["outcome"] = "success"
+            return True
 
-    except Exception as e:
-        logging.error(f"EMAIL HANDLER - Email sending failed: {e}")
-        return False
+        except Exception as e:
+            logging.error("EMAIL HANDLER - Email sending failed: %s", e)
+            metric_labels["outcome"] = "error"
+            return False
 
 def extract_email_body(msg):
     logging.debug("EMAIL HANDLER - Extracting email body.")
@@ -101,12 +92,12 @@ def extract_email_body(msg):
                 elif ctype == "text/html" and not body:
                     body = part.get_payload(decode=True).decode(errors="ignore").strip()
             except Exception as e:
-                logging.warning(f"EMAIL HANDLER - Failed decoding email part: {e}")
+                logging.warning("EMAIL HANDLER - Failed decoding email part: %s", e)
     else:
         try:
             body = msg.get_payload(decode=True).decode(errors="ignore").strip()
         except Exception as e:
-            logging.error(f"EMAIL HANDLER - Failed decoding email: {e}")
+            logging.error("EMAIL HANDLER - Failed decoding email: %s", e)
     return body
 
 def fetch_email_replies():
@@ -115,17 +106,23 @@ def fetch_email_replies():
         logging.debug("EMAIL HANDLER - Skipping IMAP fetch; EMAIL_ENABLED=False.")
         return
     logging.debug("EMAIL HANDLER - Checking IMAP for new email replies.")
+    with local_metrics.timed("goobydesk_imap_sync_duration_seconds", "IMAP sync cycle time by outcome.") as metric_labels:
+        metric_labels["outcome"] = _sync_email_replies()
 
+# One IMAP sync cycle. Returns the outcome label for the sync metrics.
+def _sync_email_replies():
     try:
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
+        if IMAP_SSL:
+            mail = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT)
+        else:
+            mail = imaplib.IMAP4(IMAP_SERVER, IMAP_PORT)
         mail.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
         mail.select("inbox")
         status, messages = mail.search(None, "UNSEEN")
         if status != "OK":
             logging.error("EMAIL HANDLER - IMAP search failed.")
-            return
+            return "error"
         email_ids = messages[0].split()
-        tickets = load_tickets()
         for email_id in email_ids:
             status, msg_data = mail.fetch(email_id, "(RFC822)")
             if status != "OK":
@@ -136,24 +133,40 @@ def fetch_email_replies():
                     continue
 
                 msg = email.message_from_bytes(part[1])
-                subject_raw, encoding = decode_header(msg["Subject"])[0]
-                if isinstance(subject_raw, bytes):
-                    subject = subject_raw.decode(encoding or "utf-8")
-                else:
-                    subject = subject_raw
-                ticket_match = re.search(r"TKT-\d{4}-\d+", subject)
-                if not ticket_match:
+                # A message without a Message-ID gets one derived from its content, so it is still ingested only once.
+                message_id = normalize_message_id(msg.get("Message-ID")) or f"<{hashlib.sha256(part[1]).hexdigest()}@goobydesk.invalid>"
+                if message_index.is_ingested(message_id):
+                    logging.info("EMAIL HANDLER - %s was already ingested; skipping.", message_id)
+                    local_metrics.inc_counter("goobydesk_email_replies_total", "Fetched email replies by outcome.", outcome="duplicate")
                     continue
 
-                ticket_id = ticket_match.group(0)
+                # Thread by In-Reply-To/References first; the subject may have been edited. Fall back to TKT- in the subject.
+                ticket_id = message_index.ticket_for(referenced_message_ids(msg))
+                if ticket_id is None:
+                    subject_raw, encoding = decode_header(msg.get("Subject", ""))[0]
+                    if isinstance(subject_raw, bytes):
+                        subject = subject_raw.decode(encoding or "utf-8")
+                    else:
+                        subject = subject_raw
+                    ticket_match = re.search(r"TKT-\d{4}-\d+", subject)
+                    if not ticket_match:
+                        local_metrics.inc_counter("goobydesk_email_replies_total", "Fetched email replies by outcome.", outcome="unmatched")
+                        continue
+                    ticket_id = ticket_match.group(0)
+
                 body = extract_email_body(msg)
-                for t in tickets:
-                    if t["ticket_number"] == ticket_id:
-                        t["ticket_notes"].append({"ticket_message": body})
-                        save_tickets(tickets)
-                        logging.info(f"EMAIL HANDLER - Email reply added to {ticket_id}.")
-                        break
+                if local_ticket_store.get_ticket(ticket_id) is None:
+                    logging.warning("EMAIL HANDLER - Reply for unknown ticket %s ignored.", ticket_id)
+                    local_metrics.inc_counter("goobydesk_email_replies_total", "Fetched email replies by outcome.", outcome="unmatched")
+                    continue
+                # Appended to the ticket's note stream. Long replies go to the blob store; the note keeps a preview.
+                local_note_store.append_note(ticket_id, body, author=parseaddr(msg.get("From", ""))[1] or None, source="email", message_id=message_id)
+                message_index.record(message_id, ticket_id, "ingested")
+                local_metrics.inc_counter("goobydesk_email_replies_total", "Fetched email replies by outcome.", outcome="appended")
+                logging.info("EMAIL HANDLER - Email reply added to %s.", ticket_id)
         mail.logout()
+        return "success"
 
     except Exception as e:
-        logging.error(f"EMAIL HANDLER - IMAP error: {e}")
+        logging.error("EMAIL HANDLER - IMAP error: %s", e)
+        return "error"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Local module for caching rendered HTML fragments shared by every technician: the dashboard ticket list and each
+# ticket's detail block. Fragments are keyed by the store version (file signatures, so writes from any gunicorn worker
+# invalidate them) or by a per-ticket content version, and evicted least-recently-used under a memory cap.
+# Per-user parts of a page (loggedInTech, BUILDID) stay in the outer template and are rendered on every request.
+__all__ = ["FragmentCache", "fragment_cache", "render_fragment", "ticket_version"]
+import threading
+from collections import OrderedDict
+from flask import render_template
+from markupsafe import Markup
+import local_metrics
+import local_ticket_store
+import local_ticket_model
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+fragment_cfg = core_yaml_config.get("fragment_cache", {}) or {}
+FRAGMENT_CACHE_ENABLED = bool(fragment_cfg.get("enabled", True))
+FRAGMENT_CACHE_MAX_BYTES = int(fragment_cfg.get("max_bytes", 16 * 1024 * 1024)) # Per worker process.
+MAX_TRACKED_TICKET_VERSIONS = 50000
+
+class FragmentCache:
+    """LRU map of key -> rendered HTML, bounded by the total size of the cached HTML."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = html
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                local_metrics.inc_counter("goobydesk_fragment_cache_evictions_total", "Fragments evicted to stay under the memory cap.")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_MAX_BYTES)
+_ticket_versions = {} # ticket number -> (shard signature, content digest)
+
+# Content version of one ticket. Only re-hashed after its shard was written, so a change to one ticket leaves every
+# other ticket's cached detail block valid. The hash covers the light fields and a body marker, so it never reads a
+# cached ticket's body.
+def ticket_version(ticket):
+    ticket_number = ticket.get("ticket_number")
+    shard_signature = local_ticket_store.shard_signature(local_ticket_store.shard_for(ticket_number))
+    cached = _ticket_versions.get(ticket_number)
+    if cached is not None and cached[0] == shard_signature:
+        return cached[1]
+    digest = local_ticket_model.ticket_digest(ticket)
+    if len(_ticket_versions) >= MAX_TRACKED_TICKET_VERSIONS:
+        _ticket_versions.clear()
+    _ticket_versions[ticket_number] = (shard_signature, digest)
+    return digest
+
+# Returns the fragment for key, rendering template_name with context_factory() only on a miss.
+# context_factory is a callable so a hit skips loading the data as well as rendering it.
+def render_fragment(fragment, key, template_name, context_factory):
+    cache_key = (fragment,) + tuple(key)
+    html = fragment_cache.get(cache_key) if FRAGMENT_CACHE_ENABLED else None
+    if html is None:
+        local_metrics.inc_counter("goobydesk_fragment_cache_requests_total", "Fragment cache lookups by fragment and outcome.", fragment=fragment, outcome="miss")
+        html = render_template(template_name, **context_factory())
+        if FRAGMENT_CACHE_ENABLED:
+            fragment_cache.put(cache_key, html)
+    else:
+        local_metrics.inc_counter("goobydesk_fragment_cache_requests_total", "Fragment cache lookups by fragment and outcome.", fragment=fragment, outcome="hit")
+    return Markup(html)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Local module for response compression and cache-friendly static assets.
+# HTML, JSON and CSV responses are gzip or Brotli compressed when the client accepts it. Streamed responses (CSV
+# exports) are compressed chunk by chunk, so they still stream.
+# url_for('static', ...) gets a ?v=<content hash> parameter, and a request carrying the current hash is served with an
+# immutable Cache-Control, so browsers only re-download styles.css or helpdesk.js after they actually change.
+__all__ = ["static_asset_version", "init_http_delivery"]
+import os
+import zlib
+import hashlib
+from flask import current_app, request
+import local_metrics
+from local_config_loader import load_core_config
+
+# Optional Brotli encoder. GoobyDesk falls back to gzip without it.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+core_yaml_config = load_core_config()
+http_cfg = core_yaml_config.get("http_delivery", {}) or {}
+COMPRESSION_ENABLED = bool(http_cfg.get("compression", True))
+COMPRESSION_MIN_BYTES = int(http_cfg.get("compression_min_bytes", 512)) # Smaller bodies are not worth the CPU or headers.
+GZIP_LEVEL = int(http_cfg.get("gzip_level", 6))
+BROTLI_QUALITY = int(http_cfg.get("brotli_quality", 5)) # 4-6 is the usual trade-off for dynamic responses.
+STATIC_MAX_AGE = int(http_cfg.get("static_max_age", 31536000)) # For versioned asset URLs. One year.
+STREAM_FLUSH_BYTES = 16 * 1024 # Streamed responses flush compressed output at least this often.
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json", "text/csv"}
+
+_asset_versions = {} # path -> (mtime_ns, size, version)
+
+# Short content hash of a file in the static folder, or None if it does not exist. Re-hashed only when the file changes.
+def static_asset_version(static_folder, filename):
+    path = os.path.join(static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _asset_versions.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, "rb") as asset_file:
+        version = hashlib.sha256(asset_file.read()).hexdigest()[:12]
+    _asset_versions[path] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+def _add_static_version(endpoint, values):
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        version = static_asset_version(current_app.static_folder, values["filename"])
+        if version:
+            values["v"] = version
+
+def _set_static_cache_headers(response):
+    if request.endpoint != "static" or response.status_code != 200:
+        return response
+    version = request.args.get("v")
+    if version and version == static_asset_version(current_app.static_folder, request.view_args.get("filename", "")):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned or stale URL: the browser may keep it but must revalidate (ETag/Last-Modified) first.
+        response.cache_control.no_cache = True
+    return response
+
+def _compressor(encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # wbits 31 = gzip container
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+def _compress_stream(chunks, encoding):
+    compress, flush, finish = _compressor(encoding)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        output = compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            output += flush()
+            pending = 0
+        if output:
+            yield output
+    yield finish()
+
+def _compress_response(response):
+    if not COMPRESSION_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (request.method == "HEAD" or response.direct_passthrough or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)):
+        return response
+
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        original = response.response
+        response.response = _compress_stream(original, encoding)
+        if hasattr(original, "close"):
+            response.call_on_close(original.close)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return response
+        compress, _, finish = _compressor(encoding)
+        response.set_data(compress(body) + finish())
+    response.headers["Content-Encoding"] = encoding
+    local_metrics.inc_counter("goobydesk_http_compressed_responses_total", "Responses compressed, by encoding.", encoding=encoding)
+    return response
+
+def init_http_delivery(app):
+    app.url_defaults(_add_static_version)
+    app.after_request(_set_static_cache_headers)
+    app.after_request(_compress_response)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Local module for periodic background jobs (IMAP sync, snapshots, index rebuilds, archive rolls) in place of one
+# hand-written sleep loop per task. Jobs are registered by name with either an interval or a 5-field cron expression
+# ("minute hour day-of-month month day-of-week", e.g. "0 * * * *" for hourly), plus optional jitter so workers and
+# hosts do not all fire at the same second. Settings under jobs.<name> in the configuration override the defaults
+# given at registration.
+#
+# One dispatcher thread per process starts each due job in its own thread, so a slow job never delays the others.
+# A job still running when it falls due again is not started twice; that run is counted as skipped. A job that
+# outlives timeout_seconds is reported as timed out (Python threads cannot be killed, so it is left to finish and no
+# new run starts until it does). A failed run is retried after retry_seconds, doubling up to the normal schedule.
+#
+# Singleton jobs run in one process only, under a local_leader lease. Followers keep trying for the lease, so one
+# takes over within leader.retry_seconds of the leader dying and runs the job at its next scheduled time. The leader
+# writes the job's last-run status into its lock file with each heartbeat, so every worker can report it.
+#
+# trigger() asks for an extra run now, from any worker: it drops a <job>.trigger file next to the job's lock file,
+# and whichever process runs the job picks it up within leader.retry_seconds. A job disabled in the configuration is
+# still registered for triggered runs, but never runs on its schedule.
+__all__ = ["CronSchedule", "Job", "JobScheduler", "job_scheduler"]
+import os
+import json
+import time
+import random
+import tempfile
+import logging
+import threading
+from datetime import datetime, timedelta
+import local_leader
+import local_metrics
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+JOBS_CONFIG = core_yaml_config.get("jobs", {}) or {}
+
+class CronSchedule:
+    """Standard 5-field cron expression: numbers, *, ranges (1-5), lists (1,15) and steps (*/10, 8-18/2)."""
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7)) # Day of week 0 and 7 are both Sunday.
+
+    def __init__(self, expression):
+        fields = str(expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expression!r}")
+        self.expression = " ".join(fields)
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES))
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        # As in cron, when both day fields are restricted a day matching either one fires.
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.next_after(datetime.now()) # Rejects expressions that can never fire, such as "0 0 30 2 *".
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for item in field.split(","):
+            value_range, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if value_range == "*":
+                start, end = low, high
+            elif "-" in value_range:
+                start, end = (int(value) for value in value_range.split("-", 1))
+            else:
+                start = int(value_range)
+                end = high if step > 1 else start # "5/15" means from 5 in steps of 15.
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_match
+        if self.any_weekday:
+            return day_match
+        return day_match or weekday_match
+
+    # First matching minute strictly after moment. Skips whole months, days and hours that cannot match.
+    def next_after(self, moment):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(5000):
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+def _trigger_path(name):
+    return os.path.join(local_leader.LOCK_DIRECTORY, f"{name}.trigger")
+
+# Removes and returns a pending trigger's arguments, or None if there is none.
+def _take_trigger(name):
+    path = _trigger_path(name)
+    try:
+        with open(path, "r") as trigger_file:
+            run_kwargs = json.load(trigger_file)
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logging.warning("JOBS - Ignoring an unreadable trigger for %s.", name)
+        os.remove(path)
+        return None
+    return run_kwargs if isinstance(run_kwargs, dict) else {}
+
+class Job:
+    """One registered job: its schedule, and the status of its runs in this process."""
+
+    def __init__(self, name, func, interval_s=None, cron=None, jitter_s=0, timeout_s=None, retry_s=30, singleton=True, scheduled=True):
+        if (interval_s is None) == (cron is None):
+            raise ValueError(f"Job {name} needs exactly one of interval_seconds or cron")
+        if interval_s is not None and float(interval_s) <= 0:
+            raise ValueError(f"Job {name} needs a positive interval_seconds")
+        self.name = name
+        self.func = func
+        self.interval_s = float(interval_s) if interval_s is not None else None
+        self.cron = CronSchedule(cron) if cron is not None else None
+        self.jitter_s = float(jitter_s or 0)
+        self.timeout_s = float(timeout_s) if timeout_s else None
+        self.retry_s = float(retry_s or 0)
+        self.lease = local_leader.LeaderLease(name) if singleton else None
+        self.scheduled = scheduled # False: only runs when triggered.
+        self.run_kwargs = None # Arguments of the triggered run in progress.
+
+        self.next_due = None # time.monotonic() of the next run.
+        self.thread = None
+        self.started = None # time.monotonic() of the running job, for the timeout.
+        self.timed_out = False
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_duration_s = None
+        self.last_outcome = None # success, error or timeout
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def describe_schedule(self):
+        schedule = f"cron {self.cron.expression}" if self.cron else f"every {self.interval_s:g}s"
+        if not self.scheduled:
+            return f"on trigger only ({schedule} when enabled)"
+        return f"{schedule} +{self.jitter_s:g}s jitter" if self.jitter_s else schedule
+
+    # Seconds from now until the next scheduled run, jitter included.
+    def scheduled_delay(self):
+        if not self.scheduled:
+            return float("inf")
+        if self.cron:
+            now = datetime.now()
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = self.interval_s
+        return delay + random.uniform(0, self.jitter_s)
+
+    # After a failure: retry_s, doubling with each consecutive failure, never later than the normal schedule.
+    def retry_delay(self):
+        scheduled = self.scheduled_delay()
+        if not self.retry_s or not self.scheduled:
+            return scheduled
+        return min(self.retry_s * 2 ** min(self.consecutive_failures - 1, 16), scheduled)
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            "job": self.name,
+            "schedule": self.describe_schedule(),
+            "singleton": self.lease is not None,
+            "leader": self.lease.is_leader if self.lease else True,
+            "running": self.running,
+            "running_for_s": round(now - self.started, 1) if self.running else None,
+            "timeout_s": self.timeout_s,
+            "next_run": (datetime.now() + timedelta(seconds=max(0.0, self.next_due - now))).strftime("%Y-%m-%d %H:%M:%S") if self.scheduled and self.next_due is not None else None,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_duration_s": self.last_duration_s,
+            "last_outcome": self.last_outcome,
+            "last_error": self.last_error,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped": self.skipped,
+        }
+
+class JobScheduler:
+    """Registry of jobs plus the dispatcher thread that runs them."""
+
+    def __init__(self, jobs_config=None):
+        self.jobs_config = JOBS_CONFIG if jobs_config is None else jobs_config
+        self.jobs = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._next_lease_check = 0.0
+        self._next_heartbeat = 0.0
+
+    # Registers func under name. Keyword arguments are the defaults; jobs.<name> in the configuration overrides them
+    # (enabled, interval_seconds, cron, jitter_seconds, timeout_seconds, retry_seconds). A disabled job only runs when
+    # triggered. Returns the Job.
+    def register(self, name, func, interval_s=None, cron=None, jitter_s=0, timeout_s=None, retry_s=30, singleton=True, enabled=True):
+        job_cfg = self.jobs_config.get(name, {}) or {}
+        if "cron" in job_cfg or "interval_seconds" in job_cfg:
+            interval_s, cron = job_cfg.get("interval_seconds"), job_cfg.get("cron")
+        job = Job(name, func, interval_s=interval_s, cron=cron,
+                  jitter_s=job_cfg.get("jitter_seconds", jitter_s),
+                  timeout_s=job_cfg.get("timeout_seconds", timeout_s),
+                  retry_s=job_cfg.get("retry_seconds", retry_s),
+                  singleton=singleton,
+                  scheduled=bool(job_cfg.get("enabled", enabled)))
+        with self._condition:
+            if name in self.jobs:
+                raise ValueError(f"Job {name} is already registered")
+            # Interval jobs first run shortly after startup, as the old sleep loops did; cron jobs wait for their time.
+            # A disabled job never comes due and only runs when triggered.
+            if not job.scheduled:
+                job.next_due = float("inf")
+            else:
+                job.next_due = time.monotonic() + (random.uniform(0, job.jitter_s) if job.interval_s else job.scheduled_delay())
+            self.jobs[name] = job
+            self._condition.notify()
+        logging.info("JOBS - Registered %s (%s).", name, job.describe_schedule())
+        return job
+
+    # Asks for a run of a registered job as soon as possible, with func(**kwargs), in whichever process runs the job.
+    # A trigger still pending is replaced. Returns False if the job is not registered in this process.
+    def trigger(self, name, **kwargs):
+        with self._condition:
+            if name not in self.jobs:
+                return False
+        os.makedirs(local_leader.LOCK_DIRECTORY, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=local_leader.LOCK_DIRECTORY, prefix=f".{name}-", suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(kwargs, tmp_file)
+        os.replace(tmp_path, _trigger_path(name))
+        logging.info("JOBS - %s triggered.", name)
+        with self._condition:
+            self._next_lease_check = 0.0 # Pick it up now if this process runs the job.
+            self._condition.notify()
+        return True
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._dispatch, name="job-scheduler", daemon=True)
+            self._thread.start()
+
+    # Status of every job in this process. For singleton jobs led by another worker, "leader_status" holds the
+    # leader's own copy of the status from its lock file.
+    def status(self):
+        with self._condition:
+            statuses = [job.status() for job in self.jobs.values()]
+        for job_status in statuses:
+            if job_status["singleton"]:
+                job_status["leader_status"] = local_leader.lease_holder(job_status["job"])
+        return statuses
+
+    def _heartbeat(self, job):
+        if job.lease is not None and job.lease.is_leader:
+            job.lease.heartbeat(job.status())
+
+    def _dispatch(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                check_leases = now >= self._next_lease_check
+                if check_leases:
+                    self._next_lease_check = now + local_leader.RETRY_SECONDS
+                heartbeat = now >= self._next_heartbeat
+                if heartbeat:
+                    self._next_heartbeat = now + local_leader.HEARTBEAT_SECONDS
+
+                for job in self.jobs.values():
+                    if check_leases and job.lease is not None and not job.lease.is_leader:
+                        job.lease.try_acquire()
+                    if heartbeat:
+                        self._heartbeat(job)
+
+                    if check_leases and not job.running and (job.lease is None or job.lease.is_leader):
+                        run_kwargs = _take_trigger(job.name)
+                        if run_kwargs is not None:
+                            self._start_job(job, now, run_kwargs)
+
+                    if job.running:
+                        self._check_timeout(job, now)
+                        if now >= job.next_due:
+                            job.skipped += 1
+                            job.next_due = now + job.scheduled_delay()
+                            logging.warning("JOBS - %s is still running; skipping this run.", job.name)
+                            local_metrics.inc_counter("goobydesk_job_skipped_total", "Job runs skipped because the previous run was still going.", job=job.name)
+                        continue
+                    if now < job.next_due:
+                        continue
+                    job.next_due = now + job.scheduled_delay()
+                    if job.lease is not None and not job.lease.is_leader:
+                        continue # Another process runs it.
+                    self._start_job(job, now)
+
+                wake_at = min([self._next_lease_check, self._next_heartbeat] + [job.next_due for job in self.jobs.values()])
+                for job in self.jobs.values():
+                    if job.running and job.timeout_s and not job.timed_out:
+                        wake_at = min(wake_at, job.started + job.timeout_s)
+                self._condition.wait(timeout=max(0.05, wake_at - time.monotonic()))
+
+    def _check_timeout(self, job, now):
+        if job.timeout_s and not job.timed_out and now - job.started > job.timeout_s:
+            job.timed_out = True
+            logging.error("JOBS - %s has run for more than %ss; no new run starts until it returns.", job.name, f"{job.timeout_s:g}")
+            local_metrics.inc_counter("goobydesk_job_timeouts_total", "Job runs that outlived their timeout.", job=job.name)
+
+    # Called with the condition held.
+    def _start_job(self, job, now, run_kwargs=None):
+        job.run_kwargs = run_kwargs
+        job.started = now
+        job.timed_out = False
+        job.last_started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        job.thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.name}", daemon=True)
+        job.thread.start()
+
+    def _run_job(self, job):
+        error = None
+        try:
+            job.func(**(job.run_kwargs or {}))
+        except Exception as e:
+            error = e
+            logging.error("JOBS - %s failed: %s", job.name, e)
+        finished = time.monotonic()
+
+        with self._condition:
+            duration = finished - job.started
+            outcome = "timeout" if job.timed_out else ("error" if error else "success")
+            job.runs += 1
+            job.last_finished = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            job.last_duration_s = round(duration, 3)
+            job.last_outcome = outcome
+            job.last_error = str(error) if error else None
+            if outcome == "success":
+                job.consecutive_failures = 0
+            else:
+                job.failures += 1
+                job.consecutive_failures += 1
+                job.next_due = min(job.next_due, finished + job.retry_delay())
+            job.thread = None
+            job.started = None
+            job.run_kwargs = None
+            self._heartbeat(job)
+            self._condition.notify()
+        local_metrics.observe("goobydesk_job_duration_seconds", duration, "Background job run time.", job=job.name)
+        local_metrics.inc_counter("goobydesk_job_runs_total", "Background job runs by outcome.", job=job.name, outcome=outcome)
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Local module for running singleton background jobs (IMAP sync, compaction, archiving) in exactly one process.
+# Every gunicorn worker registers the same jobs (see local_job_scheduler); each is guarded by a lock file in leader.directory.
+# The leader holds an exclusive flock() on it, which the kernel releases the moment that process exits or is killed,
+# so a follower polling every leader.retry_seconds takes over within seconds. While it holds the lease, the leader
+# rewrites the file with its pid, a heartbeat timestamp and the job's last-run status, so anyone can see who runs a
+# job and whether it is alive.
+# Without fcntl (Windows, where GoobyDesk runs as a single process) every process is the leader.
+__all__ = ["LeaderLease", "lease_holder"]
+import os
+import json
+import time
+import socket
+import logging
+from datetime import datetime
+import local_metrics
+from local_config_loader import load_core_config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+core_yaml_config = load_core_config()
+leader_cfg = core_yaml_config.get("leader", {}) or {}
+LOCK_DIRECTORY = leader_cfg.get("directory", "./my_data/locks")
+RETRY_SECONDS = float(leader_cfg.get("retry_seconds", 2)) # How often followers try to take over.
+HEARTBEAT_SECONDS = float(leader_cfg.get("heartbeat_seconds", 5)) # How often the leader refreshes its heartbeat.
+
+class LeaderLease:
+    """Exclusive, non-blocking lease on one named job for the lifetime of this process (or until release())."""
+
+    def __init__(self, name, directory=None):
+        self.name = name
+        self.path = os.path.join(directory or LOCK_DIRECTORY, f"{name}.lock")
+        self._fd = None
+        self._acquired_at = None
+
+    @property
+    def is_leader(self):
+        return self._fd is not None
+
+    # Returns True if this process holds the lease, taking it if it is free.
+    def try_acquire(self):
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        self._acquired_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logging.info("LEADER - pid %s is now the leader for %s.", os.getpid(), self.name)
+        local_metrics.set_gauge("goobydesk_leader", 1, "1 when this process runs the singleton job.", job=self.name)
+        self.heartbeat()
+        return True
+
+    # status is extra fields to publish alongside the heartbeat, such as the job's last run.
+    def heartbeat(self, status=None):
+        if self._fd is None:
+            return
+        status = json.dumps(dict(status or {}, job=self.name, pid=os.getpid(), host=socket.gethostname(),
+                                 acquired=self._acquired_at, heartbeat=time.time())).encode("utf-8")
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, status, 0)
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+        local_metrics.set_gauge("goobydesk_leader", 0, "1 when this process runs the singleton job.", job=self.name)
+
+# Who holds a job's lease, from its lock file: {"job", "pid", "host", "acquired", "heartbeat", "heartbeat_age_s"},
+# plus whatever status the leader published with its last heartbeat.
+# None if the job never ran. A heartbeat much older than heartbeat_seconds means the leader process is hung.
+def lease_holder(name, directory=None):
+    try:
+        with open(os.path.join(directory or LOCK_DIRECTORY, f"{name}.lock"), "r") as lock_file:
+            holder = json.loads(lock_file.read() or "null")
+    except (FileNotFoundError, ValueError):
+        return None
+    if isinstance(holder, dict) and "heartbeat" in holder:
+        holder["heartbeat_age_s"] = round(time.time() - holder["heartbeat"], 1)
+    return holder
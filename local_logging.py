@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Local module for the GoobyDesk logging pipeline. Configured once by app.py.
+# Request threads only put records on an in-memory queue; a single listener thread formats and writes them.
+__all__ = ["setup_logging", "init_request_logging", "PayloadPreview"]
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime
+from flask import g, request, has_request_context
+import local_metrics
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+logging_cfg = core_yaml_config.get("logging", {}) or {}
+LOG_LEVEL = logging_cfg.get("level", "INFO")
+LOG_FILE = logging_cfg.get("file", "/var/log/goobydesk.log")
+LOG_FORMAT = logging_cfg.get("format", "text") # text or json (one JSON object per line).
+LOG_QUEUE_SIZE = int(logging_cfg.get("queue_size", 10000)) # Records beyond this are dropped, never blocking a request.
+LOG_ACCESS = bool(logging_cfg.get("access_log", False)) # One line per request with its duration.
+MAX_PAYLOAD_CHARS = int(logging_cfg.get("max_payload_chars", 2048))
+PAYLOAD_LIMITS = logging_cfg.get("payload_limits", {}) or {} # Per-source overrides, e.g. uptime-kuma: 512
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+_queue_handler = None
+
+"""
+Logging expectations:
+Debug - Detailed information for troubleshooting
+Info - Successful operations
+Warning - Unexpected but non-breaking events
+Error - Failures of functions that the app can recover from
+Critical - Serious application failures
+"""
+
+class PayloadPreview:
+    """Wraps a webhook payload for logging. It is only converted and truncated if the record is actually written."""
+    __slots__ = ("payload", "source")
+
+    def __init__(self, payload, source):
+        self.payload = payload
+        self.source = source
+
+    def __str__(self):
+        limit = int(PAYLOAD_LIMITS.get(self.source, MAX_PAYLOAD_CHARS))
+        text = str(self.payload)
+        if len(text) <= limit:
+            return text
+        return f"{text[:limit]}... [{len(text) - limit} more chars truncated]"
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues the record untouched so %-style formatting happens on the listener thread, and drops instead of blocking."""
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+            local_metrics.inc_counter("goobydesk_log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+class RequestContextFilter(logging.Filter):
+    # Runs on the calling thread, so the Flask request context is still available.
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+class JSONLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "method", "path", "status", "duration_ms"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+# Configure the root logger once. Safe to call repeatedly; later calls are no-ops.
+def setup_logging():
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    try:
+        file_handler = logging.FileHandler(LOG_FILE)
+    except OSError:
+        # Missing permissions on /var/log should not stop the app from starting.
+        file_handler = logging.StreamHandler()
+    file_handler.setFormatter(JSONLinesFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE if LOG_QUEUE_SIZE > 0 else 0)
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root_logger = logging.getLogger()
+    for existing_handler in list(root_logger.handlers):
+        root_logger.removeHandler(existing_handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+
+    _queue_handler = queue_handler
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener) # Flush queued records on shutdown.
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+# Threads do not survive fork(). A pre-forked worker (gunicorn preload_app) gets a fresh queue and its own listener
+# thread; the file handler is inherited, so every worker keeps appending to the same log file.
+def _restart_listener_after_fork():
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE if LOG_QUEUE_SIZE > 0 else 0)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+def _assign_request_id():
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    g.logging_request_start = time.perf_counter()
+
+def _finish_request_log(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    request_start = g.pop("logging_request_start", None)
+    if LOG_ACCESS and request_start is not None:
+        duration_ms = round((time.perf_counter() - request_start) * 1000, 2)
+        logging.info("%s %s %s %.2fms", request.method, request.path, response.status_code, duration_ms,
+            extra={"method": request.method, "path": request.path, "status": response.status_code, "duration_ms": duration_ms})
+    return response
+
+# Request IDs (echoed as X-Request-ID) and the optional access log.
+def init_request_logging(app):
+    app.before_request(_assign_request_id)
+    app.after_request(_finish_request_log)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Local module for email threading: which ticket each Message-ID belongs to, and which replies were already ingested.
+# Outgoing confirmations record their Message-ID. An ingested reply records its own Message-ID, so replies to
+# replies thread as well. A reply is matched through In-Reply-To/References first, so it still reaches its ticket
+# after the requester edits the subject, and it is skipped if its Message-ID was already ingested.
+#
+# The index is an append-only JSON lines file (email.message_index), one {"m": id, "t": ticket, "k": kind} per line.
+# Each process reads it once and then only the lines appended since, so a lookup is a dict hit.
+__all__ = ["MessageIndex", "message_index", "normalize_message_id", "referenced_message_ids"]
+import os
+import re
+import json
+import logging
+import threading
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+MESSAGE_INDEX_FILE = (core_yaml_config.get("email", {}) or {}).get("message_index", "./my_data/email_index.jsonl")
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+
+def normalize_message_id(value):
+    if not value:
+        return None
+    message_id_match = MESSAGE_ID_PATTERN.search(str(value))
+    return message_id_match.group(0) if message_id_match else None
+
+# Message-IDs this message replies to, most specific first: In-Reply-To, then References from newest to oldest.
+def referenced_message_ids(msg):
+    message_ids = MESSAGE_ID_PATTERN.findall(str(msg.get("In-Reply-To", "")))
+    message_ids += reversed(MESSAGE_ID_PATTERN.findall(str(msg.get("References", ""))))
+    return message_ids
+
+class MessageIndex:
+    """Message-ID -> ticket number, plus the Message-IDs of replies already appended as notes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tickets = {}
+        self._ingested = set()
+        self._inode = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    # Applies lines appended by any process since the last refresh. Called with the lock held.
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._tickets, self._ingested, self._inode, self._offset = {}, set(), stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, "rb") as index_file:
+            index_file.seek(self._offset)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    break # Still being written; picked up next time.
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line)
+                    self._tickets[entry["m"]] = entry["t"]
+                    if entry.get("k") == "ingested":
+                        self._ingested.add(entry["m"])
+                except (ValueError, KeyError, TypeError):
+                    logging.warning("MESSAGE INDEX - Skipping an unreadable line in %s.", self.path)
+
+    # kind is "sent" for our own outgoing mail or "ingested" for a reply appended to a ticket.
+    def record(self, message_id, ticket_number, kind):
+        message_id = normalize_message_id(message_id)
+        if not message_id:
+            return
+        line = (json.dumps({"m": message_id, "t": ticket_number, "k": kind}) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) # One write per line: writers never interleave.
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._refresh()
+
+    def is_ingested(self, message_id):
+        with self._lock:
+            self._refresh()
+            return normalize_message_id(message_id) in self._ingested
+
+    # First ticket found for any of the given Message-IDs, in order.
+    def ticket_for(self, message_ids):
+        with self._lock:
+            self._refresh()
+            for message_id in message_ids:
+                ticket_number = self._tickets.get(normalize_message_id(message_id))
+                if ticket_number:
+                    return ticket_number
+        return None
+
+message_index = MessageIndex(MESSAGE_INDEX_FILE)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Local module for in-process metrics rendered in the Prometheus text format.
+# Recording is a dict lookup and an integer increment under a lock, so it is cheap whether or not anything scrapes.
+__all__ = ["inc_counter", "set_gauge", "observe", "timed", "add_timing_listener", "render_metrics"]
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}   # (name, labels) -> value
+_gauges = {}     # (name, labels) -> value
+_histograms = {} # (name, labels) -> [bucket_counts, sum, count]
+_help = {}       # name -> (type, help text)
+_timing_listeners = [] # callables(name, seconds, labels) notified by timed(); empty unless profiling is on
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def inc_counter(name, help_text="", amount=1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _help.setdefault(name, ("counter", help_text))
+        _counters[key] = _counters.get(key, 0) + amount
+
+def set_gauge(name, value, help_text="", **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _help.setdefault(name, ("gauge", help_text))
+        _gauges[key] = value
+
+def observe(name, value, help_text="", **labels):
+    key = (name, _labels_key(labels))
+    bucket_index = bisect.bisect_left(DEFAULT_BUCKETS, value)
+    with _lock:
+        _help.setdefault(name, ("histogram", help_text))
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = [[0] * (len(DEFAULT_BUCKETS) + 1), 0.0, 0]
+            _histograms[key] = histogram
+        histogram[0][bucket_index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+# Times the wrapped block into a histogram. Set outcome on the yielded dict to label success/failure.
+@contextmanager
+def timed(name, help_text="", **labels):
+    outcome_labels = dict(labels)
+    start = time.perf_counter()
+    try:
+        yield outcome_labels
+    except Exception:
+        outcome_labels.setdefault("outcome", "exception")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(name, elapsed, help_text, **outcome_labels)
+        for listener in _timing_listeners:
+            listener(name, elapsed, outcome_labels)
+
+def add_timing_listener(listener):
+    _timing_listeners.append(listener)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def render_metrics() -> str:
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+        help_entries = dict(_help)
+
+    lines = []
+    for name in sorted(help_entries):
+        metric_type, help_text = help_entries[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == "counter":
+            for (metric_name, labels), value in sorted(counters.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        elif metric_type == "gauge":
+            for (metric_name, labels), value in sorted(gauges.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            for (metric_name, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                cumulative = 0
+                for upper_bound, bucket_count in zip(DEFAULT_BUCKETS, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', upper_bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Local module for ticket notes: one append-only JSON lines stream per ticket in notes.directory, e.g.
+# ./my_data/notes/2026/TKT-2026-0042.jsonl. Each line is one note:
+#   {"author": "demouser", "timestamp": "2026-10-18 09:12:00", "source": "technician", "body": "..."}
+# plus "body_blob" when a long body was offloaded to the blob store. Notes are never part of the ticket record, so a
+# chatty ticket does not weigh down every load and save of the database, and adding a note never rewrites a shard.
+# Ticket Commander reads one page at a time, newest first, from the end of the stream.
+#
+# Notes written before streams existed stay in the ticket's ticket_notes list until goobydesk_db.py upgrade moves
+# them to the front of the stream. Until then they are read as the oldest notes.
+__all__ = ["append_note", "iter_notes", "count_notes", "page_notes", "note_blob_refs", "legacy_notes",
+           "migrate_inline_notes", "stream_path", "stream_files", "read_stream", "write_stream_lines"]
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+import local_metrics
+import local_blob_store
+from local_requester_index import requester_index
+from local_ticket_store import TICKET_NUMBER_PATTERN
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+notes_cfg = core_yaml_config.get("notes", {}) or {}
+NOTES_DIRECTORY = notes_cfg.get("directory", "./my_data/notes")
+NOTES_PER_PAGE = int(notes_cfg.get("per_page", 25))
+TAIL_BLOCK_BYTES = 64 * 1024
+
+_count_lock = threading.Lock()
+_note_counts = {} # stream path -> (inode, size, newline count). Streams only grow, so a larger size is counted from the old end.
+
+def stream_path(ticket_number):
+    number_match = TICKET_NUMBER_PATTERN.match(ticket_number or "")
+    if not number_match:
+        raise ValueError(f"Not a ticket number: {ticket_number!r}")
+    return os.path.join(NOTES_DIRECTORY, number_match.group(1), f"{ticket_number}.jsonl")
+
+# Every note stream on disk as (ticket number, path).
+def stream_files():
+    streams = []
+    if not os.path.isdir(NOTES_DIRECTORY):
+        return streams
+    for year in sorted(os.listdir(NOTES_DIRECTORY)):
+        year_directory = os.path.join(NOTES_DIRECTORY, year)
+        if not year.isdigit() or not os.path.isdir(year_directory):
+            continue
+        for file_name in sorted(os.listdir(year_directory)):
+            if file_name.endswith(".jsonl"):
+                streams.append((file_name[:-len(".jsonl")], os.path.join(year_directory, file_name)))
+    return streams
+
+def _encode(record):
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _decode(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = None
+    if not isinstance(record, dict):
+        logging.warning("NOTE STORE - Skipping an unreadable note line.")
+        return {"author": None, "timestamp": None, "source": "unreadable", "body": "(unreadable note)"}
+    return record
+
+# Appends raw lines in a single O_APPEND write, so concurrent writers (threads or gunicorn workers) never interleave.
+def write_stream_lines(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def make_note(body, author=None, source="technician", timestamp=None):
+    preview, blob_ref = local_blob_store.offload_text(body)
+    note = {"author": author, "timestamp": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "source": source, "body": preview}
+    if blob_ref:
+        note["body_blob"] = blob_ref
+    return note
+
+# Appends one note. The caller checks the ticket exists. Email replies also keep their Message-ID. Returns the stored note.
+def append_note(ticket_number, body, author=None, source="technician", message_id=None):
+    note = make_note(body, author, source)
+    if message_id:
+        note["message_id"] = message_id
+    write_stream_lines(stream_path(ticket_number), _encode(note))
+    requester_index.touch(ticket_number) # The requester sees the ticket was updated.
+    local_metrics.inc_counter("goobydesk_notes_appended_total", "Ticket notes appended, by source.", source=source)
+    return note
+
+# Inline notes from before note streams, oldest first. Technicians wrote plain strings; email replies wrote dicts.
+def legacy_notes(ticket):
+    notes = []
+    for inline_note in ticket.get("ticket_notes") or []:
+        if isinstance(inline_note, dict):
+            note = {"author": None, "timestamp": None, "source": "email", "body": inline_note.get("ticket_message", "")}
+            if inline_note.get("ticket_message_blob"):
+                note["body_blob"] = inline_note["ticket_message_blob"]
+        else:
+            note = {"author": None, "timestamp": None, "source": "technician", "body": str(inline_note)}
+        notes.append(note)
+    return notes
+
+# Yields (note, end offset) for each complete line in [start, end) of a stream. A line still being written is left out,
+# so the last end offset is where the next read should start.
+def read_stream(path, start=0, end=None):
+    with open(path, "rb") as stream:
+        stream.seek(start)
+        offset = start
+        for line in stream:
+            if not line.endswith(b"\n") or (end is not None and offset + len(line) > end):
+                return
+            offset += len(line)
+            if line.strip():
+                yield _decode(line), offset
+
+def iter_notes(ticket_number):
+    try:
+        for note, _ in read_stream(stream_path(ticket_number)):
+            yield note
+    except FileNotFoundError:
+        return
+
+def _count_stream(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    with _count_lock:
+        cached = _note_counts.get(path)
+    if cached and cached[0] == stat.st_ino and cached[1] == stat.st_size:
+        return cached[2]
+    start, count = (cached[1], cached[2]) if cached and cached[0] == stat.st_ino and cached[1] < stat.st_size else (0, 0)
+    with open(path, "rb") as stream:
+        stream.seek(start)
+        remaining = stat.st_size - start
+        while remaining > 0:
+            block = stream.read(min(TAIL_BLOCK_BYTES, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            count += block.count(b"\n")
+    with _count_lock:
+        _note_counts[path] = (stat.st_ino, stat.st_size, count)
+    return count
+
+def count_notes(ticket):
+    return _count_stream(stream_path(ticket["ticket_number"])) + len(ticket.get("ticket_notes") or [])
+
+# Complete lines from the end of a stream, newest first: skip `skip` of them, then return up to `limit`.
+def _tail_lines(path, skip, limit):
+    found = []
+    try:
+        stream = open(path, "rb")
+    except FileNotFoundError:
+        return found
+    with stream:
+        position = stream.seek(0, os.SEEK_END)
+        pending = b""
+        tail_dropped = False # Text after the last newline is a note still being written.
+        while position > 0 and len(found) < skip + limit:
+            read_size = min(TAIL_BLOCK_BYTES, position)
+            position -= read_size
+            stream.seek(position)
+            lines = (stream.read(read_size) + pending).split(b"\n")
+            pending = lines.pop(0)
+            if lines and not tail_dropped:
+                lines.pop()
+                tail_dropped = True
+            found.extend(line for line in reversed(lines) if line.strip())
+        if position == 0 and tail_dropped and pending.strip():
+            found.append(pending)
+    return found[skip:skip + limit]
+
+# One page of a ticket's notes, newest first. Each note gets its 1-based position in the thread as "number".
+def page_notes(ticket, page=1, per_page=None):
+    per_page = per_page or NOTES_PER_PAGE
+    path = stream_path(ticket["ticket_number"])
+    legacy = legacy_notes(ticket)
+    stream_count = _count_stream(path)
+    total = stream_count + len(legacy)
+    pages = max(1, -(-total // per_page))
+    page = min(max(1, page), pages)
+    start, end = (page - 1) * per_page, min(page * per_page, total)
+
+    notes = [_decode(line) for line in _tail_lines(path, start, max(0, min(end, stream_count) - start))]
+    # Past the stream come the legacy notes, which are older than anything in it.
+    notes.extend(legacy[total - 1 - index] for index in range(max(start, stream_count), end))
+    for offset, note in enumerate(notes):
+        note["number"] = total - start - offset
+    return {"notes": notes, "page": page, "pages": pages, "total": total, "per_page": per_page}
+
+# Blob references of every note on a ticket, for authorising "Show Full Reply".
+def note_blob_refs(ticket):
+    refs = {note.get("body_blob") for note in legacy_notes(ticket)}
+    refs.update(note.get("body_blob") for note in iter_notes(ticket["ticket_number"]))
+    refs.discard(None)
+    return refs
+
+# Moves a ticket's inline notes to the front of its stream and removes them from the ticket. Migrated notes carry
+# "legacy": true, so running this again after an interrupted upgrade does not copy them twice. Returns the number moved.
+def migrate_inline_notes(ticket):
+    if "ticket_notes" not in ticket:
+        return 0
+    inline_count = len(ticket["ticket_notes"] or [])
+    if inline_count == 0:
+        del ticket["ticket_notes"]
+        return 0
+    path = stream_path(ticket["ticket_number"])
+    first_note = next(iter_notes(ticket["ticket_number"]), None)
+    if first_note is None or not first_note.get("legacy"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_stream:
+                for note in legacy_notes(ticket):
+                    tmp_stream.write(_encode(dict(note, legacy=True)))
+                if os.path.exists(path):
+                    with open(path, "rb") as stream:
+                        for line in stream:
+                            if line.endswith(b"\n"):
+                                tmp_stream.write(line)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    del ticket["ticket_notes"]
+    return inline_count
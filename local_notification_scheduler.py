@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# Local module for paced, coalescing delivery of chat notifications (Discord, Slack, Teams365).
+# Events are queued per channel. A channel sends at most once per digest window and within its token-bucket budget;
+# everything that arrives in between is merged into one digest ("14 new tickets, 6 closed"). A 429 Retry-After pauses
+# only that channel and the digest is kept, not lost. A lone event on a quiet channel is still sent straight away.
+# Budgets are per process: with several gunicorn workers each worker has its own.
+__all__ = ["Digest", "NotificationScheduler"]
+import time
+import atexit
+import logging
+import threading
+import local_metrics
+from local_rate_limiter import TokenBucket
+
+class Digest:
+    """Pending events for one channel: counts per kind, a bounded sample of events, and delivery attempts."""
+
+    def __init__(self, sample_size):
+        self.sample_size = sample_size
+        self.counts = {}
+        self.events = []
+        self.total = 0
+        self.attempts = 0
+
+    def add(self, kind, event):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.total += 1
+        if len(self.events) < self.sample_size:
+            self.events.append(event)
+
+    # Puts an undelivered digest back in front of events queued since.
+    def merge_earlier(self, earlier):
+        for kind, count in earlier.counts.items():
+            self.counts[kind] = self.counts.get(kind, 0) + count
+        self.total += earlier.total
+        self.events = (earlier.events + self.events)[:self.sample_size]
+        self.attempts = max(self.attempts, earlier.attempts)
+
+class _ChannelState:
+    __slots__ = ("bucket", "pending", "sending", "last_sent", "blocked_until")
+
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.pending = None
+        self.sending = False
+        self.last_sent = float("-inf")
+        self.blocked_until = 0.0
+
+class NotificationScheduler:
+    """Runs deliver(channel, digest) on a background thread. deliver returns (delivered, retry_after_seconds or None);
+    retry_after after a success means the channel told us to pause (e.g. Discord's bucket is empty)."""
+
+    def __init__(self, deliver, window_s=10.0, rate=0.5, burst=5, max_attempts=3, sample_size=10):
+        self.deliver = deliver
+        self.window_s = float(window_s)
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.sample_size = sample_size
+        self._channels = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is None:
+                atexit.register(self.flush, 2.0) # Best effort: daemon threads die with the process.
+            self._thread = threading.Thread(target=self._run, name="notification-scheduler", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, channel, kind, event):
+        self.start()
+        with self._condition:
+            state = self._channels.get(channel)
+            if state is None:
+                state = self._channels[channel] = _ChannelState(self.rate, self.burst)
+            if state.pending is None:
+                state.pending = Digest(self.sample_size)
+            state.pending.add(kind, event)
+            self._condition.notify()
+        local_metrics.inc_counter("goobydesk_notifications_queued_total", "Notification events queued, by channel.", channel=channel)
+
+    # Seconds until the channel may send, or 0 when it may send now (a budget token is then taken).
+    def _wait_time(self, state, now, ignore_window=False):
+        wait = max(state.blocked_until - now, 0.0 if ignore_window else state.last_sent + self.window_s - now)
+        if wait > 0:
+            return wait
+        return state.bucket.consume(now)
+
+    def _take_ready(self, now, ignore_window=False):
+        ready = []
+        next_due = None
+        for channel, state in self._channels.items():
+            if state.pending is None or state.sending:
+                continue
+            wait = self._wait_time(state, now, ignore_window)
+            if wait <= 0:
+                ready.append((channel, state.pending))
+                state.pending, state.sending = None, True
+            elif next_due is None or wait < next_due:
+                next_due = wait
+        return ready, next_due
+
+    def _finish(self, channel, digest, delivered, retry_after):
+        now = time.monotonic()
+        with self._condition:
+            state = self._channels[channel]
+            state.sending = False
+            if retry_after:
+                state.blocked_until = now + retry_after
+            if delivered:
+                state.last_sent = now
+                local_metrics.inc_counter("goobydesk_notifications_sent_total", "Notification messages sent, by channel.", channel=channel)
+                local_metrics.inc_counter("goobydesk_notifications_events_delivered_total", "Events delivered, by channel.", amount=digest.total, channel=channel)
+            else:
+                if not retry_after:
+                    digest.attempts += 1
+                    state.blocked_until = now + min(300, 5 * 2 ** digest.attempts) # Back off on errors other than 429.
+                if digest.attempts >= self.max_attempts:
+                    logging.error("NOTIFICATIONS - Dropped %s %s events after %s failed attempts.", digest.total, channel, digest.attempts)
+                    local_metrics.inc_counter("goobydesk_notifications_dropped_total", "Events dropped after repeated failures, by channel.", amount=digest.total, channel=channel)
+                elif state.pending is None:
+                    state.pending = digest
+                else:
+                    state.pending.merge_earlier(digest)
+            self._condition.notify()
+
+    def _send(self, ready):
+        for channel, digest in ready:
+            try:
+                delivered, retry_after = self.deliver(channel, digest)
+            except Exception as e:
+                logging.error("NOTIFICATIONS - %s delivery raised: %s", channel, e)
+                delivered, retry_after = False, None
+            self._finish(channel, digest, delivered, retry_after)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                ready, next_due = self._take_ready(time.monotonic())
+                if not ready:
+                    self._condition.wait(timeout=next_due)
+                    continue
+            self._send(ready)
+
+    # Sends everything pending now, ignoring the digest window but not Retry-After. Used at shutdown and by tests.
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._condition:
+                ready, _ = self._take_ready(time.monotonic(), ignore_window=True)
+                busy = any(state.pending is not None or state.sending for state in self._channels.values())
+            if ready:
+                self._send(ready)
+            elif not busy:
+                return True
+            else:
+                time.sleep(0.05)
+        return False
+
+    def stats(self):
+        now = time.monotonic()
+        with self._condition:
+            return {channel: {
+                "pending_events": state.pending.total if state.pending else 0,
+                "paused_for_s": round(max(0.0, state.blocked_until - now), 1),
+            } for channel, state in self._channels.items()}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Local module for opt-in request profiling and slow-request capture.
+# A sampled request gets a stack-sampling profiler that writes collapsed stacks (flamegraph.pl / speedscope input).
+# Every request over the slow threshold is written to a JSON-lines log with a per-phase timing breakdown.
+__all__ = ["SamplingProfiler", "init_profiling"]
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime
+from flask import g, request, has_request_context, before_render_template, template_rendered
+import local_metrics
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+profiling_cfg = core_yaml_config.get("profiling", {}) or {}
+PROFILING_ENABLED = bool(profiling_cfg.get("enabled", False))
+PROFILE_SAMPLE_RATE = float(profiling_cfg.get("sample_rate", 0.0)) # Fraction of requests profiled automatically.
+PROFILE_INTERVAL_MS = float(profiling_cfg.get("sample_interval_ms", 5))
+PROFILE_OUTPUT_DIR = profiling_cfg.get("output_dir", "./my_data/profiles")
+SLOW_REQUEST_MS = float(profiling_cfg.get("slow_request_ms", 1000))
+SLOW_REQUEST_LOG = profiling_cfg.get("slow_request_log", "./my_data/slow_requests.log")
+PROFILE_HEADER = "X-GoobyDesk-Profile"
+
+# Metric timings from local_metrics.timed() mapped to slow-request phases.
+def _phase_name(metric_name, labels):
+    if metric_name == "goobydesk_ticket_store_duration_seconds":
+        return f"store_{labels.get('operation', 'io')}"
+    if metric_name == "goobydesk_webhook_delivery_duration_seconds":
+        return f"webhook_{labels.get('service', 'unknown')}"
+    if metric_name == "goobydesk_turnstile_verify_duration_seconds":
+        return "turnstile"
+    if metric_name == "goobydesk_smtp_send_duration_seconds":
+        return "smtp"
+    return metric_name
+
+def _add_phase_time(phase, seconds):
+    if has_request_context() and "profiling_phases" in g:
+        g.profiling_phases[phase] = g.profiling_phases.get(phase, 0.0) + seconds
+
+class SamplingProfiler:
+    """Samples one thread's Python stack on a fixed interval and counts identical stacks."""
+
+    def __init__(self, target_thread_id, interval_s):
+        self.target_thread_id = target_thread_id
+        self.interval_s = interval_s
+        self.stack_counts = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            collapsed = ";".join(reversed(stack))
+            self.stack_counts[collapsed] = self.stack_counts.get(collapsed, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def write_collapsed(self, output_file):
+        with open(output_file, "w") as profile_file:
+            for stack, count in sorted(self.stack_counts.items(), key=lambda item: -item[1]):
+                profile_file.write(f"{stack} {count}\n")
+
+# PROFILING_TOKEN from .env, sent as the X-GoobyDesk-Profile header, profiles a single request.
+def _profile_requested():
+    profiling_token = os.getenv("PROFILING_TOKEN")
+    if profiling_token:
+        supplied = request.headers.get(PROFILE_HEADER)
+        if supplied and hmac.compare_digest(supplied, profiling_token):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def _start_request():
+    g.profiling_start = time.perf_counter()
+    g.profiling_phases = {}
+    if _profile_requested():
+        g.profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        g.profiler.start()
+
+def _finish_request(response):
+    request_start = g.pop("profiling_start", None)
+    if request_start is None:
+        return response
+    duration_s = time.perf_counter() - request_start
+    phases = g.pop("profiling_phases", {})
+    endpoint = request.endpoint or "unmatched"
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        try:
+            os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+            profile_file = os.path.join(PROFILE_OUTPUT_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{endpoint}-{uuid.uuid4().hex[:8]}.folded")
+            profiler.write_collapsed(profile_file)
+            logging.info("PROFILER - %s samples for %s %s written to %s", profiler.samples, request.method, request.path, profile_file)
+        except OSError as e:
+            logging.error("PROFILER - Failed to write profile: %s", e)
+
+    if duration_s * 1000 >= SLOW_REQUEST_MS:
+        phase_ms = {phase: round(seconds * 1000, 2) for phase, seconds in phases.items()}
+        slow_entry = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "duration_ms": round(duration_s * 1000, 2),
+            "phases_ms": phase_ms,
+            "unaccounted_ms": round(duration_s * 1000 - sum(phase_ms.values()), 2),
+        }
+        logging.warning("PROFILER - Slow request %s %s took %sms. Phases: %s", request.method, request.path, slow_entry['duration_ms'], phase_ms)
+        try:
+            with open(SLOW_REQUEST_LOG, "a") as slow_log:
+                slow_log.write(json.dumps(slow_entry) + "\n")
+        except OSError as e:
+            logging.error("PROFILER - Failed to write slow request log: %s", e)
+    return response
+
+def _render_started(sender, template, context, **extra):
+    if has_request_context():
+        g.profiling_render_start = time.perf_counter()
+
+def _render_finished(sender, template, context, **extra):
+    if has_request_context():
+        render_start = g.pop("profiling_render_start", None)
+        if render_start is not None:
+            _add_phase_time("render", time.perf_counter() - render_start)
+
+# Installs the request hooks. Does nothing unless profiling.enabled is true, so there is no cost when it is off.
+def init_profiling(app):
+    if not PROFILING_ENABLED:
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    local_metrics.add_timing_listener(lambda name, seconds, labels: _add_phase_time(_phase_name(name, labels), seconds))
+    logging.info("PROFILER - Enabled. sample_rate=%s, slow_request_ms=%s.", PROFILE_SAMPLE_RATE, SLOW_REQUEST_MS)
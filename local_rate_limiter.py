@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# Local module for token-bucket rate limiting of the /api ingest endpoints.
+__all__ = ["TokenBucket", "RateLimiter", "client_ip"]
+import math
+import threading
+import time
+
+# The client's IP for a Flask request. Behind a reverse proxy (Caddy) every request arrives from 127.0.0.1, so with
+# trust_proxy_headers the first X-Forwarded-For address is used instead.
+def client_ip(flask_request, trust_proxy_headers=False):
+    if trust_proxy_headers:
+        forwarded_for = flask_request.headers.get("X-Forwarded-For", "")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return flask_request.remote_addr or "unknown"
+
+# Defaults used when core_configuration.yml has no api_rate_limit section.
+DEFAULT_SOURCE_RATE = 1.0   # Tokens per second for each ingest source.
+DEFAULT_SOURCE_BURST = 30   # Bucket size for each ingest source.
+DEFAULT_IP_RATE = 0.5       # Tokens per second for each client IP.
+DEFAULT_IP_BURST = 20       # Bucket size for each client IP.
+DEFAULT_MAX_TRACKED_IPS = 10000
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    # Returns 0 when a token was taken, otherwise the seconds until one is available.
+    def consume(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+class RateLimiter:
+    """Per-source and per-IP token buckets with counters for allowed and limited requests."""
+
+    def __init__(self, enabled=True, source_rate=DEFAULT_SOURCE_RATE, source_burst=DEFAULT_SOURCE_BURST,
+                 ip_rate=DEFAULT_IP_RATE, ip_burst=DEFAULT_IP_BURST, source_overrides=None,
+                 max_tracked_ips=DEFAULT_MAX_TRACKED_IPS):
+        self.enabled = enabled
+        self.source_rate = source_rate
+        self.source_burst = source_burst
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.source_overrides = source_overrides or {}
+        self.max_tracked_ips = max_tracked_ips
+        self._source_buckets = {}
+        self._ip_buckets = {}
+        self._allowed = {}
+        self._limited = {}
+        self._limited_by_ip_total = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, rate_limit_cfg):
+        rate_limit_cfg = rate_limit_cfg or {}
+        per_source = rate_limit_cfg.get("per_source", {}) or {}
+        per_ip = rate_limit_cfg.get("per_ip", {}) or {}
+        return cls(
+            enabled=bool(rate_limit_cfg.get("enabled", True)),
+            source_rate=float(per_source.get("rate", DEFAULT_SOURCE_RATE)),
+            source_burst=float(per_source.get("burst", DEFAULT_SOURCE_BURST)),
+            ip_rate=float(per_ip.get("rate", DEFAULT_IP_RATE)),
+            ip_burst=float(per_ip.get("burst", DEFAULT_IP_BURST)),
+            source_overrides=rate_limit_cfg.get("sources", {}) or {},
+            max_tracked_ips=int(rate_limit_cfg.get("max_tracked_ips", DEFAULT_MAX_TRACKED_IPS)),
+        )
+
+    def _source_bucket(self, source):
+        bucket = self._source_buckets.get(source)
+        if bucket is None:
+            override = self.source_overrides.get(source, {}) or {}
+            bucket = TokenBucket(override.get("rate", self.source_rate), override.get("burst", self.source_burst))
+            self._source_buckets[source] = bucket
+        return bucket
+
+    def _ip_bucket(self, client_ip, now):
+        bucket = self._ip_buckets.get(client_ip)
+        if bucket is None:
+            if len(self._ip_buckets) >= self.max_tracked_ips:
+                # Forget clients whose bucket has fully refilled; they are indistinguishable from new ones.
+                self._ip_buckets = {ip: b for ip, b in self._ip_buckets.items() if not b.is_idle(now)}
+            bucket = TokenBucket(self.ip_rate, self.ip_burst)
+            self._ip_buckets[client_ip] = bucket
+        return bucket
+
+    # Returns 0 if the request may proceed, otherwise the Retry-After value in whole seconds.
+    def check(self, source: str, client_ip: str) -> int:
+        if not self.enabled:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            ip_wait = self._ip_bucket(client_ip, now).consume(now)
+            if ip_wait:
+                self._limited[source] = self._limited.get(source, 0) + 1
+                self._limited_by_ip_total += 1
+                return max(1, math.ceil(ip_wait)) if ip_wait != float("inf") else 3600
+
+            source_wait = self._source_bucket(source).consume(now)
+            if source_wait:
+                # Refund the IP token so one noisy source does not drain a client's other budgets.
+                self._ip_buckets[client_ip].tokens += 1
+                self._limited[source] = self._limited.get(source, 0) + 1
+                return max(1, math.ceil(source_wait)) if source_wait != float("inf") else 3600
+
+            self._allowed[source] = self._allowed.get(source, 0) + 1
+            return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            sources = sorted(set(self._allowed) | set(self._limited))
+            return {
+                "enabled": self.enabled,
+                "limited_total": sum(self._limited.values()),
+                "limited_by_ip_total": self._limited_by_ip_total,
+                "tracked_ips": len(self._ip_buckets),
+                "sources": {
+                    source: {
+                        "allowed": self._allowed.get(source, 0),
+                        "limited": self._limited.get(source, 0),
+                    }
+                    for source in sources
+                },
+            }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# Local module for the requester index: requestor_email -> that requester's tickets, with just enough of each ticket
+# for the public "My Tickets" page (number, subject, status, last update). A lookup touches only the requester's own
+# tickets instead of scanning the database, and never needs a ticket's content.
+#
+# The index is an append-only JSON lines file (self_service.requester_index). local_ticket_store appends
+# {"t": number, "e": email, "s": subject, "st": status, "u": updated} whenever it writes a ticket, and a note append
+# adds {"t": number, "u": updated}. The last line for a ticket wins. Each process reads the file once and then only
+# the lines appended since. The index-compaction job (local_ticket_store.compact_ticket_indexes) rewrites it compactly
+# from the ticket database once it holds too many lines per ticket, as does goobydesk_db.py rebuild-indexes.
+__all__ = ["RequesterIndex", "requester_index", "normalize_email", "index_entry", "appended_since"]
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+REQUESTER_INDEX_FILE = (core_yaml_config.get("self_service", {}) or {}).get("requester_index", "./my_data/requester_index.jsonl")
+
+def normalize_email(value):
+    return str(value or "").strip().lower() or None
+
+# Index line for a ticket. Without an explicit time, the ticket was just written.
+def index_entry(ticket, updated=None):
+    return {"t": ticket.get("ticket_number"), "e": normalize_email(ticket.get("requestor_email")),
+            "s": ticket.get("ticket_subject", ""), "st": ticket.get("ticket_status", ""),
+            "u": updated if updated is not None else datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+# Complete lines appended to path after it was start_size bytes long. Shared with local_work_queue.
+def appended_since(path, start_size):
+    if start_size is None:
+        return ""
+    try:
+        with open(path, "rb") as index_file:
+            index_file.seek(start_size)
+            appended = index_file.read()
+    except FileNotFoundError:
+        return ""
+    return appended[:appended.rfind(b"\n") + 1].decode("utf-8")
+
+class RequesterIndex:
+    """Requester email -> ticket summaries, tailed from an append-only file shared by every process."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tickets = {} # ticket number -> latest index entry
+        self._by_email = {} # email -> set of ticket numbers
+        self._lines = 0 # Lines applied from the current file.
+        self._inode = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _apply(self, entry):
+        ticket_number = entry["t"]
+        previous = self._tickets.get(ticket_number)
+        if "e" not in entry: # A note was added: only the last update moves.
+            if previous is not None:
+                self._tickets[ticket_number] = dict(previous, u=max(previous["u"], entry["u"]))
+            return
+        if previous is not None and previous["e"] != entry["e"]:
+            self._by_email.get(previous["e"], set()).discard(ticket_number)
+        if previous is not None:
+            entry = dict(entry, u=max(previous["u"], entry["u"]))
+        self._tickets[ticket_number] = entry
+        if entry["e"]:
+            self._by_email.setdefault(entry["e"], set()).add(ticket_number)
+
+    # Applies lines appended by any process since the last refresh. Called with the lock held.
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._tickets, self._by_email, self._inode, self._offset, self._lines = {}, {}, stat.st_ino, 0, 0
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, "rb") as index_file:
+            index_file.seek(self._offset)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    break # Still being written; picked up next time.
+                self._offset += len(line)
+                self._lines += 1
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    logging.warning("REQUESTER INDEX - Skipping an unreadable line in %s.", self.path)
+
+    def _append(self, entries):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+        if not data:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) # One write per batch: writers never interleave.
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def record(self, ticket):
+        if ticket.get("ticket_number"):
+            self._append([index_entry(ticket)])
+
+    # A missing index is left for the next rebuild, which starts from the ticket database.
+    def touch(self, ticket_number):
+        if not self.exists():
+            return
+        self._append([{"t": ticket_number, "u": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}])
+
+    # The requester's tickets, newest first, as {"ticket_number", "ticket_subject", "ticket_status", "last_update"}.
+    def tickets_for(self, email, limit=None):
+        email = normalize_email(email)
+        with self._lock:
+            self._refresh()
+            entries = [self._tickets[ticket_number] for ticket_number in self._by_email.get(email, ())]
+        entries.sort(key=lambda entry: (entry["u"], entry["t"]), reverse=True)
+        return [{"ticket_number": entry["t"], "ticket_subject": entry["s"], "ticket_status": entry["st"], "last_update": entry["u"]}
+                for entry in entries[:limit]]
+
+    # True once the file holds more than ratio lines per indexed ticket (and at least min_lines lines).
+    def needs_compaction(self, ratio, min_lines=1000):
+        with self._lock:
+            self._refresh()
+            return self._lines > max(ratio * len(self._tickets), min_lines)
+
+    # Replaces the file with one line per ticket. A ticket's last update is the latest of its closure or submission
+    # date and the update already indexed for it, so note and status times survive a compaction. Lines other processes
+    # append while the tickets are read are carried over, so a live rebuild loses no update.
+    # Returns the number of tickets indexed.
+    def rebuild(self, tickets):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        start_size = os.path.getsize(self.path) if self.exists() else None
+        with self._lock:
+            self._refresh()
+            indexed_updates = {ticket_number: entry["u"] for ticket_number, entry in self._tickets.items()}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".requester-index-", suffix=".tmp")
+        count = 0
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                for ticket in tickets:
+                    if not ticket.get("ticket_number"):
+                        continue
+                    updated = max(str(ticket.get("closure_date") or ticket.get("submission_date") or ""),
+                                  indexed_updates.get(ticket["ticket_number"], ""))
+                    tmp_file.write(json.dumps(index_entry(ticket, str(updated)), ensure_ascii=False) + "\n")
+                    count += 1
+                tmp_file.write(appended_since(self.path, start_size))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._inode = None
+            self._refresh()
+        return count
+
+requester_index = RequesterIndex(REQUESTER_INDEX_FILE)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# Local module for online snapshots of the ticket and change stores, used by goobydesk_db.py and the snapshot job
+# (POST /admin/snapshots).
+#
+# Every store file is replaced atomically on save (temp file + os.replace), so an open file handle is a frozen copy of
+# that file. A snapshot opens every store file at once and checks no path moved on while it did so; writers are only
+# held off for those few open() calls. The pinned handles are then streamed into the archive without any lock.
+#
+# Archives are gzipped JSON lines in snapshots.directory: a header line, then {"s": store, "r": record} upserts and
+# {"s": store, "d": key} deletions. A full snapshot holds every record. An incremental one holds only records whose
+# digest changed since the previous snapshot, and skips unchanged store files without reading them.
+# Ticket note streams are append-only, so they are read up to their size at snapshot time and an incremental snapshot
+# holds only the notes appended since the previous one. {"s": "notes/TKT-...", "d": "*"} means the stream was rewritten.
+# Offloaded bodies (local_blob_store) are archived as {"s": "blobs", "b": ref, "z": base64 of the stored bytes}. Blobs
+# are content-addressed and never change, so an incremental snapshot holds only refs the previous one did not have.
+__all__ = ["create_snapshot", "list_snapshots", "restore_snapshot", "prune_snapshots"]
+import os
+import json
+import gzip
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+import local_metrics
+import local_blob_store
+import local_change_store
+import local_note_store
+import local_ticket_store
+from local_config_loader import load_core_config
+from local_ticket_serializer import TicketFileReader, TicketFileWriter
+
+core_yaml_config = load_core_config()
+snapshots_cfg = core_yaml_config.get("snapshots", {}) or {}
+SNAPSHOT_DIRECTORY = snapshots_cfg.get("directory", "./my_data/snapshots")
+FULL_EVERY = int(snapshots_cfg.get("full_every", 24)) # Incremental snapshots between full ones. Bounds restore chains.
+KEEP_FULL = int(snapshots_cfg.get("keep_full", 7)) # Full snapshots (with their incrementals) to keep. 0 keeps everything.
+CATALOG_FILE = os.path.join(SNAPSHOT_DIRECTORY, "catalog.json")
+STATE_FILE = os.path.join(SNAPSHOT_DIRECTORY, "state.json") # Per-record digests of the last snapshot.
+PIN_ATTEMPTS = 5
+
+_snapshot_lock = threading.Lock() # One snapshot at a time per process; state.json is read-modify-write.
+
+# (store key, path, key field) for every store file in the current layout. Missing files are skipped when pinned.
+def _store_files():
+    stores = [("changes", local_change_store.CHANGES_FILE, "change_number")]
+    for shard in local_ticket_store.list_shards():
+        store_key = "tickets" if shard is None else f"tickets/{shard}"
+        stores.append((store_key, local_ticket_store._shard_path(shard), "ticket_number"))
+    return stores
+
+def _store_path(store_key):
+    if store_key == "changes":
+        return local_change_store.CHANGES_FILE
+    if store_key == "tickets":
+        return local_ticket_store.TICKETS_FILE
+    return os.path.join(local_ticket_store.SHARD_DIRECTORY, f"tickets-{store_key.split('/', 1)[1]}.json")
+
+def _signature(stat):
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+# Opens every store file so that, at one moment, each path still named the file that was opened.
+# Returns {store key: (open file, key field, signature)}. The caller closes the files.
+def _pin_store_files():
+    for _ in range(PIN_ATTEMPTS):
+        with local_ticket_store._store_lock, local_change_store._store_lock:
+            pinned = {}
+            for store_key, path, key_field in _store_files():
+                try:
+                    pinned_file = open(path, "rb")
+                except FileNotFoundError:
+                    continue
+                pinned[store_key] = (pinned_file, key_field, _signature(os.fstat(pinned_file.fileno())))
+            # Another worker process may have replaced a file meanwhile. Then the set is not one point in time; retry.
+            stable = all(os.path.exists(_store_path(store_key)) and _signature(os.stat(_store_path(store_key))) == signature
+                         for store_key, (_, _, signature) in pinned.items())
+        if stable:
+            return pinned
+        for pinned_file, _, _ in pinned.values():
+            pinned_file.close()
+    raise RuntimeError("Store files kept changing while taking a snapshot. Try again.")
+
+# {store key: (path, [inode, size])} for every note stream. Bytes past that size are left for the next snapshot.
+def _note_streams():
+    streams = {}
+    for ticket_number, path in local_note_store.stream_files():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        streams[f"notes/{ticket_number}"] = (path, [stat.st_ino, stat.st_size])
+    return streams
+
+def _digest(record):
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8"), digest_size=8).hexdigest()
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as json_file:
+            return json.load(json_file)
+    except (FileNotFoundError, ValueError):
+        return default
+
+def _write_json(path, data):
+    os.makedirs(SNAPSHOT_DIRECTORY, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIRECTORY, prefix=".state-", suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp_file:
+        json.dump(data, tmp_file)
+    os.replace(tmp_path, path)
+
+def list_snapshots():
+    return _read_json(CATALOG_FILE, [])
+
+# Takes a snapshot and returns its catalog entry. kind is "full", "incremental" or "auto" (incremental when possible).
+def create_snapshot(kind="auto"):
+    with _snapshot_lock:
+        return _create_snapshot(kind)
+
+def _create_snapshot(kind):
+    catalog = list_snapshots()
+    state = _read_json(STATE_FILE, None)
+    layout = local_ticket_store.STORAGE_LAYOUT
+    chain_length = len(state.get("chain", [])) if state else 0
+    if kind == "full" or state is None or state.get("layout") != layout or not catalog or catalog[-1]["id"] != state.get("last"):
+        kind = "full"
+    elif kind == "auto":
+        kind = "full" if chain_length >= FULL_EVERY else "incremental"
+    previous_stores = state["stores"] if kind == "incremental" else {}
+    previous_blobs = set(state.get("blobs", [])) if kind == "incremental" else set()
+
+    snapshot_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    archive_path = os.path.join(SNAPSHOT_DIRECTORY, f"{snapshot_id}-{kind}.jsonl.gz")
+    entry = {"id": snapshot_id, "kind": kind, "base": state["last"] if kind == "incremental" else None,
+             "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "layout": layout, "file": os.path.basename(archive_path),
+             "stores": [], "records": 0, "deleted": 0, "skipped_stores": 0, "blobs": 0}
+    new_stores = {}
+    blob_refs = []
+
+    os.makedirs(SNAPSHOT_DIRECTORY, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIRECTORY, prefix=".snapshot-", suffix=".tmp")
+    os.close(fd)
+    with local_metrics.timed("goobydesk_snapshot_duration_seconds", "Time to write a snapshot archive.") as labels:
+        labels["kind"] = kind
+        pinned = _pin_store_files()
+        note_streams = _note_streams()
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+                archive.write(json.dumps({"snapshot": snapshot_id, "kind": kind, "base": entry["base"], "layout": layout}) + "\n")
+                for store_key, (pinned_file, key_field, signature) in pinned.items():
+                    entry["stores"].append(store_key)
+                    previous = previous_stores.get(store_key, {})
+                    if previous.get("signature") == signature:
+                        new_stores[store_key] = previous # Same file as last time: nothing to read.
+                        entry["skipped_stores"] += 1
+                        continue
+                    previous_digests = previous.get("digests", {})
+                    digests = {}
+                    reader = TicketFileReader(pinned_file)
+                    for record in reader:
+                        record_key = record.get(key_field)
+                        digests[record_key] = _digest(record)
+                        if previous_digests.get(record_key) != digests[record_key]:
+                            archive.write(json.dumps({"s": store_key, "r": record}, ensure_ascii=False) + "\n")
+                            entry["records"] += 1
+                    if reader.error:
+                        raise ValueError(f"{store_key}: {reader.error} Run helper_scripts/goobydesk_db.py repair.")
+                    for record_key in previous_digests.keys() - digests.keys():
+                        archive.write(json.dumps({"s": store_key, "d": record_key}) + "\n")
+                        entry["deleted"] += 1
+                    new_stores[store_key] = {"signature": signature, "digests": digests}
+                for store_key, (path, signature) in note_streams.items():
+                    entry["stores"].append(store_key)
+                    previous_signature = previous_stores.get(store_key, {}).get("signature")
+                    if previous_signature == signature:
+                        new_stores[store_key] = previous_stores[store_key]
+                        entry["skipped_stores"] += 1
+                        continue
+                    start = 0
+                    if previous_signature and previous_signature[0] == signature[0] and previous_signature[1] <= signature[1]:
+                        start = previous_signature[1] # Same stream, grown: only the new notes.
+                    elif previous_signature:
+                        archive.write(json.dumps({"s": store_key, "d": "*"}) + "\n")
+                        entry["deleted"] += 1
+                    end = start
+                    for note, end in local_note_store.read_stream(path, start, signature[1]):
+                        archive.write(json.dumps({"s": store_key, "r": note}, ensure_ascii=False) + "\n")
+                        entry["records"] += 1
+                    new_stores[store_key] = {"signature": [signature[0], end]}
+                # Whole store files that disappeared since the last snapshot.
+                for store_key in previous_stores.keys() - pinned.keys() - note_streams.keys():
+                    if store_key.startswith("notes/"):
+                        archive.write(json.dumps({"s": store_key, "d": "*"}) + "\n")
+                        entry["deleted"] += 1
+                        continue
+                    for record_key in previous_stores[store_key].get("digests", {}):
+                        archive.write(json.dumps({"s": store_key, "d": record_key}) + "\n")
+                        entry["deleted"] += 1
+                # Listed after the stores were pinned, so every blob a pinned record refers to is already stored.
+                for blob_ref in local_blob_store.iter_blob_refs():
+                    blob_refs.append(blob_ref)
+                    if blob_ref in previous_blobs:
+                        continue
+                    compressed = local_blob_store.read_blob_file(blob_ref)
+                    if compressed is None:
+                        continue
+                    archive.write(json.dumps({"s": "blobs", "b": blob_ref, "z": base64.b64encode(compressed).decode("ascii")}) + "\n")
+                    entry["blobs"] += 1
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        finally:
+            for pinned_file, _, _ in pinned.values():
+                pinned_file.close()
+
+    os.replace(tmp_path, archive_path)
+    entry["bytes"] = os.path.getsize(archive_path)
+    catalog.append(entry)
+    _write_json(CATALOG_FILE, catalog)
+    _write_json(STATE_FILE, {"last": snapshot_id, "layout": layout, "stores": new_stores, "blobs": blob_refs,
+                             "chain": (state.get("chain", []) + [snapshot_id]) if kind == "incremental" else []})
+    logging.info("SNAPSHOT - %s snapshot %s written: %s records, %s deletions, %s blobs, %s bytes.", kind, snapshot_id, entry["records"], entry["deleted"], entry["blobs"], entry["bytes"])
+    if kind == "full" and KEEP_FULL > 0:
+        prune_snapshots(KEEP_FULL)
+    return entry
+
+# The full snapshot and every incremental one needed to reach snapshot_id, oldest first.
+def _restore_chain(catalog, snapshot_id):
+    by_id = {entry["id"]: entry for entry in catalog}
+    if snapshot_id not in by_id:
+        raise KeyError(f"Snapshot {snapshot_id} is not in {CATALOG_FILE}")
+    chain = [by_id[snapshot_id]]
+    while chain[-1]["kind"] != "full":
+        base = chain[-1]["base"]
+        if base not in by_id:
+            raise KeyError(f"Snapshot {chain[-1]['id']} needs {base}, which is missing from {CATALOG_FILE}")
+        chain.append(by_id[base])
+    return list(reversed(chain))
+
+def _archive_lines(entry):
+    with gzip.open(os.path.join(SNAPSHOT_DIRECTORY, entry["file"]), "rt", encoding="utf-8") as archive:
+        next(archive) # Header
+        for line in archive:
+            yield json.loads(line)
+
+# Rebuilds every store file as of snapshot_id (default: the latest). Current files are moved aside, not deleted.
+# Blobs missing from the blob store are written back; existing ones are left alone.
+# Run with GoobyDesk stopped. Returns the restored catalog entry.
+def restore_snapshot(snapshot_id=None, storage_format=None):
+    catalog = list_snapshots()
+    if not catalog:
+        raise KeyError(f"No snapshots in {CATALOG_FILE}")
+    chain = _restore_chain(catalog, snapshot_id or catalog[-1]["id"])
+    target = chain[-1]
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for path in (local_ticket_store.TICKETS_FILE, local_ticket_store.SHARD_DIRECTORY, local_change_store.CHANGES_FILE, local_note_store.NOTES_DIRECTORY):
+        if os.path.exists(path):
+            os.replace(path, f"{path}.bak-{timestamp}")
+    # The ticket indexes describe the current tickets; they are rebuilt from the restored ones on first use.
+    for index in local_ticket_store.TICKET_INDEXES:
+        if index.exists():
+            os.remove(index.path)
+
+    # One store at a time, so memory is bounded by the largest store file rather than the whole history.
+    for store_key in target["stores"]:
+        if store_key.startswith("notes/"):
+            continue
+        key_field = "change_number" if store_key == "changes" else "ticket_number"
+        records = {}
+        for entry in chain:
+            if store_key not in entry["stores"]:
+                continue
+            for line in _archive_lines(entry):
+                if line["s"] != store_key:
+                    continue
+                if "d" in line:
+                    records.pop(line["d"], None)
+                else:
+                    records[line["r"].get(key_field)] = line["r"]
+        writer = TicketFileWriter(_store_path(store_key), storage_format)
+        for record in records.values():
+            writer.write(record)
+        writer.finish()
+
+    _restore_note_streams(chain, {store_key for store_key in target["stores"] if store_key.startswith("notes/")})
+    restored_blobs = _restore_blobs(chain)
+
+    if target["layout"] == "yearly":
+        configured = local_ticket_store.STORAGE_LAYOUT
+        local_ticket_store.STORAGE_LAYOUT = "yearly"
+        try:
+            local_ticket_store.rebuild_manifest()
+        finally:
+            local_ticket_store.STORAGE_LAYOUT = configured
+    # The restored files no longer match the last snapshot, so the next one starts a new full chain.
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+    logging.info("SNAPSHOT - Restored snapshot %s from a chain of %s archives (%s missing blobs written back).", target["id"], len(chain), restored_blobs)
+    return target
+
+# Replays every archive's note appends in order. A stream's lines are contiguous within an archive, so each run of
+# lines is written with one append.
+def _restore_note_streams(chain, note_stores):
+    for entry in chain:
+        batch_path, batch = None, []
+        for line in _archive_lines(entry):
+            path = local_note_store.stream_path(line["s"].split("/", 1)[1]) if line["s"] in note_stores else None
+            if path != batch_path and batch:
+                local_note_store.write_stream_lines(batch_path, "".join(batch).encode("utf-8"))
+                batch = []
+            batch_path = path
+            if path is None:
+                continue
+            if "d" in line:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                batch.append(json.dumps(line["r"], ensure_ascii=False) + "\n")
+        if batch:
+            local_note_store.write_stream_lines(batch_path, "".join(batch).encode("utf-8"))
+
+# Writes back every archived blob the blob store does not have. Returns the number written.
+def _restore_blobs(chain):
+    restored = 0
+    for entry in chain:
+        for line in _archive_lines(entry):
+            if line["s"] == "blobs" and local_blob_store.restore_blob_file(line["b"], base64.b64decode(line["z"])):
+                restored += 1
+    return restored
+
+# Removes archives older than the newest keep_full full snapshots. Incremental archives go with their full one.
+def prune_snapshots(keep_full):
+    catalog = list_snapshots()
+    full_ids = [entry["id"] for entry in catalog if entry["kind"] == "full"]
+    if keep_full < 1 or len(full_ids) <= keep_full:
+        return []
+    oldest_kept = full_ids[-keep_full]
+    removed = [entry for entry in catalog if entry["id"] < oldest_kept]
+    for entry in removed:
+        archive_path = os.path.join(SNAPSHOT_DIRECTORY, entry["file"])
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+    _write_json(CATALOG_FILE, [entry for entry in catalog if entry["id"] >= oldest_kept])
+    logging.info("SNAPSHOT - Pruned %s snapshots older than %s.", len(removed), oldest_kept)
+    return removed
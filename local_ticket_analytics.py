@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# Local module for resolution-time, throughput and backlog analytics used by the reports blueprint.
+# Tickets are kept as columns (epoch timestamps and category codes in flat arrays) that are cached per process. Only
+# changed store shards are re-read, and only new or changed tickets in them are re-parsed.
+__all__ = ["TicketColumns", "get_ticket_columns", "get_analytics_summary"]
+import math
+import bisect
+import logging
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+import local_metrics
+import local_ticket_store
+from local_config_loader import load_core_config
+
+# Optional vectorized backend. GoobyDesk falls back to pure Python without it.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+core_yaml_config = load_core_config()
+analytics_cfg = core_yaml_config.get("analytics", {}) or {}
+HISTORY_WEEKS = int(analytics_cfg.get("history_weeks", 12)) # Weeks shown in the throughput and backlog series.
+
+# Category columns and how they are labelled in the summary.
+DIMENSIONS = {
+    "ticket_impact": "impact",
+    "ticket_urgency": "urgency",
+    "request_type": "request_type",
+    "closed_by": "technician",
+}
+STATUS_FIELD = "ticket_status"
+NAN = float("nan")
+SECONDS_PER_HOUR = 3600.0
+SECONDS_PER_WEEK = 7 * 86400
+
+_columns = None
+_columns_signature = None
+_shard_row_counts = {}
+_summary_cache = {}
+_refresh_lock = threading.RLock() # Also held while numpy views of the columns are alive; arrays cannot grow under them.
+
+# Ticket dates are naive "%Y-%m-%d %H:%M:%S" strings. They are treated as UTC so arithmetic never shifts with DST.
+def _to_epoch(value):
+    if not value:
+        return NAN
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return NAN
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+# Zero-copy view of an array column.
+def _as_numpy(values, dtype):
+    if len(values) == 0:
+        return numpy.empty(0, dtype=dtype)
+    return numpy.frombuffer(values, dtype=dtype)
+
+class TicketColumns:
+    """Columnar copy of the ticket fields the reports need. One row per ticket, in store order."""
+
+    def __init__(self):
+        self.row_by_number = {}
+        self.fingerprints = []
+        self.submitted = array("d")
+        self.closed = array("d") # NaN unless the ticket is Closed with a valid closure_date.
+        self.codes = {field: array("i") for field in list(DIMENSIONS) + [STATUS_FIELD]}
+        self.labels = {field: [] for field in self.codes}
+        self._label_codes = {field: {} for field in self.codes}
+
+    def __len__(self):
+        return len(self.submitted)
+
+    def _encode(self, field, value):
+        value = value or "Unknown"
+        code = self._label_codes[field].get(value)
+        if code is None:
+            code = len(self.labels[field])
+            self._label_codes[field][value] = code
+            self.labels[field].append(value)
+        return code
+
+    # Returns True when the row was added or changed. Unchanged tickets are skipped without parsing any dates.
+    def upsert(self, ticket):
+        fingerprint = (ticket.get("submission_date"), ticket.get("closure_date"), ticket.get(STATUS_FIELD)) + tuple(ticket.get(field) for field in DIMENSIONS)
+        row = self.row_by_number.get(ticket.get("ticket_number"))
+        if row is not None and self.fingerprints[row] == fingerprint:
+            return False
+
+        submitted = _to_epoch(fingerprint[0])
+        closed = _to_epoch(fingerprint[1]) if fingerprint[2] == "Closed" else NAN
+        if row is None:
+            self.row_by_number[ticket.get("ticket_number")] = len(self.fingerprints)
+            self.fingerprints.append(fingerprint)
+            self.submitted.append(submitted)
+            self.closed.append(closed)
+            for field in self.codes:
+                self.codes[field].append(self._encode(field, ticket.get(field)))
+        else:
+            self.fingerprints[row] = fingerprint
+            self.submitted[row] = submitted
+            self.closed[row] = closed
+            for field in self.codes:
+                self.codes[field][row] = self._encode(field, ticket.get(field))
+        return True
+
+    def update_from(self, tickets):
+        return sum(1 for ticket in tickets if self.upsert(ticket))
+
+# Cached columns for this process. Only shards whose file changed on disk are re-read.
+def get_ticket_columns():
+    global _columns, _columns_signature, _shard_row_counts
+    with _refresh_lock:
+        signature = local_ticket_store.store_signature()
+        if _columns is not None and signature == _columns_signature:
+            return _columns
+
+        with local_metrics.timed("goobydesk_analytics_refresh_duration_seconds", "Time to refresh the analytics columns from the ticket store.") as labels:
+            previous_signatures = dict(_columns_signature or ())
+            # Tickets are never deleted, so a vanished shard means the store was replaced (restore, conversion).
+            if _columns is None or set(previous_signatures) - {shard for shard, _ in signature}:
+                _columns, previous_signatures, _shard_row_counts = TicketColumns(), {}, {}
+                labels["mode"] = "full"
+            else:
+                labels["mode"] = "incremental"
+
+            changed = 0
+            for shard, shard_signature in signature:
+                if previous_signatures.get(shard, False) == shard_signature:
+                    continue
+                shard_tickets = local_ticket_store.load_shard(shard)
+                if len(shard_tickets) < _shard_row_counts.get(shard, 0):
+                    # A shard shrank, so rows may be stale. Start over rather than track deletions.
+                    _columns, _columns_signature, _shard_row_counts = None, None, {}
+                    return get_ticket_columns()
+                _shard_row_counts[shard] = len(shard_tickets)
+                changed += _columns.update_from(shard_tickets)
+        _columns_signature = signature
+        logging.debug("ANALYTICS - Refreshed columns (%s): %s tickets changed.", labels["mode"], changed)
+        return _columns
+
+def _percentile(sorted_values, fraction):
+    # Linear interpolation between closest ranks, the same method as numpy.percentile's default.
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _duration_stats(label, durations_hours):
+    if len(durations_hours) == 0:
+        return {"label": label, "closed": 0, "mttr_hours": None, "p50_hours": None, "p90_hours": None}
+    if numpy is not None:
+        p50, p90 = numpy.percentile(durations_hours, [50, 90])
+        mean = float(durations_hours.mean())
+    else:
+        ordered = sorted(durations_hours)
+        p50, p90 = _percentile(ordered, 0.5), _percentile(ordered, 0.9)
+        mean = sum(ordered) / len(ordered)
+    return {"label": label, "closed": len(durations_hours), "mttr_hours": round(mean, 2), "p50_hours": round(float(p50), 2), "p90_hours": round(float(p90), 2)}
+
+def _resolution_numpy(columns):
+    submitted = _as_numpy(columns.submitted, numpy.float64)
+    closed = _as_numpy(columns.closed, numpy.float64)
+    resolved = ~numpy.isnan(closed) & ~numpy.isnan(submitted)
+    durations = (closed[resolved] - submitted[resolved]) / SECONDS_PER_HOUR
+    breakdown = {"overall": _duration_stats("All", durations)}
+    for field, name in DIMENSIONS.items():
+        codes = _as_numpy(columns.codes[field], numpy.int32)[resolved]
+        breakdown[name] = [_duration_stats(label, durations[codes == code]) for code, label in enumerate(columns.labels[field])]
+    return breakdown
+
+def _resolution_python(columns):
+    resolved_rows = [row for row, closed in enumerate(columns.closed) if closed == closed and columns.submitted[row] == columns.submitted[row]]
+    durations = [(columns.closed[row] - columns.submitted[row]) / SECONDS_PER_HOUR for row in resolved_rows]
+    breakdown = {"overall": _duration_stats("All", durations)}
+    for field, name in DIMENSIONS.items():
+        grouped = [[] for _ in columns.labels[field]]
+        codes = columns.codes[field]
+        for row, duration in zip(resolved_rows, durations):
+            grouped[codes[row]].append(duration)
+        breakdown[name] = [_duration_stats(label, grouped[code]) for code, label in enumerate(columns.labels[field])]
+    return breakdown
+
+# Counts of timestamps at or before each edge. Sorted arrays make every series O(weeks * log n).
+def _sorted_times(values):
+    if numpy is not None:
+        times = _as_numpy(values, numpy.float64)
+        return numpy.sort(times[~numpy.isnan(times)])
+    return sorted(value for value in values if value == value)
+
+def _count_at_or_before(sorted_times, edges):
+    if numpy is not None:
+        return numpy.searchsorted(sorted_times, edges, side="right").tolist()
+    return [bisect.bisect_right(sorted_times, edge) for edge in edges]
+
+def _compute_summary(columns, now, weeks):
+    now_epoch = now.timestamp()
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    edges = [week_start.timestamp() - SECONDS_PER_WEEK * offset for offset in range(weeks - 1, -1, -1)] + [now_epoch]
+
+    submitted_sorted = _sorted_times(columns.submitted)
+    closed_sorted = _sorted_times(columns.closed)
+    submitted_counts = _count_at_or_before(submitted_sorted, edges)
+    closed_counts = _count_at_or_before(closed_sorted, edges)
+
+    weekly_throughput = []
+    backlog = []
+    for index in range(weeks):
+        weekly_throughput.append({
+            "week_start": _from_epoch(edges[index]).strftime("%Y-%m-%d"),
+            "opened": submitted_counts[index + 1] - submitted_counts[index],
+            "closed": closed_counts[index + 1] - closed_counts[index],
+        })
+        backlog.append({"date": _from_epoch(edges[index + 1]).strftime("%Y-%m-%d"), "open": submitted_counts[index + 1] - closed_counts[index + 1]})
+
+    age_edges = [now_epoch - days * 86400 for days in (60, 30, 14, 7)]
+    submitted_before_age = _count_at_or_before(submitted_sorted, age_edges)
+    total_submitted = len(submitted_sorted)
+
+    status_counts = {label: 0 for label in columns.labels[STATUS_FIELD]}
+    if numpy is not None:
+        for code, count in enumerate(numpy.bincount(_as_numpy(columns.codes[STATUS_FIELD], numpy.int32), minlength=len(status_counts)).tolist()):
+            status_counts[columns.labels[STATUS_FIELD][code]] = count
+    else:
+        for code in columns.codes[STATUS_FIELD]:
+            status_counts[columns.labels[STATUS_FIELD][code]] += 1
+
+    return {
+        "generated_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "engine": "numpy" if numpy is not None else "python",
+        "total_tickets": len(columns),
+        "status_counts": status_counts,
+        "submitted_last_days": {str(days): total_submitted - count for days, count in zip((60, 30, 14, 7), submitted_before_age)},
+        "resolution": _resolution_numpy(columns) if numpy is not None else _resolution_python(columns),
+        "weekly_throughput": weekly_throughput,
+        "backlog": backlog,
+    }
+
+# Summary for /reports/. Recomputed only when the columns change, or at most once a minute for the time-based series.
+def get_analytics_summary(weeks=None):
+    weeks = weeks or HISTORY_WEEKS
+    with _refresh_lock:
+        columns = get_ticket_columns()
+        # Same naive-as-UTC clock as the ticket dates.
+        now = datetime.now().replace(tzinfo=timezone.utc)
+        cache_key = (_columns_signature, weeks, now.strftime("%Y-%m-%d %H:%M"))
+        summary = _summary_cache.get(cache_key)
+        if summary is None:
+            with local_metrics.timed("goobydesk_analytics_summary_duration_seconds", "Time to compute the analytics summary from cached columns."):
+                summary = _compute_summary(columns, now, weeks)
+            _summary_cache.clear()
+            _summary_cache[cache_key] = summary
+        return summary
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# Local module for the in-memory ticket model. A Ticket holds the fields of one ticket record in __slots__ instead of
+# a dict, with the enum-like values (status, impact, urgency, type) and technician names interned, so thousands of
+# resident tickets share one copy of "Open" or "High Impact".
+#
+# The heavy fields, ticket_message and legacy inline ticket_notes, are most of a ticket's bytes, and the dashboard,
+# queues, reports and indexes never read them. Tickets cached by local_ticket_store leave them out and remember where
+# their record sits in the file; the first read of ticket.ticket_message reads just that record back (a small LRU
+# keeps recent ones). Tickets from load_shard(fresh=True) and update_ticket() keep their heavy fields.
+#
+# A Ticket still reads like the JSON record: ticket["field"], ticket.get(), "field" in ticket, pop() and items() work,
+# and to_record() gives back the original record - same keys, same values, same key order - plus any later changes.
+__all__ = ["Ticket", "BodySource", "as_record", "ticket_digest", "TICKET_STATUSES", "TICKET_IMPACTS", "TICKET_URGENCIES", "REQUEST_TYPES",
+           "LIGHT_FIELDS", "HEAVY_FIELDS"]
+import os
+import sys
+import json
+import hashlib
+import threading
+from array import array
+from itertools import chain
+from collections import OrderedDict
+import local_metrics
+import local_ticket_serializer
+
+# Values offered by the submission form and the ingest endpoints. Other values are kept verbatim.
+TICKET_STATUSES = ("Open", "In-Progress", "Closed")
+TICKET_IMPACTS = ("Low Impact", "Medium Impact", "High Impact", "Low", "Medium", "High")
+TICKET_URGENCIES = ("Planning", "Low Urgency", "Medium Urgency", "High Urgency", "Low", "Medium", "High")
+REQUEST_TYPES = ("Request", "Maintenance", "Incident", "Change", "Access")
+
+LIGHT_FIELDS = ("ticket_number", "requestor_name", "requestor_email", "ticket_subject", "request_type", "ticket_impact",
+                "ticket_urgency", "ticket_status", "submission_date", "closed_by", "closure_date", "assigned_technician",
+                "assigned_date", "ticket_message_blob")
+HEAVY_FIELDS = ("ticket_message", "ticket_notes")
+INTERNED_FIELDS = frozenset(("request_type", "ticket_impact", "ticket_urgency", "ticket_status", "closed_by", "assigned_technician",
+                             "requestor_name", "requestor_email"))
+_LIGHT = frozenset(LIGHT_FIELDS)
+_HEAVY = frozenset(HEAVY_FIELDS)
+_MISSING = object()
+_PLAIN, _INTERNED, _BODY = 1, 2, 3
+_FIELD_KINDS = dict({field: _INTERNED if field in INTERNED_FIELDS else _PLAIN for field in LIGHT_FIELDS}, **{field: _BODY for field in HEAVY_FIELDS})
+
+BODY_CACHE_SIZE = 256 # Lazily loaded ticket bodies kept per process.
+_body_lock = threading.Lock()
+_body_cache = OrderedDict() # (file, ticket number) -> (file signature, heavy fields)
+_layouts = {} # Key order of a record -> (that tuple, as a set, (key, kind, slot setter) per key), shared by every ticket with that layout.
+
+def _shared_layout(keys):
+    layout = _layouts.get(keys)
+    if layout is None:
+        layout = _layouts.setdefault(keys, (keys, frozenset(keys), tuple((key, _FIELD_KINDS.get(key), _SLOT_SETTERS.get(key)) for key in keys)))
+    return layout
+
+class BodySource:
+    """Where the records of one read of a database file sit in it: the path, the file's (mtime_ns, size) at the time,
+    and each record's (start, end) byte span packed into one array. Shared by every ticket from that read."""
+
+    __slots__ = ("path", "signature", "spans")
+
+    def __init__(self, path, signature, spans):
+        self.path = path
+        self.signature = signature
+        self.spans = array("q", chain.from_iterable(spans))
+
+    def span(self, index):
+        return self.spans[2 * index], self.spans[2 * index + 1]
+
+# Heavy fields of one ticket, read from its database file. Empty if the ticket is no longer there.
+def _load_heavy_fields(source, index, ticket_number):
+    path = source.path
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        signature = None
+    cache_key = (path, ticket_number)
+    with _body_lock:
+        cached = _body_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            _body_cache.move_to_end(cache_key)
+            return cached[1]
+
+    heavy = {}
+    if signature is not None:
+        with local_metrics.timed("goobydesk_ticket_body_load_duration_seconds", "Time to load a ticket's message and notes on first use."):
+            record = None
+            if signature == source.signature:
+                try:
+                    record = local_ticket_serializer.read_ticket_at(path, *source.span(index))
+                except ValueError:
+                    record = None
+            if not isinstance(record, dict) or record.get("ticket_number") != ticket_number:
+                # The file was rewritten since this ticket was read, so its span is stale. Look for it instead.
+                record = next((candidate for candidate in local_ticket_serializer.TicketFileReader(path)
+                               if candidate.get("ticket_number") == ticket_number), {})
+            heavy = {field: record[field] for field in HEAVY_FIELDS if field in record}
+    with _body_lock:
+        _body_cache[cache_key] = (signature, heavy)
+        while len(_body_cache) > BODY_CACHE_SIZE:
+            _body_cache.popitem(last=False)
+    return heavy
+
+class Ticket:
+    """One ticket record. Known fields live in slots, heavy fields in _heavy (or in the file, for cached tickets),
+    and unknown fields in _extra, so converting back with to_record() is lossless."""
+
+    __slots__ = LIGHT_FIELDS + ("_layout", "_heavy", "_extra", "_body_source", "_body_index")
+
+    def __init__(self, **fields):
+        object.__setattr__(self, "_layout", _shared_layout(tuple(fields)))
+        object.__setattr__(self, "_heavy", {})
+        object.__setattr__(self, "_extra", None)
+        object.__setattr__(self, "_body_source", None)
+        object.__setattr__(self, "_body_index", None)
+        for key, value in fields.items():
+            self[key] = value
+
+    # From a decoded JSON/MessagePack record. With body_source (a BodySource) and body_index (the record's position in
+    # it) the heavy fields are dropped and read back from the file on first use; without them they are kept.
+    @classmethod
+    def from_record(cls, record, body_source=None, body_index=None):
+        ticket = cls.__new__(cls)
+        layout = _shared_layout(tuple(record))
+        heavy = extra = None
+        for (key, kind, set_slot), value in zip(layout[2], record.values()):
+            if kind == _PLAIN:
+                set_slot(ticket, value)
+            elif kind == _INTERNED:
+                set_slot(ticket, sys.intern(value) if type(value) is str else value)
+            elif kind is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            else:
+                if heavy is None:
+                    heavy = {}
+                heavy[key] = value
+        _set_layout(ticket, layout)
+        _set_extra(ticket, extra)
+        if body_source is not None and heavy:
+            _set_heavy(ticket, None)
+            _set_body_source(ticket, body_source)
+            _set_body_index(ticket, body_index)
+        else:
+            _set_heavy(ticket, heavy or {})
+            _set_body_source(ticket, None)
+            _set_body_index(ticket, None)
+        return ticket
+
+    def __setattr__(self, name, value):
+        if name in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        object.__setattr__(self, name, value)
+
+    @property
+    def is_lazy(self):
+        return self._heavy is None
+
+    def _heavy_fields(self):
+        if self._heavy is not None:
+            return self._heavy
+        return _load_heavy_fields(self._body_source, self._body_index, self.ticket_number)
+
+    # Heavy fields this ticket owns, loading them first if they were left in the file.
+    def _own_heavy(self):
+        if self._heavy is None:
+            object.__setattr__(self, "_heavy", dict(_load_heavy_fields(self._body_source, self._body_index, self.ticket_number)))
+            object.__setattr__(self, "_body_source", None)
+            object.__setattr__(self, "_body_index", None)
+        return self._heavy
+
+    def __getitem__(self, key):
+        if key in _LIGHT:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if key in _HEAVY:
+            if self._heavy is None and key not in self._layout[1]:
+                raise KeyError(key)
+            return self._heavy_fields()[key]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _LIGHT:
+            return getattr(self, key, default)
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in _LIGHT:
+            return getattr(self, key, _MISSING) is not _MISSING
+        if key in _HEAVY:
+            return key in self._layout[1] if self._heavy is None else key in self._heavy
+        return self._extra is not None and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key in _LIGHT:
+            setattr(self, key, value)
+        elif key in _HEAVY:
+            self._own_heavy()[key] = value
+        else:
+            if self._extra is None:
+                object.__setattr__(self, "_extra", {})
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _LIGHT:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            object.__delattr__(self, key)
+        elif key in _HEAVY:
+            del self._own_heavy()[key]
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    # Fields in the original record order, then any added since. Loads the body of a cached ticket.
+    def items(self):
+        layout, in_layout, _ = self._layout
+        heavy = self._heavy_fields() if self._heavy is None else self._heavy
+        extra = self._extra or {}
+        fields = []
+        for key in layout:
+            kind = _FIELD_KINDS.get(key)
+            if kind is None:
+                value = extra.get(key, _MISSING)
+            elif kind == _BODY:
+                value = heavy.get(key, _MISSING)
+            else:
+                value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                fields.append((key, value))
+        for key in LIGHT_FIELDS:
+            if key not in in_layout:
+                value = getattr(self, key, _MISSING)
+                if value is not _MISSING:
+                    fields.append((key, value))
+        fields += [(key, value) for key, value in heavy.items() if key not in in_layout]
+        fields += [(key, value) for key, value in extra.items() if key not in in_layout]
+        return fields
+
+    # Present keys, without loading the body.
+    def keys(self):
+        layout, in_layout, _ = self._layout
+        present = [key for key in layout if key in self]
+        present += [key for key in LIGHT_FIELDS if key not in in_layout and getattr(self, key, _MISSING) is not _MISSING]
+        present += [key for key in (self._heavy or ()) if key not in in_layout]
+        present += [key for key in (self._extra or ()) if key not in in_layout]
+        return present
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_record(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"<Ticket {self.get('ticket_number')} {self.get('ticket_status')}>"
+
+    @property
+    def ticket_message(self):
+        try:
+            return self["ticket_message"]
+        except KeyError:
+            raise AttributeError("ticket_message") from None
+
+    @ticket_message.setter
+    def ticket_message(self, value):
+        self["ticket_message"] = value
+
+    @property
+    def ticket_notes(self):
+        try:
+            return self["ticket_notes"]
+        except KeyError:
+            raise AttributeError("ticket_notes") from None
+
+    @ticket_notes.setter
+    def ticket_notes(self, value):
+        self["ticket_notes"] = value
+
+_SLOT_SETTERS = {field: getattr(Ticket, field).__set__ for field in LIGHT_FIELDS}
+_set_layout = Ticket._layout.__set__
+_set_heavy = Ticket._heavy.__set__
+_set_extra = Ticket._extra.__set__
+_set_body_source = Ticket._body_source.__set__
+_set_body_index = Ticket._body_index.__set__
+
+# The JSON record for a Ticket or a plain dict, for the serializer.
+def as_record(ticket):
+    return ticket.to_record() if isinstance(ticket, Ticket) else ticket
+
+# Stands in for the heavy fields in ticket_digest without reading them: the byte length of a cached ticket's record,
+# or the message length and note count of a loaded one.
+def _body_marker(ticket):
+    if isinstance(ticket, Ticket) and ticket.is_lazy:
+        start, end = ticket._body_source.span(ticket._body_index)
+        return ("record", end - start)
+    notes = ticket.get("ticket_notes")
+    return ("loaded", len(ticket.get("ticket_message") or ""), len(notes) if isinstance(notes, list) else 0)
+
+# Content digest for local_fragment_cache: the light fields and added fields, plus a marker for the body. Never reads
+# a cached ticket's body.
+def ticket_digest(ticket):
+    fields = {key: ticket[key] for key in ticket.keys() if key not in _HEAVY}
+    fields["_body"] = _body_marker(ticket)
+    return hashlib.blake2b(json.dumps(fields, sort_keys=True, default=str).encode("utf-8"), digest_size=8).hexdigest()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# Local module for reading and writing the ticket database as compact JSON, orjson or MessagePack.
+__all__ = ["SUPPORTED_FORMATS", "detect_format", "dumps_tickets", "loads_tickets", "read_tickets_file",
+           "read_tickets_with_spans", "read_ticket_at", "write_tickets_file", "TicketFileReader", "TicketFileWriter"]
+import os
+import re
+import json
+import codecs
+import shutil
+import logging
+import tempfile
+import contextlib
+from local_config_loader import load_core_config
+import local_metrics
+
+# Optional fast/binary encoders. GoobyDesk falls back to the stdlib json module without them.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+core_yaml_config = load_core_config()
+STORAGE_FORMAT = (core_yaml_config.get("storage", {}) or {}).get("format", "json")
+
+"""
+Supported formats:
+json - Compact stdlib JSON (default).
+json-pretty - Indented stdlib JSON, the pre-0.9.3 layout. Easiest to hand-edit.
+orjson - Compact JSON written by orjson. Byte-compatible with the json format.
+msgpack - MessagePack binary. Smallest and fastest, not human readable.
+"""
+SUPPORTED_FORMATS = ("json", "json-pretty", "orjson", "msgpack")
+_JSON_DECODER = json.JSONDecoder()
+_JSON_SEPARATORS = re.compile(r"[\s,]*")
+
+# A JSON ticket database always starts with "[" (after optional whitespace/BOM). Anything else is MessagePack.
+def detect_format(raw_bytes: bytes) -> str:
+    stripped = raw_bytes.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if not stripped or stripped[:1] in (b"[", b"{"):
+        return "json"
+    return "msgpack"
+
+def dumps_tickets(tickets, storage_format=None) -> bytes:
+    storage_format = storage_format or STORAGE_FORMAT
+    if storage_format == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("Storage format msgpack requires the msgpack package. Run: pip install msgpack")
+        return msgpack.packb(tickets, use_bin_type=True)
+    if storage_format == "orjson":
+        if orjson is not None:
+            return orjson.dumps(tickets)
+        logging.warning("SERIALIZER - orjson is not installed. Falling back to compact stdlib JSON.")
+    if storage_format == "json-pretty":
+        return json.dumps(tickets, indent=4).encode("utf-8")
+    if storage_format not in SUPPORTED_FORMATS:
+        logging.warning("SERIALIZER - Unknown storage format %s. Falling back to compact stdlib JSON.", storage_format)
+    return json.dumps(tickets, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+# Loads any supported format. The format on disk is detected, so switching formats never strands old files.
+def loads_tickets(raw_bytes: bytes):
+    if detect_format(raw_bytes) == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("Ticket database is MessagePack but the msgpack package is not installed.")
+        return msgpack.unpackb(raw_bytes, raw=False)
+    if orjson is not None:
+        return orjson.loads(raw_bytes)
+    return json.loads(raw_bytes)
+
+# Raises FileNotFoundError so each caller keeps its own missing-file behavior.
+def read_tickets_file(tickets_file):
+    with local_metrics.timed("goobydesk_ticket_store_duration_seconds", "Ticket database load/save time.", operation="load"):
+        with open(tickets_file, "rb") as tkt_file:
+            raw_bytes = tkt_file.read()
+        tickets = loads_tickets(raw_bytes)
+    local_metrics.set_gauge("goobydesk_ticket_store_bytes", len(raw_bytes), "Size of the ticket database on disk.")
+    local_metrics.set_gauge("goobydesk_ticket_store_tickets", len(tickets), "Tickets in the ticket database.")
+    return tickets
+
+# Like read_tickets_file, but also returns the (start, end) byte span of each ticket, for read_ticket_at().
+def read_tickets_with_spans(tickets_file):
+    with local_metrics.timed("goobydesk_ticket_store_duration_seconds", "Ticket database load/save time.", operation="load"):
+        with open(tickets_file, "rb") as tkt_file:
+            raw_bytes = tkt_file.read()
+        if detect_format(raw_bytes) == "msgpack":
+            tickets, spans = _msgpack_with_spans(raw_bytes)
+        else:
+            tickets, spans = _json_with_spans(raw_bytes)
+    local_metrics.set_gauge("goobydesk_ticket_store_bytes", len(raw_bytes), "Size of the ticket database on disk.")
+    local_metrics.set_gauge("goobydesk_ticket_store_tickets", len(tickets), "Tickets in the ticket database.")
+    return tickets, spans
+
+def _msgpack_with_spans(raw_bytes):
+    if msgpack is None:
+        raise RuntimeError("Ticket database is MessagePack but the msgpack package is not installed.")
+    unpacker = msgpack.Unpacker(raw=False, max_buffer_size=max(len(raw_bytes), 1))
+    unpacker.feed(raw_bytes)
+    tickets, spans = [], []
+    for _ in range(unpacker.read_array_header()):
+        start = unpacker.tell()
+        tickets.append(unpacker.unpack())
+        spans.append((start, unpacker.tell()))
+    return tickets, spans
+
+def _json_with_spans(raw_bytes):
+    offset = 3 if raw_bytes.startswith(codecs.BOM_UTF8) else 0
+    text = raw_bytes[offset:].decode("utf-8")
+    # raw_decode works in characters. In a pure ASCII file those are bytes; otherwise the bytes of each piece are counted.
+    ascii_only = text.isascii()
+    position = len(text) - len(text.lstrip(" \t\r\n"))
+    if text[position:position + 1] != "[":
+        raise ValueError("Ticket database does not start with a JSON list.")
+    position += 1
+    tickets, spans = [], []
+    while True:
+        record_start = _JSON_SEPARATORS.match(text, position).end()
+        if record_start >= len(text):
+            raise ValueError(f"File ends after {len(tickets)} tickets without closing the list.")
+        if text[record_start] == "]":
+            return tickets, spans
+        ticket, record_end = _JSON_DECODER.raw_decode(text, record_start)
+        tickets.append(ticket)
+        if ascii_only:
+            spans.append((offset + record_start, offset + record_end))
+        else:
+            # offset is the byte position minus the character position, up to position.
+            start = offset + position + len(text[position:record_start].encode("utf-8"))
+            end = start + len(text[record_start:record_end].encode("utf-8"))
+            spans.append((start, end))
+            offset = end - record_end
+        position = record_end
+
+# One ticket decoded from the byte span read_tickets_with_spans() reported for it.
+def read_ticket_at(tickets_file, start, end):
+    with open(tickets_file, "rb") as tkt_file:
+        tkt_file.seek(start)
+        raw_bytes = tkt_file.read(end - start)
+    return loads_tickets(raw_bytes)
+
+# Writes to a temp file and renames it into place so readers never see a half-written database.
+def write_tickets_file(tickets_file, tickets, storage_format=None):
+    with local_metrics.timed("goobydesk_ticket_store_duration_seconds", "Ticket database load/save time.", operation="save"):
+        encoded_size = _write_tickets_file(tickets_file, tickets, storage_format)
+    local_metrics.set_gauge("goobydesk_ticket_store_bytes", encoded_size, "Size of the ticket database on disk.")
+    local_metrics.set_gauge("goobydesk_ticket_store_tickets", len(tickets), "Tickets in the ticket database.")
+    return encoded_size
+
+def _write_tickets_file(tickets_file, tickets, storage_format):
+    encoded = dumps_tickets(tickets, storage_format)
+    tickets_dir = os.path.dirname(os.path.abspath(tickets_file))
+    fd, tmp_path = tempfile.mkstemp(dir=tickets_dir, prefix=".tickets-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(encoded)
+        if os.path.exists(tickets_file):
+            os.chmod(tmp_path, os.stat(tickets_file).st_mode & 0o777)
+        os.replace(tmp_path, tickets_file)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(encoded)
+
+class TicketFileReader:
+    """Streams tickets out of a database file one at a time, so memory stays bounded by the largest single ticket.
+    A file that ends early (crash mid-write, full disk) stops cleanly with truncated=True instead of raising.
+    tickets_file may also be an open binary file, e.g. one pinned by local_snapshot; it is left open."""
+
+    def __init__(self, tickets_file, chunk_size=1 << 20, max_record_bytes=64 << 20):
+        self.tickets_file = tickets_file
+        self.chunk_size = chunk_size
+        self.max_record_bytes = max_record_bytes
+        self.storage_format = None
+        self.records = 0
+        self.truncated = False
+        self.error = None
+
+    def _open(self):
+        if hasattr(self.tickets_file, "read"):
+            self.tickets_file.seek(0)
+            return contextlib.nullcontext(self.tickets_file)
+        return open(self.tickets_file, "rb")
+
+    def __iter__(self):
+        with self._open() as tkt_file:
+            self.storage_format = detect_format(tkt_file.read(4096))
+        if self.storage_format == "msgpack":
+            yield from self._iter_msgpack()
+        else:
+            yield from self._iter_json()
+
+    def _iter_msgpack(self):
+        if msgpack is None:
+            raise RuntimeError("Ticket database is MessagePack but the msgpack package is not installed.")
+        with self._open() as tkt_file:
+            unpacker = msgpack.Unpacker(tkt_file, raw=False, read_size=self.chunk_size, max_buffer_size=self.max_record_bytes)
+            try:
+                expected = unpacker.read_array_header()
+            except msgpack.OutOfData:
+                self.truncated, self.error = True, "File ends before the ticket list starts."
+                return
+            for _ in range(expected):
+                try:
+                    ticket = unpacker.unpack()
+                except msgpack.OutOfData:
+                    self.truncated, self.error = True, f"File ends after {self.records} of {expected} tickets."
+                    return
+                self.records += 1
+                yield ticket
+
+    def _iter_json(self):
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        with self._open() as tkt_file:
+            buffer, position, started = "", 0, False
+            while True:
+                # Skip whitespace and separators between tickets.
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position >= len(buffer):
+                    raw_chunk = tkt_file.read(self.chunk_size)
+                    if not raw_chunk:
+                        self.truncated, self.error = True, f"File ends after {self.records} tickets without closing the list."
+                        return
+                    buffer, position = buffer[position:] + text_decoder.decode(raw_chunk), 0
+                    continue
+                if not started:
+                    if buffer[position] != "[":
+                        self.error = "Ticket database does not start with a JSON list."
+                        return
+                    started, position = True, position + 1
+                    continue
+                if buffer[position] == "]":
+                    return
+                try:
+                    ticket, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Usually the ticket continues in the next chunk. Give up at EOF or once one record is implausibly large.
+                    if len(buffer) - position > self.max_record_bytes:
+                        self.error = f"Ticket {self.records + 1} is corrupt or larger than {self.max_record_bytes} bytes."
+                        return
+                    raw_chunk = tkt_file.read(self.chunk_size)
+                    if not raw_chunk:
+                        self.truncated, self.error = True, f"File ends partway through ticket {self.records + 1}."
+                        return
+                    buffer, position = buffer[position:] + text_decoder.decode(raw_chunk), 0
+                    continue
+                self.records += 1
+                yield ticket
+                # Drop already-decoded tickets so the buffer stays around one chunk.
+                if position > self.chunk_size:
+                    buffer, position = buffer[position:], 0
+
+class TicketFileWriter:
+    """Writes tickets one at a time to a temporary file next to the target, in the same bytes write_tickets_file would
+    produce. finish() moves it into place; abort() discards it."""
+
+    def __init__(self, tickets_file, storage_format=None):
+        self.tickets_file = tickets_file
+        self.storage_format = storage_format or STORAGE_FORMAT
+        if self.storage_format == "orjson" and orjson is None:
+            self.storage_format = "json"
+        if self.storage_format == "msgpack" and msgpack is None:
+            raise RuntimeError("Storage format msgpack requires the msgpack package. Run: pip install msgpack")
+        self.records = 0
+        tickets_dir = os.path.dirname(os.path.abspath(tickets_file))
+        os.makedirs(tickets_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=tickets_dir, prefix=".tickets-", suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        if self.storage_format == "msgpack":
+            # MessagePack needs the list length up front, so tickets are buffered on disk and the header written last.
+            self._body_path = self.tmp_path + ".body"
+            self._body = open(self._body_path, "wb")
+            self._packer = msgpack.Packer(use_bin_type=True)
+
+    def _encode(self, ticket):
+        if self.storage_format == "orjson":
+            return orjson.dumps(ticket)
+        if self.storage_format == "json-pretty":
+            return ("    " + json.dumps(ticket, indent=4).replace("\n", "\n    ")).encode("utf-8")
+        return json.dumps(ticket, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def write(self, ticket):
+        if self.storage_format == "msgpack":
+            self._body.write(self._packer.pack(ticket))
+        else:
+            separator = b"," if self.storage_format != "json-pretty" else b",\n"
+            opener = b"[" if self.storage_format != "json-pretty" else b"[\n"
+            self._file.write(separator if self.records else opener)
+            self._file.write(self._encode(ticket))
+        self.records += 1
+
+    # Returns the size of the finished file in bytes.
+    def finish(self):
+        try:
+            if self.storage_format == "msgpack":
+                self._body.close()
+                self._file.write(self._packer.pack_array_header(self.records))
+                with open(self._body_path, "rb") as body:
+                    shutil.copyfileobj(body, self._file, 1 << 20)
+                os.remove(self._body_path)
+            elif self.records == 0:
+                self._file.write(b"[]")
+            else:
+                self._file.write(b"\n]" if self.storage_format == "json-pretty" else b"]")
+            self._file.close()
+            if os.path.exists(self.tickets_file):
+                os.chmod(self.tmp_path, os.stat(self.tickets_file).st_mode & 0o777)
+            os.replace(self.tmp_path, self.tickets_file)
+        except Exception:
+            self.abort()
+            raise
+        return os.path.getsize(self.tickets_file)
+
+    def abort(self):
+        self._file.close()
+        for path in (self.tmp_path, getattr(self, "_body_path", None)):
+            if path and os.path.exists(path):
+                os.remove(path)
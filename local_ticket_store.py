@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# Local module for the ticket database: load, save, lookups and ticket number allocation.
+# Shared by app.py, the blueprints and local_email_handler so nothing needs to import app.py back.
+#
+# Two layouts, chosen by storage.layout in core_configuration.yml:
+#   single - every ticket in tickets_file (the original layout).
+#   yearly - one shard per ticket-number year in storage.shard_directory (tickets-2026.json, ...) plus a small
+#            manifest.json of per-shard counts. TKT-YYYY-NNNN routes a lookup straight to its shard, and only the
+#            current and previous year's shards are kept parsed in memory.
+# Every write also updates the requester index (local_requester_index) behind the public "My Tickets" page and the
+# technician work queues (local_work_queue).
+# Tickets come back as local_ticket_model.Ticket objects. Cached shards hold them without their message and notes,
+# which are read back from the shard file when a page first needs them.
+__all__ = ["load_tickets", "save_tickets", "iter_tickets", "iter_open_tickets", "get_ticket", "add_ticket", "update_ticket",
+           "generate_ticket_number", "list_shards", "shard_for", "load_shard", "save_shard", "store_files", "shard_signature", "store_signature",
+           "summarize_shard", "rebuild_manifest", "tickets_for_requester", "rebuild_requester_index",
+           "work_queue_for", "work_queue_sizes", "rebuild_work_queue_index", "compact_ticket_indexes"]
+import os
+import re
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime
+import local_ticket_serializer
+import local_ticket_model
+import local_work_queue
+from local_requester_index import requester_index
+from local_work_queue import work_queue
+from local_config_loader import load_core_config
+
+core_yaml_config = load_core_config()
+storage_cfg = core_yaml_config.get("storage", {}) or {}
+TICKETS_FILE = core_yaml_config["tickets_file"]
+STORAGE_LAYOUT = storage_cfg.get("layout", "single") # single or yearly
+SHARD_DIRECTORY = storage_cfg.get("shard_directory", "./my_data/tickets")
+MANIFEST_FILE = os.path.join(SHARD_DIRECTORY, "manifest.json")
+RESIDENT_YEARS = 2 # Current and previous year stay parsed in memory.
+TICKET_INDEXES = (requester_index, work_queue) # Derived from the tickets, updated on every write.
+INDEX_COMPACTION_RATIO = float(storage_cfg.get("index_compaction_ratio", 4)) # Lines per ticket before compacting.
+
+SHARD_FILE_PATTERN = re.compile(r"^tickets-(\d{4})\.json$")
+TICKET_NUMBER_PATTERN = re.compile(r"^[A-Z]+-(\d{4})-(\d+)$")
+
+# shard -> (file signature, tickets). Shared by readers, so never mutated; writers re-read the shard from disk.
+_resident_shards = {}
+_store_lock = threading.RLock()
+
+def _is_closed(ticket):
+    return str(ticket.get("ticket_status", "")).lower() == "closed"
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Shard key for a ticket or ticket number: the year in the number, else the submission year.
+# Always None in the single layout. A ticket number without a year has no shard.
+def shard_for(ticket_or_number):
+    if STORAGE_LAYOUT != "yearly":
+        return None
+    if not isinstance(ticket_or_number, str) and ticket_or_number is not None:
+        number_match = TICKET_NUMBER_PATTERN.match(ticket_or_number.get("ticket_number", ""))
+        if number_match:
+            return number_match.group(1)
+        submission_year = str(ticket_or_number.get("submission_date", ""))[:4]
+        return submission_year if submission_year.isdigit() else str(datetime.now().year)
+    number_match = TICKET_NUMBER_PATTERN.match(ticket_or_number or "")
+    return number_match.group(1) if number_match else None
+
+def _shard_path(shard):
+    if shard is None:
+        return TICKETS_FILE
+    return os.path.join(SHARD_DIRECTORY, f"tickets-{shard}.json")
+
+# Oldest first. The single layout has exactly one shard, None.
+def list_shards():
+    if STORAGE_LAYOUT != "yearly":
+        return [None]
+    try:
+        file_names = os.listdir(SHARD_DIRECTORY)
+    except FileNotFoundError:
+        return []
+    return sorted(match.group(1) for match in map(SHARD_FILE_PATTERN.match, file_names) if match)
+
+def store_files():
+    return [_shard_path(shard) for shard in list_shards()]
+
+# Changes whenever the shard is written. None if the shard file does not exist.
+def shard_signature(shard):
+    return _file_signature(_shard_path(shard))
+
+# Changes whenever any shard is written. Used by caches such as local_ticket_analytics.
+def store_signature():
+    return tuple((shard, shard_signature(shard)) for shard in list_shards())
+
+def _is_resident(shard):
+    return shard is None or int(shard) >= datetime.now().year - (RESIDENT_YEARS - 1)
+
+# Returns the shard's tickets. Cached shards are shared with other readers: pass fresh=True for a list you can modify.
+# Fresh tickets keep their message and notes in memory; cached ones load them from the shard file on first use.
+# A missing yearly shard is empty; a missing single-layout file raises FileNotFoundError.
+def load_shard(shard, fresh=False):
+    path = _shard_path(shard)
+    signature = _file_signature(path)
+    if not fresh:
+        cached = _resident_shards.get(shard)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    if signature is None:
+        if shard is None:
+            raise FileNotFoundError(path)
+        return []
+    if fresh:
+        return [local_ticket_model.Ticket.from_record(record) for record in local_ticket_serializer.read_tickets_file(path)]
+    # Remember where each record sits so a ticket's body can be read back on its own.
+    records, spans = local_ticket_serializer.read_tickets_with_spans(path)
+    body_source = local_ticket_model.BodySource(path, signature, spans)
+    from_record = local_ticket_model.Ticket.from_record
+    tickets = [from_record(record, body_source, index) for index, record in enumerate(records)]
+    if _is_resident(shard):
+        _resident_shards[shard] = (signature, tickets)
+    return tickets
+
+# The shard's records as plain dicts, for rewriting it without building a Ticket per record.
+def _read_records(shard):
+    path = _shard_path(shard)
+    if _file_signature(path) is None:
+        if shard is None:
+            raise FileNotFoundError(path)
+        return []
+    return local_ticket_serializer.read_tickets_file(path)
+
+# Writes to the ticket file database in the configured storage format. Eventually needs file locking for Linux.
+def save_shard(shard, tickets):
+    if shard is not None:
+        os.makedirs(SHARD_DIRECTORY, exist_ok=True)
+    local_ticket_serializer.write_tickets_file(_shard_path(shard), [local_ticket_model.as_record(ticket) for ticket in tickets])
+    _resident_shards.pop(shard, None)
+    if shard is not None:
+        _update_manifest(shard, tickets)
+    logging.debug("The Ticket JSON Database file was modified.")
+
+# One pass over any iterable of tickets, so a shard can be summarized straight from a TicketFileReader.
+def summarize_shard(tickets):
+    summary = {"count": 0, "open": 0, "max_sequence": 0}
+    for ticket in tickets:
+        summary["count"] += 1
+        if not _is_closed(ticket):
+            summary["open"] += 1
+        number_match = TICKET_NUMBER_PATTERN.match(ticket.get("ticket_number", ""))
+        if number_match:
+            summary["max_sequence"] = max(summary["max_sequence"], int(number_match.group(2)))
+    return summary
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_FILE, "r") as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, ValueError):
+        return rebuild_manifest()
+
+def _write_manifest(manifest):
+    os.makedirs(SHARD_DIRECTORY, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SHARD_DIRECTORY, prefix=".manifest-", suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp_file:
+        json.dump(manifest, tmp_file, indent=4)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def _update_manifest(shard, tickets):
+    manifest = _read_manifest()
+    manifest["shards"][shard] = summarize_shard(tickets)
+    _write_manifest(manifest)
+
+# Re-derive manifest.json from the shard files, e.g. after a shard was edited by hand.
+def rebuild_manifest():
+    manifest = {"layout": "yearly", "shards": {}}
+    for shard in list_shards():
+        manifest["shards"][shard] = summarize_shard(local_ticket_serializer.TicketFileReader(_shard_path(shard)))
+    _write_manifest(manifest)
+    return manifest
+
+# Read/Loads every ticket into memory as a list the caller owns. Prefer iter_tickets() or get_ticket() on large databases.
+def load_tickets():
+    try:
+        return [ticket for shard in list_shards() for ticket in load_shard(shard, fresh=True)]
+    except FileNotFoundError:
+        logging.critical("Ticket JSON Database file could not be located. Run helper_scripts/goobydesk_db.py verify for details.")
+        exit(1)
+
+# Writes a full ticket list in the configured layout. Prefer add_ticket() and update_ticket(), which touch one shard.
+def save_tickets(tickets):
+    with _store_lock:
+        if STORAGE_LAYOUT != "yearly":
+            save_shard(None, tickets)
+        else:
+            by_shard = {}
+            for ticket in tickets:
+                by_shard.setdefault(shard_for(ticket), []).append(ticket)
+            for shard, shard_tickets in by_shard.items():
+                save_shard(shard, shard_tickets)
+        for index in TICKET_INDEXES:
+            index.rebuild(tickets)
+
+# Lazily yields tickets shard by shard, oldest first, so reports and exports never hold the whole history at once.
+def iter_tickets():
+    for shard in list_shards():
+        yield from load_shard(shard)
+
+# Open tickets only. In the yearly layout, shards the manifest reports as fully closed are never read.
+def iter_open_tickets():
+    shards = list_shards()
+    if STORAGE_LAYOUT == "yearly":
+        manifest_shards = _read_manifest()["shards"]
+        shards = [shard for shard in shards if manifest_shards.get(shard, {}).get("open", 1) > 0]
+    for shard in shards:
+        for ticket in load_shard(shard):
+            if not _is_closed(ticket):
+                yield ticket
+
+# Returns the ticket or None. In the yearly layout only the shard named by the ticket number is read.
+def get_ticket(ticket_number):
+    if STORAGE_LAYOUT == "yearly" and shard_for(ticket_number) is None:
+        return None
+    candidates = load_shard(shard_for(ticket_number))
+    return next((ticket for ticket in candidates if ticket.get("ticket_number") == ticket_number), None)
+
+# Called with the store lock held, after the ticket's shard was saved.
+def _index_ticket(ticket):
+    for index in TICKET_INDEXES:
+        if index.exists():
+            index.record(ticket)
+        else:
+            _rebuild_index(index)
+
+def _rebuild_index(index):
+    with _store_lock:
+        return index.rebuild(iter_tickets())
+
+# A missing index is built from the database the first time it is needed.
+def _ready(index):
+    if not index.exists():
+        _rebuild_index(index)
+    return index
+
+# With assignment.auto_assign, a new ticket without a technician goes to whoever has the fewest open tickets.
+def add_ticket(ticket):
+    with _store_lock:
+        if local_work_queue.AUTO_ASSIGN and not ticket.get("assigned_technician"):
+            technician = _ready(work_queue).least_loaded(local_work_queue.assignable_technicians())
+            if technician:
+                ticket["assigned_technician"] = technician
+        shard = shard_for(ticket)
+        records = _read_records(shard)
+        records.append(local_ticket_model.as_record(ticket))
+        save_shard(shard, records)
+        _index_ticket(ticket)
+
+# Applies update_func(ticket) to one ticket and saves its shard. Returns the updated ticket, or None if not found.
+def update_ticket(ticket_number, update_func):
+    with _store_lock:
+        shard = shard_for(ticket_number)
+        if STORAGE_LAYOUT == "yearly" and shard is None:
+            return None
+        records = _read_records(shard)
+        for position, record in enumerate(records):
+            if record.get("ticket_number") == ticket_number:
+                ticket = local_ticket_model.Ticket.from_record(record)
+                update_func(ticket)
+                records[position] = ticket.to_record()
+                save_shard(shard, records)
+                _index_ticket(ticket)
+                return ticket
+        return None
+
+# The requester's tickets as {"ticket_number", "ticket_subject", "ticket_status", "last_update"}, newest first.
+def tickets_for_requester(email, limit=None):
+    return _ready(requester_index).tickets_for(email, limit)
+
+def rebuild_requester_index():
+    return _rebuild_index(requester_index)
+
+# Open tickets assigned to technician, or the unassigned ones for "". Answered from the work queue index.
+def work_queue_for(technician, limit=None):
+    return _ready(work_queue).queue_for(technician, limit)
+
+# Open ticket count per technician, with "" for unassigned.
+def work_queue_sizes():
+    return _ready(work_queue).queue_sizes()
+
+def rebuild_work_queue_index():
+    return _rebuild_index(work_queue)
+
+# Rewrites each append-only ticket index that has grown past INDEX_COMPACTION_RATIO lines per ticket, so workers
+# starting up replay a file about the size of the ticket count. Run by the index-compaction job.
+def compact_ticket_indexes():
+    for index in TICKET_INDEXES:
+        if index.exists() and not index.needs_compaction(INDEX_COMPACTION_RATIO):
+            continue
+        count = _rebuild_index(index)
+        logging.info("INDEX COMPACTION - Rewrote %s with %s entries.", index.path, count)
+
+# Generate a new ticket number.
+def generate_ticket_number():
+    current_year = datetime.now().year  # Get the current year dynamically
+    if STORAGE_LAYOUT == "yearly":
+        # Numbered within the year's shard, so TKT-YYYY-0001 is the first ticket of that year.
+        year_summary = _read_manifest()["shards"].get(str(current_year), {})
+        return f"TKT-{current_year}-{str(year_summary.get('max_sequence', 0) + 1).zfill(4)}"
+    try:
+        tickets = _read_records(None) # Only the count is needed, so no Tickets are built.
+    except FileNotFoundError:
+        tickets = load_tickets() # Logs the missing database and exits.
+    ticket_count = str(len(tickets) + 1).zfill(4)  # Zero-padded ticket count
+    return f"TKT-{current_year}-{ticket_count}"  # Format: TKT-YYYY-XXXX
+
+# Change request numbers (CHG-YYYY-XXXX) are allocated by local_change_store.
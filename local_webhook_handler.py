@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 # Local module for Chat Platform webhook notifications.
-__all__ = ["notify_ticket_event", "send_webhook"]
+# Ticket events are queued on a NotificationScheduler, which paces each platform, honors HTTP 429 Retry-After and
+# coalesces bursts into one digest message. send_webhook() and the send_*_notification() helpers still post directly.
+__all__ = ["notify_ticket_event", "send_webhook", "deliver_webhook", "notification_scheduler"]
 import logging
 import requests
 import local_config_loader
+import local_metrics
+from local_notification_scheduler import NotificationScheduler
+
+CHANNELS = ("discord", "slack", "teams365")
+SERVICE_NAMES = {"discord": "Discord", "slack": "Slack", "teams365": "Teams365"}
 
 # CONFIG HELPERS
 def load_webhook_config():
@@ -19,71 +26,130 @@ def get_webhook_urls():
     webhook_url_check = load_webhook_config()
     discord_url = webhook_url_check.get("discord", {}).get("webhook_url")
     slack_url = webhook_url_check.get("slack", {}).get("webhook_url")
-    #teams_url   = webhook_url_check.get("teams365", {}).get("webhook_url")
+    teams_url   = webhook_url_check.get("teams365", {}).get("webhook_url")
+
+    return discord_url, slack_url, teams_url
 
-    return discord_url, slack_url, #teams_url
+def _webhook_url(channel):
+    return dict(zip(CHANNELS, get_webhook_urls()))[channel]
 
-# MAIN ENTRY POINT: SEND TICKET EVENTS
+# MAIN ENTRY POINT: QUEUE TICKET EVENTS
+# Returns immediately. Delivery happens on the scheduler thread, so a slow or throttled platform never delays a request.
 def notify_ticket_event(ticket_number: str, ticket_subject: str, ticket_status: str):
 
     results = {}
+    event = {"ticket_number": ticket_number, "ticket_subject": ticket_subject, "ticket_status": ticket_status}
 
-    if is_enabled("discord"):
-        results["discord"] = send_discord_notification(ticket_number, ticket_subject, ticket_status)
-    else:
-        logging.debug("WEBHOOK HANDLER - Discord disabled; skipping.")
-
-    if is_enabled("slack"):
-        results["slack"] = send_slack_notification(ticket_number, ticket_subject, ticket_status)
-    else:
-        logging.debug("WEBHOOK HANDLER - Slack disabled; skipping.")
-
-    """if is_enabled("teams365"):
-        results["teams365"] = send_teams365_notification(ticket_number, ticket_subject, ticket_status)
-    else:
-        logging.debug("WEBHOOK HANDLER - Teams365 disabled; skipping.")"""
+    for channel in CHANNELS:
+        if is_enabled(channel):
+            notification_scheduler.enqueue(channel, _event_kind(ticket_status), event)
+            results[channel] = "queued"
+        else:
+            logging.debug("WEBHOOK HANDLER - %s disabled; skipping.", SERVICE_NAMES[channel])
 
     return results
 
 # -----------------------------------------------------
 # GENERIC WEBHOOK SENDER
-def send_webhook(url, payload, service_name):
-    enabled_service_key = service_name.lower() 
+# Seconds to wait before the next post, from Retry-After on a 429 or Discord's rate limit headers when its bucket is empty.
+def _retry_after(response):
+    for header in ("Retry-After", "X-RateLimit-Reset-After"):
+        value = response.headers.get(header)
+        if value and (header == "Retry-After" or response.headers.get("X-RateLimit-Remaining") == "0"):
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                return 60.0 # HTTP-date form. Rare for webhooks; wait a minute.
+    if response.status_code == 429:
+        try:
+            return float(response.json().get("retry_after", 60))
+        except ValueError:
+            return 60.0
+    return None
+
+# Returns (delivered, retry_after_seconds or None).
+def deliver_webhook(url, payload, service_name):
+    enabled_service_key = service_name.lower()
 
     if not is_enabled(enabled_service_key):
-        logging.info(f"WEBHOOK HANDLER - {service_name} disabled. Skipping.")
-        return False
+        logging.info("WEBHOOK HANDLER - %s disabled. Skipping.", service_name)
+        return False, None
 
     if not url:
-        logging.warning(f"WEBHOOK HANDLER - {service_name} webhook URL missing in core_configuration.yml")
-        return False
+        logging.warning("WEBHOOK HANDLER - %s webhook URL missing in core_configuration.yml", service_name)
+        return False, None
 
-    try:
-        response = requests.post(url, json=payload, timeout=5)
-        response.raise_for_status()
-        logging.info(f"WEBHOOK HANDLER - Successfully sent notification to {service_name}.")
-        return True
+    with local_metrics.timed("goobydesk_webhook_delivery_duration_seconds", "Webhook delivery time by service and outcome.", service=enabled_service_key) as metric_labels:
+        try:
+            response = requests.post(url, json=payload, timeout=5)
+            retry_after = _retry_after(response)
+            if response.status_code == 429:
+                logging.warning("WEBHOOK HANDLER - %s rate limited us. Pausing %s for %.1fs.", service_name, service_name, retry_after)
+                metric_labels["outcome"] = "rate_limited"
+                return False, retry_after
+            response.raise_for_status()
+            logging.info("WEBHOOK HANDLER - Successfully sent notification to %s.", service_name)
+            metric_labels["outcome"] = "success"
+            return True, retry_after
 
-    except requests.exceptions.Timeout:
-        logging.error(f"WEBHOOK HANDLER - {service_name} request timed out.")
-    except requests.exceptions.ConnectionError:
-        logging.error(f"WEBHOOK HANDLER - Failed to connect to {service_name}.")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"WEBHOOK HANDLER - {service_name} unexpected error: {e}")
+        except requests.exceptions.Timeout:
+            logging.error("WEBHOOK HANDLER - %s request timed out.", service_name)
+            metric_labels["outcome"] = "timeout"
+        except requests.exceptions.ConnectionError:
+            logging.error("WEBHOOK HANDLER - Failed to connect to %s.", service_name)
+            metric_labels["outcome"] = "connection_error"
+        except requests.exceptions.RequestException as e:
+            logging.error("WEBHOOK HANDLER - %s unexpected error: %s", service_name, e)
+            metric_labels["outcome"] = "error"
 
-    return False
+    return False, None
+
+def send_webhook(url, payload, service_name):
+    return deliver_webhook(url, payload, service_name)[0]
+
+# -----------------------------------------------------
+# DIGESTS
+def _event_kind(ticket_status):
+    if ticket_status.lower() == "open":
+        return "new"
+    if ticket_status.lower() == "closed":
+        return "closed"
+    return "updated"
+
+# "14 new tickets, 2 updated, 6 closed"
+def digest_summary(counts):
+    parts = []
+    if counts.get("new"):
+        parts.append(f"{counts['new']} new ticket{'s' if counts['new'] != 1 else ''}")
+    for kind in ("updated", "closed"):
+        if counts.get(kind):
+            parts.append(f"{counts[kind]} {kind}")
+    return ", ".join(parts)
+
+def _digest_lines(digest):
+    lines = [f"{event['ticket_number']} - {event['ticket_subject']} ({event['ticket_status']})" for event in digest.events]
+    if digest.total > len(digest.events):
+        lines.append(f"...and {digest.total - len(digest.events)} more")
+    return "\n".join(lines)
+
+def _deliver_digest(channel, digest):
+    if digest.total == 1:
+        event = digest.events[0]
+        payload = PAYLOAD_BUILDERS[channel](event["ticket_number"], event["ticket_subject"], event["ticket_status"])
+    else:
+        payload = DIGEST_PAYLOAD_BUILDERS[channel](digest)
+    return deliver_webhook(_webhook_url(channel), payload, SERVICE_NAMES[channel])
 
 # -----------------------------------------------------
 # DISCORD PAYLOAD
-def send_discord_notification(ticket_number, ticket_subject, ticket_status):
-    discord_url, _ = get_webhook_urls()
+def build_discord_payload(ticket_number, ticket_subject, ticket_status):
     new_ticket_status = ticket_status.lower() == "open"
     title = (
         f"New Ticket: {ticket_number} - Subject: {ticket_subject}"
         if new_ticket_status
         else f"Ticket: {ticket_number} updated — Status: {ticket_status}"
     )
-    payload = {
+    return {
         "username": "GoobyDesk",
         "embeds": [
             {
@@ -93,20 +159,32 @@ def send_discord_notification(ticket_number, ticket_subject, ticket_status):
         ],
     }
 
-    return send_webhook(discord_url, payload, "Discord")
+def build_discord_digest(digest):
+    return {
+        "username": "GoobyDesk",
+        "embeds": [
+            {
+                "title": f"GoobyDesk: {digest_summary(digest.counts)}",
+                "description": _digest_lines(digest)[:4000],
+                "color": 0x58B9FF,
+            }
+        ],
+    }
+
+def send_discord_notification(ticket_number, ticket_subject, ticket_status):
+    discord_url, _, _ = get_webhook_urls()
+    return send_webhook(discord_url, build_discord_payload(ticket_number, ticket_subject, ticket_status), "Discord")
 
 # -----------------------------------------------------
 # SLACK PAYLOAD
-def send_slack_notification(ticket_number, ticket_subject, ticket_status):
-    _, slack_url = get_webhook_urls()
-
+def build_slack_payload(ticket_number, ticket_subject, ticket_status):
     ticket_status_new = ticket_status.lower() == "open"
     title = (
         f"New Ticket: {ticket_number} - Subject: {ticket_subject}"
         if ticket_status_new
         else f"Ticket: {ticket_number} updated — Status: {ticket_status}"
     )
-    payload = {
+    return {
         "username": "GoobyDesk",
         "attachments": [
             {
@@ -116,14 +194,25 @@ def send_slack_notification(ticket_number, ticket_subject, ticket_status):
         ],
     }
 
-    return send_webhook(slack_url, payload, "Slack")
+def build_slack_digest(digest):
+    return {
+        "username": "GoobyDesk",
+        "attachments": [
+            {
+                "title": f"GoobyDesk: {digest_summary(digest.counts)}",
+                "text": _digest_lines(digest),
+                "color": "#58B9FF",
+            }
+        ],
+    }
+
+def send_slack_notification(ticket_number, ticket_subject, ticket_status):
+    _, slack_url, _ = get_webhook_urls()
+    return send_webhook(slack_url, build_slack_payload(ticket_number, ticket_subject, ticket_status), "Slack")
 
 # -----------------------------------------------------
 # Microsoft Office 365 Teams PAYLOAD
-"""
-def send_teams365_notification(ticket_number, ticket_subject, ticket_status):
-    _, _, teams_url = get_webhook_urls()
-
+def build_teams365_payload(ticket_number, ticket_subject, ticket_status):
     is_new_ticket = ticket_status.lower() == "open"
 
     title = (
@@ -132,7 +221,7 @@ def send_teams365_notification(ticket_number, ticket_subject, ticket_status):
         else f"Ticket Updated"
     )
 
-    payload = {
+    return {
         "@type": "MessageCard",
         "@context": "https://schema.org/extensions",
         "summary": f"GoobyDesk Ticket {ticket_number}",
@@ -150,5 +239,37 @@ def send_teams365_notification(ticket_number, ticket_subject, ticket_status):
         ],
     }
 
-    return send_webhook(teams_url, payload, "Teams365")
-"""
+def build_teams365_digest(digest):
+    return {
+        "@type": "MessageCard",
+        "@context": "https://schema.org/extensions",
+        "summary": f"GoobyDesk: {digest_summary(digest.counts)}",
+        "themeColor": "58B9FF",
+        "title": f"GoobyDesk: {digest_summary(digest.counts)}",
+        "sections": [
+            {
+                "facts": [{"name": event["ticket_number"], "value": f"{event['ticket_subject']} ({event['ticket_status']})"} for event in digest.events],
+                "text": f"...and {digest.total - len(digest.events)} more" if digest.total > len(digest.events) else "",
+                "markdown": True,
+            }
+        ],
+    }
+
+def send_teams365_notification(ticket_number, ticket_subject, ticket_status):
+    _, _, teams_url = get_webhook_urls()
+    return send_webhook(teams_url, build_teams365_payload(ticket_number, ticket_subject, ticket_status), "Teams365")
+
+PAYLOAD_BUILDERS = {"discord": build_discord_payload, "slack": build_slack_payload, "teams365": build_teams365_payload}
+DIGEST_PAYLOAD_BUILDERS = {"discord": build_discord_digest, "slack": build_slack_digest, "teams365": build_teams365_digest}
+
+# -----------------------------------------------------
+# SCHEDULER
+notifications_cfg = load_webhook_config().get("notifications", {}) or {}
+notification_budget_cfg = notifications_cfg.get("per_channel", {}) or {}
+notification_scheduler = NotificationScheduler(
+    _deliver_digest,
+    window_s=float(notifications_cfg.get("digest_window_seconds", 10)),
+    rate=float(notification_budget_cfg.get("rate", 0.5)),
+    burst=float(notification_budget_cfg.get("burst", 5)),
+    max_attempts=int(notifications_cfg.get("max_attempts", 3)),
+    sample_size=int(notifications_cfg.get("digest_sample_size", 10)))
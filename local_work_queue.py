@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Local module for technician work queues: technician -> their open tickets, plus the pool of open unassigned tickets.
+# "My Queue" is a dict lookup, so it costs the same however many technicians and tickets there are, and least-loaded
+# auto-assignment compares queue sizes instead of counting tickets.
+#
+# The index is an append-only JSON lines file (assignment.work_queue_index). local_ticket_store appends
+# {"t": number, "a": technician or "", "s": subject, "st": status} whenever it writes a ticket; the last line for a
+# ticket wins and closed tickets leave every queue. Each process reads the file once and then only the lines appended
+# since. The index-compaction job (local_ticket_store.compact_ticket_indexes) rewrites it compactly from the ticket
+# database once it holds too many lines per open ticket, as does goobydesk_db.py rebuild-indexes.
+__all__ = ["WorkQueueIndex", "work_queue", "assignable_technicians", "queue_entry"]
+import os
+import re
+import json
+import heapq
+import logging
+import tempfile
+import threading
+from local_config_loader import load_core_config
+from local_requester_index import appended_since
+
+core_yaml_config = load_core_config()
+assignment_cfg = core_yaml_config.get("assignment", {}) or {}
+WORK_QUEUE_FILE = assignment_cfg.get("work_queue_index", "./my_data/work_queue.jsonl")
+AUTO_ASSIGN = bool(assignment_cfg.get("auto_assign", False)) # New tickets go to the least-loaded technician.
+ASSIGNABLE_TECHNICIANS = list(assignment_cfg.get("technicians") or []) # Empty: every enabled account in employee_file.
+UNASSIGNED_SHOWN = int(assignment_cfg.get("unassigned_shown", 25)) # Oldest unassigned tickets listed on My Queue.
+EMPLOYEE_FILE = core_yaml_config["employee_file"]
+
+TICKET_NUMBER_PATTERN = re.compile(r"^[A-Z]+-(\d{4})-(\d+)$")
+
+_employee_lock = threading.Lock()
+_employee_cache = (None, []) # (employee file signature, enabled technician usernames)
+
+# Technicians that tickets can be assigned to, in employee file order. Accounts with tech_type DISABLED are left out.
+def assignable_technicians():
+    global _employee_cache
+    if ASSIGNABLE_TECHNICIANS:
+        return ASSIGNABLE_TECHNICIANS
+    try:
+        stat = os.stat(EMPLOYEE_FILE)
+    except FileNotFoundError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _employee_lock:
+        if _employee_cache[0] != signature:
+            try:
+                with open(EMPLOYEE_FILE, "r") as employee_file:
+                    employees = json.load(employee_file)
+            except (OSError, ValueError) as error:
+                # Unreadable or mid-rewrite. Keep the last good list; the next call tries again.
+                logging.warning("WORK QUEUE - Could not read %s (%s). Using the last known technicians.", EMPLOYEE_FILE, error)
+                return _employee_cache[1]
+            _employee_cache = (signature, [employee["tech_username"] for employee in employees
+                                           if employee.get("tech_username") and employee.get("tech_type") != "DISABLED"])
+        return _employee_cache[1]
+
+# Oldest first: TKT-2026-9999 before TKT-2026-10000. Numbers in another format sort after, as strings.
+def _number_order(entry):
+    number_match = TICKET_NUMBER_PATTERN.match(entry["t"] or "")
+    if number_match:
+        return (0, int(number_match.group(1)), int(number_match.group(2)), "")
+    return (1, 0, 0, str(entry["t"]))
+
+def _is_open(entry):
+    return str(entry.get("st", "")).lower() != "closed"
+
+def queue_entry(ticket):
+    return {"t": ticket.get("ticket_number"), "a": ticket.get("assigned_technician") or "",
+            "s": ticket.get("ticket_subject", ""), "st": ticket.get("ticket_status", "")}
+
+class WorkQueueIndex:
+    """Technician -> open tickets ("" holds the unassigned ones), tailed from an append-only file shared by every process."""
+
+    def __init__(self, path):
+        self.path = path
+        self._assignees = {} # ticket number -> technician of an open ticket
+        self._queues = {} # technician -> {ticket number: entry}, open tickets only
+        self._lines = 0 # Lines applied from the current file.
+        self._inode = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _apply(self, entry):
+        ticket_number = entry["t"]
+        previous = self._assignees.pop(ticket_number, None)
+        if previous is not None:
+            self._queues[previous].pop(ticket_number, None)
+            if previous and not self._queues[previous]:
+                del self._queues[previous]
+        if _is_open(entry):
+            self._assignees[ticket_number] = entry["a"]
+            self._queues.setdefault(entry["a"], {})[ticket_number] = entry
+
+    # Applies lines appended by any process since the last refresh. Called with the lock held.
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._assignees, self._queues, self._inode, self._offset, self._lines = {}, {}, stat.st_ino, 0, 0
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, "rb") as index_file:
+            index_file.seek(self._offset)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    break # Still being written; picked up next time.
+                self._offset += len(line)
+                self._lines += 1
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    logging.warning("WORK QUEUE - Skipping an unreadable line in %s.", self.path)
+
+    def record(self, ticket):
+        if not ticket.get("ticket_number"):
+            return
+        line = (json.dumps(queue_entry(ticket), ensure_ascii=False) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) # One write per line: writers never interleave.
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    # Open tickets assigned to technician ("" for unassigned), oldest number first and at most limit of them,
+    # as {"ticket_number", "ticket_subject", "ticket_status", "assigned_technician"}.
+    def queue_for(self, technician, limit=None):
+        with self._lock:
+            self._refresh()
+            entries = list(self._queues.get(technician or "", {}).values())
+        entries = sorted(entries, key=_number_order) if limit is None else heapq.nsmallest(limit, entries, key=_number_order)
+        return [{"ticket_number": entry["t"], "ticket_subject": entry["s"], "ticket_status": entry["st"], "assigned_technician": entry["a"]}
+                for entry in entries]
+
+    # Open ticket count per technician; "" is the unassigned pool.
+    def queue_sizes(self):
+        with self._lock:
+            self._refresh()
+            return {technician: len(queue) for technician, queue in self._queues.items()}
+
+    # The technician with the fewest open tickets. Ties go to the first in the given order. None if there are none.
+    def least_loaded(self, technicians):
+        with self._lock:
+            self._refresh()
+            return min(technicians, key=lambda technician: len(self._queues.get(technician, ())), default=None)
+
+    # True once the file holds more than ratio lines per open ticket (and at least min_lines lines).
+    def needs_compaction(self, ratio, min_lines=1000):
+        with self._lock:
+            self._refresh()
+            return self._lines > max(ratio * len(self._assignees), min_lines)
+
+    # Replaces the file with one line per open ticket, carrying over lines other processes append meanwhile.
+    # Returns the number of open tickets indexed.
+    def rebuild(self, tickets):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        start_size = os.path.getsize(self.path) if self.exists() else None
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".work-queue-", suffix=".tmp")
+        count = 0
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                for ticket in tickets:
+                    entry = queue_entry(ticket)
+                    if entry["t"] and _is_open(entry):
+                        tmp_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                        count += 1
+                tmp_file.write(appended_since(self.path, start_size))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._inode = None
+            self._refresh()
+        return count
+
+work_queue = WorkQueueIndex(WORK_QUEUE_FILE)
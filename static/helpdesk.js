@@ -105,4 +105,66 @@ async function submitNote(ticketNumber) {
         // Show user-friendly error message
         alert("Failed to add note. Please try again.");
     }
+}
+
+/**
+ * Assigns a ticket to a technician, or returns it to the unassigned pool
+ * @param {string} ticketNumber - The ticket number to assign
+ * @param {string} technician - The technician's username, or an empty string to unassign
+ * @returns {Promise<void>}
+ */
+async function assignTicket(ticketNumber, technician) {
+    try {
+        // Send POST request to Flask backend to assign the ticket
+        let response = await fetch(`/ticket/${ticketNumber}/assign`, {
+            method: "POST",
+            headers: { "Content-Type": "application/x-www-form-urlencoded" },
+            body: new URLSearchParams({ technician: technician })
+        });
+
+        // Parse JSON response from server
+        let data = await response.json();
+
+        // Check if request was successful
+        if (!response.ok) {
+            throw new Error(data.message || "Unknown error");
+        }
+
+        // Show success message to user
+        alert(data.message);
+
+        // Refresh the page to reflect the new assignment
+        location.reload();
+    } catch (error) {
+        // Log error to console for debugging
+        console.error("Error:", error);
+
+        // Show user-friendly error message
+        alert("Failed to assign the ticket. Please try again.");
+    }
+}
+
+/**
+ * Loads offloaded ticket content (raw payloads, long replies) from the blob store on demand
+ * @param {string} ticketNumber - The ticket number the content belongs to
+ * @param {string} blobRef - The SHA-256 reference of the stored content
+ * @param {string} elementId - The element whose preview text is replaced with the full content
+ * @returns {Promise<void>}
+ */
+async function loadFullContent(ticketNumber, blobRef, elementId) {
+    try {
+        let response = await fetch(`/ticket/${ticketNumber}/content/${blobRef}`, {
+            headers: { "Accept": "text/plain" }
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+
+        // textContent keeps the content inert; it is never interpreted as HTML.
+        document.getElementById(elementId).textContent = await response.text();
+    } catch (error) {
+        console.error("Error:", error);
+        alert("Failed to load the full content. Please try again.");
+    }
 }
\ No newline at end of file